@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.11"
+# dependencies = ["requests"]
+# ///
+"""
+Original download benchmark for Tenrankai
+Serves photos/landscapes/CRW_1978.jpg and synthetic 50-200 MB originals from a
+bench gallery, and measures full-download throughput (single and concurrent),
+Range request correctness and latency, and server RSS growth while streaming
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import struct
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+from bench_results import DEFAULT_STORE, metric, record_run
+from test_tenrankai_site import (
+    BLUE, GREEN, NC, RED, YELLOW,
+    TenrankaiServer, make_session, percentile, prepare_bench_config,
+)
+
+SITE_DIR = "tenrankai-dot-com"
+GALLERY_CONFIG = "sites/default/galleries/main.toml"
+PERMISSIONS_CONFIG = "sites/default/permissions.toml"
+SEED_IMAGE = os.path.join(SITE_DIR, "photos", "landscapes", "CRW_1978.jpg")
+CHUNK = 1024 * 1024
+# Largest payload of one APP15 segment (the 2-byte length counts itself)
+SEGMENT_PAYLOAD = 65533
+
+def print_header(text: str):
+    print(f"\n{YELLOW}{text}{NC}")
+    print("=" * len(text))
+
+def write_padded_jpeg(seed: bytes, path: str, size: int):
+    """Write seed (a JPEG) padded with APP15 segments to exactly size bytes.
+
+    Decoders skip APPn segments, so the file stays a valid image with the seed's
+    pixels while being as large as a full-resolution original.
+    """
+    padding = size - len(seed)
+    if padding < 0 or 0 < padding < 4:
+        raise ValueError(f"cannot pad {len(seed)} bytes to {size}")
+    count = -(-padding // (SEGMENT_PAYLOAD + 4))
+    payload_total = padding - 4 * count
+    segments = [payload_total // count + (i < payload_total % count) for i in range(count)]
+    with open(path, "wb") as f:
+        f.write(seed[:2])
+        filler = os.urandom(SEGMENT_PAYLOAD)
+        for payload in segments:
+            f.write(b"\xff\xef" + struct.pack(">H", payload + 2) + filler[:payload])
+        f.write(seed[2:])
+
+def prepare_originals(source_dir: str, sizes_mb: List[int]) -> List[str]:
+    """Copy the seed image and write padded originals, reusing files of the right size"""
+    os.makedirs(source_dir, exist_ok=True)
+    with open(SEED_IMAGE, "rb") as f:
+        seed = f.read()
+    names = [os.path.basename(SEED_IMAGE)]
+    shutil.copyfile(SEED_IMAGE, os.path.join(source_dir, names[0]))
+    for mb in sizes_mb:
+        name = f"original_{mb:03d}mb.jpg"
+        path = os.path.join(source_dir, name)
+        if not os.path.exists(path) or os.path.getsize(path) != mb * 1048576:
+            write_padded_jpeg(seed, path, mb * 1048576)
+        names.append(name)
+    return names
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def download(session: requests.Session, url: str) -> Dict[str, Any]:
+    """Stream one full download, returning bytes, time to first byte, MB/s and digest"""
+    digest = hashlib.sha256()
+    received = 0
+    start = time.perf_counter()
+    first_byte: Optional[float] = None
+    try:
+        with session.get(url, stream=True, timeout=300) as response:
+            status = response.status_code
+            for block in response.iter_content(CHUNK):
+                if first_byte is None:
+                    first_byte = time.perf_counter() - start
+                digest.update(block)
+                received += len(block)
+    except requests.exceptions.RequestException as e:
+        return {"status": None, "error": str(e), "bytes": received}
+    elapsed = time.perf_counter() - start
+    return {
+        "status": status,
+        "bytes": received,
+        "ttfb_ms": (first_byte or elapsed) * 1000,
+        "seconds": elapsed,
+        "mb_per_s": received / 1048576 / elapsed if elapsed else 0.0,
+        "sha256": digest.hexdigest(),
+    }
+
+def range_cases(size: int) -> List[Tuple[str, str, int, int]]:
+    """(name, Range header, first byte, last byte) for the reads clients issue"""
+    half = size // 2
+    return [
+        ("head 64KB", "bytes=0-65535", 0, 65535),
+        ("tail 64KB", "bytes=-65536", size - 65536, size - 1),
+        ("resume at half", f"bytes={half}-", half, size - 1),
+        ("middle 1MB", f"bytes={half}-{half + CHUNK - 1}", half, half + CHUNK - 1),
+    ]
+
+def check_ranges(session: requests.Session, url: str, path: str, samples: int) -> List[Dict[str, Any]]:
+    """Check status, Content-Range and bytes of each Range case against the file"""
+    size = os.path.getsize(path)
+    results = []
+    with open(path, "rb") as f:
+        for name, header, first, last in range_cases(size):
+            f.seek(first)
+            expected = f.read(last - first + 1)
+            timings = []
+            problems: List[str] = []
+            for _ in range(samples):
+                start = time.perf_counter()
+                try:
+                    response = session.get(url, headers={"Range": header}, timeout=300)
+                except requests.exceptions.RequestException as e:
+                    problems = [str(e)]
+                    break
+                timings.append(time.perf_counter() - start)
+            else:
+                if response.status_code != 206:
+                    problems.append(f"HTTP {response.status_code}, expected 206")
+                content_range = response.headers.get("Content-Range", "")
+                if content_range != f"bytes {first}-{last}/{size}":
+                    problems.append(f"Content-Range '{content_range}', expected 'bytes {first}-{last}/{size}'")
+                if response.content != expected:
+                    problems.append(f"body differs from bytes {first}-{last} of the file")
+            timings.sort()
+            results.append({
+                "case": name,
+                "range": header,
+                "p50_ms": percentile(timings, 50) * 1000,
+                "max_ms": (timings[-1] if timings else 0.0) * 1000,
+                "samples_ms": [t * 1000 for t in timings],
+                "problems": problems,
+            })
+        # A range starting past the end must be rejected, not answered with the whole file
+        try:
+            response = session.get(url, headers={"Range": f"bytes={size}-"}, timeout=30)
+            problems = [] if response.status_code == 416 else [f"HTTP {response.status_code}, expected 416"]
+        except requests.exceptions.RequestException as e:
+            problems = [str(e)]
+        results.append({"case": "past end", "range": f"bytes={size}-", "p50_ms": 0.0, "max_ms": 0.0,
+                        "problems": problems})
+    return results
+
+def rss_growth(server: TenrankaiServer, phase: str, baseline: int) -> int:
+    stats = server.sampler.summary().get(phase) if server.sampler else None
+    return int(stats["rss_max"] - baseline) if stats else 0
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Tenrankai original downloads and Range requests')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[50, 100, 200],
+                        help='Synthetic original sizes in MB (default: 50 100 200)')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8],
+                        help='Concurrent full downloads of the largest file (default: 1 4 8)')
+    parser.add_argument('--range-samples', type=int, default=10,
+                        help='Requests per Range case and file (default: 10)')
+    parser.add_argument('--sample-interval', type=float, default=0.1,
+                        help='Seconds between server RSS samples (default: 0.1)')
+    parser.add_argument('--port', type=int, default=3468, help='Port to run server on')
+    parser.add_argument('--json', default=None, help='Write results to this JSON file')
+    parser.add_argument('--results', default=DEFAULT_STORE,
+                        help='Results store for bench_results.py (default: %(default)s)')
+    parser.add_argument('--no-record', action='store_true',
+                        help='Do not append this run to the results store')
+    args = parser.parse_args()
+
+    source_dir = os.path.abspath(os.path.join(SITE_DIR, "bench", "originals"))
+    seed_mb = os.path.getsize(SEED_IMAGE) / 1048576
+    if any(mb <= seed_mb for mb in args.sizes):
+        print(f"{RED}✗ --sizes must be larger than {os.path.basename(SEED_IMAGE)} ({seed_mb:.1f}MB){NC}")
+        return 1
+    print_header("Tenrankai Original Download Benchmark")
+    start = time.perf_counter()
+    names = prepare_originals(source_dir, args.sizes)
+    print(f"{BLUE}ℹ {len(names)} originals in {source_dir} "
+          f"(prepared in {time.perf_counter() - start:.1f}s){NC}")
+    digests = {name: file_sha256(os.path.join(source_dir, name)) for name in names}
+
+    # The demo role cannot download originals, so the bench copy grants it to everyone
+    config = prepare_bench_config("downloads", {
+        GALLERY_CONFIG: {
+            "source_directory": source_dir,
+            "cache_directory": os.path.abspath(os.path.join(SITE_DIR, "bench", "cache", "downloads")),
+        },
+        PERMISSIONS_CONFIG: {
+            "public_role": "bench_downloader",
+            "default_authenticated_role": "bench_downloader",
+            "roles.bench_downloader.name": "Bench Downloader",
+            "roles.bench_downloader.permissions": {"can_view": True, "can_download_original": True},
+        },
+    })
+    server = TenrankaiServer(config=config, port=args.port, site_dir=SITE_DIR,
+                             sample_interval=args.sample_interval)
+    if not server.start(timeout=60):
+        print(f"{RED}✗ {server.error}{NC}")
+        print(server.output(40))
+        return 1
+
+    results: Dict[str, Any] = {"single": [], "concurrent": [], "ranges": {}}
+    failures = 0
+    try:
+        server.set_phase("idle")
+        time.sleep(max(0.5, args.sample_interval * 3))
+        baseline = int(server.sampler.summary()["idle"]["rss_max"]) if server.sampler else 0
+        session = make_session(max(args.concurrency))
+
+        print_header("Single Downloads")
+        for name in names:
+            server.set_phase(f"single {name}")
+            r = download(session, f"{server.base_url}/gallery/{name}")
+            r.update({"file": name, "size": os.path.getsize(os.path.join(source_dir, name)),
+                      "rss_growth": rss_growth(server, f"single {name}", baseline)})
+            results["single"].append(r)
+            ok = r["status"] == 200 and r["bytes"] == r["size"] and r.get("sha256") == digests[name]
+            failures += not ok
+            if ok:
+                print(f"  {GREEN}✓{NC} {name:<24} {r['size'] / 1048576:>7.1f}MB {r['mb_per_s']:>8.1f}MB/s "
+                      f"ttfb {r['ttfb_ms']:>6.1f}ms  RSS +{r['rss_growth'] / 1048576:.1f}MB")
+            else:
+                print(f"  {RED}✗ {name}: status {r['status']}, {r['bytes']} of {r['size']} bytes"
+                      f"{', content differs' if r.get('sha256') and r['sha256'] != digests[name] else ''}"
+                      f"{' ' + r['error'] if r.get('error') else ''}{NC}")
+
+        largest = names[-1]
+        size = os.path.getsize(os.path.join(source_dir, largest))
+        print_header(f"Concurrent Downloads ({largest})")
+        for concurrency in args.concurrency:
+            phase = f"concurrent x{concurrency}"
+            server.set_phase(phase)
+            url = f"{server.base_url}/gallery/{largest}"
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                downloads = list(pool.map(lambda _: download(session, url), range(concurrency)))
+            elapsed = time.perf_counter() - start
+            complete = sum(1 for d in downloads if d["bytes"] == size and d.get("sha256") == digests[largest])
+            row = {
+                "concurrency": concurrency,
+                "complete": complete,
+                "aggregate_mb_per_s": sum(d["bytes"] for d in downloads) / 1048576 / elapsed,
+                "slowest_mb_per_s": min((d.get("mb_per_s", 0.0) for d in downloads), default=0.0),
+                "rss_growth": rss_growth(server, phase, baseline),
+            }
+            results["concurrent"].append(row)
+            failures += complete != concurrency
+            mark = f"{GREEN}✓{NC}" if complete == concurrency else f"{RED}✗{NC}"
+            print(f"  {mark} x{concurrency:<3} {complete}/{concurrency} complete, "
+                  f"{row['aggregate_mb_per_s']:>8.1f}MB/s total, slowest {row['slowest_mb_per_s']:.1f}MB/s, "
+                  f"RSS +{row['rss_growth'] / 1048576:.1f}MB")
+
+        print_header("Range Requests")
+        server.set_phase("ranges")
+        for name in names:
+            cases = check_ranges(session, f"{server.base_url}/gallery/{name}",
+                                 os.path.join(source_dir, name), args.range_samples)
+            results["ranges"][name] = cases
+            print(f"  {BLUE}{name}{NC}")
+            for case in cases:
+                failures += bool(case["problems"])
+                if case["problems"]:
+                    print(f"    {RED}✗ {case['case']:<16} {'; '.join(case['problems'])}{NC}")
+                else:
+                    print(f"    {GREEN}✓{NC} {case['case']:<16} p50 {case['p50_ms']:>7.1f}ms "
+                          f"max {case['max_ms']:>7.1f}ms")
+        session.close()
+    except KeyboardInterrupt:
+        print("\n\nInterrupted by user")
+        failures += 1
+    finally:
+        server.stop()
+
+    # Streaming keeps RSS growth well below one file; buffering grows by a whole file per download
+    peak_growth = max([r.get("rss_growth", 0) for r in results["single"] + results["concurrent"]],
+                      default=0)
+    largest_mb = max(args.sizes, default=0)
+    print_header("Memory")
+    print(f"  Peak RSS growth {peak_growth / 1048576:.1f}MB while serving files up to {largest_mb}MB")
+    if largest_mb and peak_growth > largest_mb * 1048576 / 2:
+        print(f"  {RED}✗ RSS grew by more than half of the largest file; downloads look buffered{NC}")
+        failures += 1
+    else:
+        print(f"  {GREEN}✓ Downloads are streamed{NC}")
+    results["peak_rss_growth"] = peak_growth
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote results to {args.json}")
+    if not args.no_record and not failures:
+        metrics = {"peak rss growth": metric([peak_growth / 1048576], unit="MB")}
+        for r in results["single"]:
+            metrics[f"{r['file']} throughput"] = metric([r["mb_per_s"]], unit="MB/s", better="higher")
+            metrics[f"{r['file']} ttfb"] = metric([r["ttfb_ms"]])
+        for row in results["concurrent"]:
+            metrics[f"x{row['concurrency']} throughput"] = metric([row["aggregate_mb_per_s"]], unit="MB/s",
+                                                                   better="higher")
+        for name, cases in results["ranges"].items():
+            for case in cases:
+                metrics[f"{name} range {case['case']}"] = metric(case.get("samples_ms", []))
+        run = record_run("downloads", "config.toml", metrics, site_dir=SITE_DIR, store=args.results,
+                         extra={"sizes_mb": args.sizes})
+        print(f"{BLUE}ℹ Recorded run {run['id']}{NC}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.11"
+# dependencies = ["requests", "pillow"]
+# ///
+"""
+Gallery scaling benchmark for Tenrankai
+Grows a synthetic photo tree (scripts/generate_gallery.py) step by step and
+measures /gallery page latency and gallery preview API latency at each size
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+from bench_results import DEFAULT_STORE, metric, record_run  # noqa: E402
+from generate_gallery import capacity, generate_gallery  # noqa: E402
+from test_tenrankai_site import (  # noqa: E402
+    BLUE, GREEN, NC, RED, YELLOW,
+    TenrankaiServer, load_gallery_configs, make_session, percentile,
+    prepare_bench_config, preview_image_paths,
+)
+
+SITE_DIR = "tenrankai-dot-com"
+GALLERY_CONFIG = "sites/default/galleries/main.toml"
+
+def print_header(text: str):
+    print(f"\n{YELLOW}{text}{NC}")
+    print("=" * len(text))
+
+def sample_latency(session: requests.Session, url: str, samples: int) -> Dict[str, Any]:
+    """Time one cold request and then `samples` repeats of a URL"""
+    timings = []
+    status = None
+    size = 0
+    for _ in range(samples + 1):
+        start = time.perf_counter()
+        response = session.get(url, timeout=300)
+        timings.append(time.perf_counter() - start)
+        status = response.status_code
+        size = len(response.content)
+    warm = sorted(timings[1:])
+    return {
+        "status": status,
+        "bytes": size,
+        "first_ms": timings[0] * 1000,
+        "p50_ms": percentile(warm, 50) * 1000,
+        "p95_ms": percentile(warm, 95) * 1000,
+        "max_ms": (warm[-1] if warm else timings[0]) * 1000,
+        "samples_ms": [t * 1000 for t in warm],
+    }
+
+def check_preview(paths: List[str], max_images: int, max_depth: int, max_per_folder: int) -> List[str]:
+    """Problems with a preview response against the gallery's [preview] limits"""
+    problems = []
+    if len(paths) > max_images:
+        problems.append(f"{len(paths)} images > max_images {max_images}")
+    folders = Counter(os.path.dirname(path) for path in paths)
+    for folder, count in folders.items():
+        depth = folder.count("/") + 1 if folder else 0
+        if depth > max_depth:
+            problems.append(f"{folder or '/'} at depth {depth} > max_depth {max_depth}")
+        if count > max_per_folder:
+            problems.append(f"{count} images from {folder or '/'} > max_per_folder {max_per_folder}")
+    return problems
+
+def bench_step(images: int, args, photos_dir: str, preview: Dict[str, int]) -> Dict[str, Any]:
+    print(f"\n{BLUE}{images} images{NC}")
+    start = time.perf_counter()
+    total, created = generate_gallery(photos_dir, args.depth, args.folders,
+                                      args.images_per_folder, images)
+    print(f"  Generated {created} new images in {time.perf_counter() - start:.1f}s ({total} total)")
+    
+    config = prepare_bench_config("gallery-scale", {
+        GALLERY_CONFIG: {
+            "source_directory": photos_dir,
+            "cache_directory": os.path.abspath(os.path.join(SITE_DIR, "bench", "cache", "gallery-scale")),
+            "images_per_page": 24,
+            "preview.max_images": preview["max_images"],
+            "preview.max_depth": preview["max_depth"],
+            "preview.max_per_folder": preview["max_per_folder"],
+        },
+    })
+    server = TenrankaiServer(config=config, port=args.port, site_dir=SITE_DIR)
+    if not server.start(timeout=args.timeout):
+        print(f"  {RED}✗ {server.error}{NC}")
+        print(server.output(40))
+        return {"images": total, "error": server.error}
+    
+    result: Dict[str, Any] = {"images": total, "startup_ms": server.ready_after * 1000}
+    session = make_session(1)
+    try:
+        result["gallery"] = sample_latency(session, f"{server.base_url}/gallery", args.samples)
+        result["folder"] = sample_latency(session, f"{server.base_url}/gallery/folder_00", args.samples)
+        preview_url = (f"{server.base_url}/api/gallery/main/preview"
+                       f"?count={preview['max_images']}")
+        result["preview"] = sample_latency(session, preview_url, args.samples)
+        paths = preview_image_paths(session.get(preview_url, timeout=300).json())
+        result["preview_images"] = len(paths)
+        result["preview_problems"] = check_preview(paths, **preview)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        result["error"] = str(e)
+        print(f"  {RED}✗ {e}{NC}")
+    finally:
+        server.stop()
+    
+    if "error" not in result:
+        print(f"  {GREEN}✓ ready {result['startup_ms']:.0f}ms, /gallery p50 {result['gallery']['p50_ms']:.1f}ms, "
+              f"preview p50 {result['preview']['p50_ms']:.1f}ms{NC}")
+        for problem in result["preview_problems"]:
+            print(f"  {RED}✗ Preview: {problem}{NC}")
+    return result
+
+def print_report(results: List[Dict[str, Any]]):
+    print_header("Gallery Scaling Summary")
+    print(f"  {'Images':>8} {'Startup':>9}   {'/gallery first/p50/p95 (ms)':<28} "
+          f"{'folder p50':>10}   {'preview first/p50/p95 (ms)':<28} {'Limits':<6}")
+    for r in results:
+        if "error" in r:
+            print(f"  {r['images']:>8} {RED}{r['error']}{NC}")
+            continue
+        g, f, p = r["gallery"], r["folder"], r["preview"]
+        limits = f"{GREEN}ok{NC}" if not r["preview_problems"] else f"{RED}{len(r['preview_problems'])} bad{NC}"
+        print(f"  {r['images']:>8} {r['startup_ms']:>7.0f}ms   "
+              f"{g['first_ms']:>8.1f} {g['p50_ms']:>8.1f} {g['p95_ms']:>8.1f}   "
+              f"{f['p50_ms']:>10.1f}   "
+              f"{p['first_ms']:>8.1f} {p['p50_ms']:>8.1f} {p['p95_ms']:>8.1f}   {limits}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Tenrankai gallery scaling')
+    parser.add_argument('--steps', type=int, nargs='+', default=[100, 1000, 10000, 100000],
+                        help='Gallery sizes to measure (default: 100 1000 10000 100000)')
+    parser.add_argument('--depth', type=int, default=3, help='Folder nesting depth (default: 3)')
+    parser.add_argument('--folders', type=int, default=10, help='Subfolders per folder (default: 10)')
+    parser.add_argument('--images-per-folder', type=int, default=100,
+                        help='Images in each folder (default: 100)')
+    parser.add_argument('--samples', type=int, default=20,
+                        help='Warm requests per URL and step (default: 20)')
+    parser.add_argument('--config', default='config.toml',
+                        help='Config whose [preview] settings are used (default: config.toml)')
+    parser.add_argument('--port', type=int, default=3463, help='Port to run server on')
+    parser.add_argument('--timeout', type=float, default=600.0,
+                        help='Seconds to wait for the server to scan the tree (default: 600)')
+    parser.add_argument('--json', default=None, help='Write results to this JSON file')
+    parser.add_argument('--results', default=DEFAULT_STORE,
+                        help='Results store for bench_results.py (default: %(default)s)')
+    parser.add_argument('--no-record', action='store_true',
+                        help='Do not append this run to the results store')
+    args = parser.parse_args()
+    
+    needed = max(args.steps)
+    if capacity(args.depth, args.folders, args.images_per_folder) < needed:
+        print(f"{RED}✗ --depth/--folders/--images-per-folder hold fewer than {needed} images{NC}")
+        return 1
+    
+    main_gallery = next(g for g in load_gallery_configs(args.config, SITE_DIR) if g.get("name") == "main")
+    preview = {key: main_gallery.get("preview", {}).get(key, default)
+               for key, default in (("max_images", 6), ("max_depth", 3), ("max_per_folder", 2))}
+    photos_dir = os.path.abspath(os.path.join(SITE_DIR, "bench", "photos"))
+    
+    print_header("Tenrankai Gallery Scaling Benchmark")
+    print(f"{BLUE}ℹ Tree in {photos_dir}: depth {args.depth}, {args.folders} folders per level, "
+          f"{args.images_per_folder} images per folder; preview {preview}{NC}")
+    
+    results = []
+    try:
+        for images in sorted(args.steps):
+            results.append(bench_step(images, args, photos_dir, preview))
+    except KeyboardInterrupt:
+        print("\n\nInterrupted by user")
+    
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote results to {args.json}")
+    if not args.no_record:
+        metrics = {}
+        for r in results:
+            if "error" in r:
+                continue
+            metrics[f"{r['images']} startup"] = metric([r["startup_ms"]])
+            for key in ("gallery", "folder", "preview"):
+                metrics[f"{r['images']} {key} first"] = metric([r[key]["first_ms"]])
+                metrics[f"{r['images']} {key}"] = metric(r[key]["samples_ms"])
+        if metrics:
+            run = record_run("gallery-scale", args.config, metrics, site_dir=SITE_DIR, store=args.results,
+                             extra={"depth": args.depth, "folders": args.folders,
+                                    "images_per_folder": args.images_per_folder})
+            print(f"{BLUE}ℹ Recorded run {run['id']}{NC}")
+    
+    ok = results and all("error" not in r and not r["preview_problems"] for r in results)
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.11"
+# dependencies = ["requests"]
+# ///
+"""
+Posts scaling benchmark for Tenrankai
+Fills blog and docs with a synthetic corpus (scripts/generate_posts.py), then
+measures index pagination and single-post latency, and the CPU spike of the
+periodic posts rescan triggered by refresh_interval_minutes
+"""
+
+import argparse
+import json
+import math
+import os
+import shutil
+import statistics
+import sys
+import time
+import tomllib
+from typing import Any, Dict
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+from bench_results import DEFAULT_STORE, metric, record_run  # noqa: E402
+from generate_posts import generate_posts  # noqa: E402
+from test_tenrankai_site import (  # noqa: E402
+    BLUE, GREEN, NC, RED, YELLOW,
+    TenrankaiServer, make_session, percentile, prepare_bench_config, process_cpu_seconds,
+)
+
+SITE_DIR = "tenrankai-dot-com"
+# Collection name -> ConfigStorage file
+COLLECTIONS = {
+    "blog": "sites/default/posts/blog.toml",
+    "docs": "sites/default/posts/docs.toml",
+}
+
+def print_header(text: str):
+    print(f"\n{YELLOW}{text}{NC}")
+    print("=" * len(text))
+
+def posts_per_page(config: str = "config.toml") -> Dict[str, int]:
+    """posts_per_page of every collection, read from the config's ConfigStorage tree"""
+    with open(os.path.join(SITE_DIR, config), "rb") as f:
+        storage = tomllib.load(f)["app"]["config_storage"]
+    per_page = {}
+    for name, config_file in COLLECTIONS.items():
+        with open(os.path.join(SITE_DIR, storage, config_file), "rb") as f:
+            per_page[name] = tomllib.load(f)["posts_per_page"]
+    return per_page
+
+def sample_latency(session: requests.Session, url: str, samples: int) -> Dict[str, Any]:
+    """Time `samples` requests to a URL after one unrecorded warm-up"""
+    response = session.get(url, timeout=120)
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        response = session.get(url, timeout=120)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        "status": response.status_code,
+        "bytes": len(response.content),
+        "p50_ms": percentile(timings, 50) * 1000,
+        "p95_ms": percentile(timings, 95) * 1000,
+        "max_ms": timings[-1] * 1000,
+        "samples_ms": [t * 1000 for t in timings],
+    }
+
+def watch_rescan(server: TenrankaiServer, session: requests.Session, probe_url: str,
+                 window: float, interval: float) -> Dict[str, Any]:
+    """Sample server CPU usage (and index latency) while waiting for the periodic rescan"""
+    pid = server.process.pid
+    samples = []
+    probes = []
+    last_cpu = process_cpu_seconds(pid)
+    last_time = time.perf_counter()
+    origin = last_time
+    end = origin + window
+    next_probe = origin
+    while time.perf_counter() < end and server.is_running():
+        time.sleep(interval)
+        now = time.perf_counter()
+        cpu = process_cpu_seconds(pid)
+        samples.append({"t": now - origin, "cpu_pct": (cpu - last_cpu) / (now - last_time) * 100})
+        if now >= next_probe:
+            # Probe between CPU windows so the request's own work is never counted as rescan CPU
+            start = time.perf_counter()
+            try:
+                session.get(probe_url, timeout=60)
+                probe_ms = (time.perf_counter() - start) * 1000
+            except requests.exceptions.RequestException:
+                probe_ms = None
+            probes.append({"t": start - origin, "probe_ms": probe_ms, "after": len(samples) - 1})
+            next_probe = start + 0.5
+            cpu = process_cpu_seconds(pid)
+            now = time.perf_counter()
+        last_cpu, last_time = cpu, now
+    
+    if not samples:
+        return {"samples": [], "probes": []}
+    usage = [s["cpu_pct"] for s in samples]
+    baseline = statistics.median(usage)
+    threshold = max(baseline * 3, baseline + 10.0)
+    spiking = [s["cpu_pct"] > threshold for s in samples]
+    spike = [s for s, hot in zip(samples, spiking) if hot]
+    # A probe overlaps the spike when the CPU window just before or after it is part of it
+    during = sorted(p["probe_ms"] for p in probes if p["probe_ms"] is not None and
+                    any(spiking[i] for i in (p["after"], p["after"] + 1) if i < len(spiking)))
+    return {
+        "baseline_cpu_pct": baseline,
+        "peak_cpu_pct": max(usage),
+        "spike_start_s": spike[0]["t"] if spike else None,
+        "spike_seconds": len(spike) * interval,
+        "spike_cpu_seconds": sum((s["cpu_pct"] - baseline) / 100 * interval for s in spike),
+        "probe_p50_ms": percentile(during, 50) if during else None,
+        "probe_max_ms": during[-1] if during else None,
+        "probe_count": len(during),
+        "samples": samples,
+        "probes": probes,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Tenrankai posts index scaling')
+    parser.add_argument('--blog', type=int, default=2000, help='Synthetic blog posts (default: 2000)')
+    parser.add_argument('--docs', type=int, default=5000, help='Synthetic docs posts (default: 5000)')
+    parser.add_argument('--samples', type=int, default=20, help='Requests per URL (default: 20)')
+    parser.add_argument('--page-param', default='page', help='Index pagination query parameter (default: page)')
+    parser.add_argument('--refresh-minutes', type=int, default=1,
+                        help='refresh_interval_minutes for the rescan measurement (default: 1)')
+    parser.add_argument('--rescan-window', type=float, default=None,
+                        help='Seconds to watch CPU for the rescan (default: refresh interval + 30s, 0 to skip)')
+    parser.add_argument('--cpu-interval', type=float, default=0.1,
+                        help='CPU sampling interval in seconds (default: 0.1)')
+    parser.add_argument('--port', type=int, default=3464, help='Port to run server on')
+    parser.add_argument('--json', default=None, help='Write results to this JSON file')
+    parser.add_argument('--results', default=DEFAULT_STORE,
+                        help='Results store for bench_results.py (default: %(default)s)')
+    parser.add_argument('--no-record', action='store_true',
+                        help='Do not append this run to the results store')
+    args = parser.parse_args()
+    
+    posts_dir = os.path.abspath(os.path.join(SITE_DIR, "bench", "posts"))
+    counts = {"blog": args.blog, "docs": args.docs}
+    
+    try:
+        per_page_of = posts_per_page()
+    except (OSError, KeyError, tomllib.TOMLDecodeError) as e:
+        print(f"{RED}✗ Cannot read posts_per_page from the posts configs: {e}{NC}")
+        return 1
+    
+    print_header("Tenrankai Posts Scaling Benchmark")
+    slugs = {}
+    overrides = {}
+    for name, config_file in COLLECTIONS.items():
+        start = time.perf_counter()
+        # Start from an empty directory so a smaller corpus does not inherit old posts
+        shutil.rmtree(os.path.join(posts_dir, name), ignore_errors=True)
+        slugs[name] = generate_posts(posts_dir, name, counts[name])
+        print(f"{GREEN}✓ Generated {counts[name]} {name} posts in {time.perf_counter() - start:.1f}s{NC}")
+        overrides[config_file] = {
+            "source_directory": os.path.join(posts_dir, name),
+            "refresh_interval_minutes": args.refresh_minutes,
+        }
+    config = prepare_bench_config("posts-scale", overrides)
+    
+    server = TenrankaiServer(config=config, port=args.port, site_dir=SITE_DIR)
+    if not server.start(timeout=300):
+        print(f"{RED}✗ {server.error}{NC}")
+        print(server.output(40))
+        return 1
+    print(f"{GREEN}✓ Server ready in {server.ready_after:.2f}s{NC}")
+    
+    results: Dict[str, Any] = {"startup_ms": server.ready_after * 1000, "pages": [], "posts": []}
+    session = make_session(1)
+    failed = False
+    try:
+        print_header("Index Pages")
+        print(f"  {'URL':<36} {'Status':>6} {'Bytes':>9} {'p50':>9} {'p95':>9} {'max':>9}")
+        for name, per_page in per_page_of.items():
+            pages = max(1, math.ceil(counts[name] / per_page))
+            urls = [f"/{name}"] + [f"/{name}?{args.page_param}={page}"
+                                   for page in sorted({2, pages // 2, pages}) if page > 1]
+            slug_picks = [slugs[name][0], slugs[name][len(slugs[name]) // 2], slugs[name][-1]]
+            for kind, targets in (("pages", urls), ("posts", [f"/{name}/{slug}" for slug in slug_picks])):
+                for url in targets:
+                    stats = sample_latency(session, f"{server.base_url}{url}", args.samples)
+                    stats["url"] = url
+                    results[kind].append(stats)
+                    color = GREEN if stats["status"] == 200 else RED
+                    failed = failed or stats["status"] != 200
+                    print(f"  {url:<36} {color}{stats['status']:>6}{NC} {stats['bytes']:>9} "
+                          f"{stats['p50_ms']:>7.1f}ms {stats['p95_ms']:>7.1f}ms {stats['max_ms']:>7.1f}ms")
+        
+        window = args.rescan_window if args.rescan_window is not None else args.refresh_minutes * 60 + 30
+        if window > 0:
+            print_header("Rescan CPU")
+            print(f"{BLUE}ℹ Watching server CPU for {window:.0f}s "
+                  f"(refresh_interval_minutes = {args.refresh_minutes}){NC}")
+            rescan = watch_rescan(server, session, f"{server.base_url}/docs", window, args.cpu_interval)
+            results["rescan"] = rescan
+            if rescan["samples"]:
+                print(f"  Baseline CPU   {rescan['baseline_cpu_pct']:.1f}%")
+                print(f"  Peak CPU       {rescan['peak_cpu_pct']:.1f}%")
+                if rescan["spike_start_s"] is not None:
+                    print(f"  Spike          {rescan['spike_seconds']:.1f}s starting at "
+                          f"{rescan['spike_start_s']:.1f}s, {rescan['spike_cpu_seconds']:.2f} CPU-seconds")
+                else:
+                    print(f"  {YELLOW}⚠ No CPU spike detected in the window{NC}")
+                if rescan["probe_p50_ms"] is not None:
+                    print(f"  /docs latency  p50 {rescan['probe_p50_ms']:.1f}ms, "
+                          f"max {rescan['probe_max_ms']:.1f}ms over {rescan['probe_count']} "
+                          f"probe(s) during the spike")
+    except KeyboardInterrupt:
+        print("\n\nInterrupted by user")
+    except requests.exceptions.RequestException as e:
+        print(f"{RED}✗ Request failed: {e}{NC}")
+        failed = True
+    finally:
+        server.stop()
+    
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote results to {args.json}")
+    if not args.no_record and not failed:
+        metrics = {"startup": metric([results["startup_ms"]])}
+        for stats in results["pages"] + results["posts"]:
+            metrics[stats["url"]] = metric(stats["samples_ms"])
+        rescan = results.get("rescan", {})
+        if rescan.get("spike_start_s") is not None:
+            metrics["rescan cpu"] = metric([rescan["spike_cpu_seconds"]], unit="s")
+        run = record_run("posts-scale", "config.toml", metrics, site_dir=SITE_DIR, store=args.results,
+                         extra={"counts": counts})
+        print(f"{BLUE}ℹ Recorded run {run['id']}{NC}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
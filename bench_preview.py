@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.11"
+# dependencies = ["requests", "pillow"]
+# ///
+"""
+Gallery preview API benchmark for Tenrankai
+Sweeps ?count= and the gallery's [preview] max_images/max_depth/max_per_folder
+settings over synthetic galleries of increasing size, reporting latency,
+payload size and how the returned images are spread across folders
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+from bench_gallery_scale import GALLERY_CONFIG, SITE_DIR, check_preview, sample_latency  # noqa: E402
+from bench_results import DEFAULT_STORE, metric, record_run  # noqa: E402
+from generate_gallery import capacity, generate_gallery  # noqa: E402
+from test_tenrankai_site import (  # noqa: E402
+    BLUE, GREEN, NC, RED, YELLOW,
+    TenrankaiServer, make_session, prepare_bench_config, preview_image_paths,
+)
+
+def print_header(text: str):
+    print(f"\n{YELLOW}{text}{NC}")
+    print("=" * len(text))
+
+def folder_distribution(paths: List[str]) -> Dict[str, Any]:
+    """How preview images are spread over folders and depths"""
+    folders = Counter(os.path.dirname(path) for path in paths)
+    depths = Counter(path.count("/") for path in paths)
+    return {
+        "folders": len(folders),
+        "top_per_folder": max(folders.values(), default=0),
+        "depths": {str(depth): count for depth, count in sorted(depths.items())},
+    }
+
+def bench_settings(images: int, preview: Dict[str, int], args, photos_dir: str) -> List[Dict[str, Any]]:
+    """Start a server with one [preview] setting and sweep ?count= against it"""
+    label = ", ".join(f"{key}={value}" for key, value in preview.items())
+    config = prepare_bench_config("preview", {
+        GALLERY_CONFIG: {
+            "source_directory": photos_dir,
+            "cache_directory": os.path.abspath(os.path.join(SITE_DIR, "bench", "cache", "preview")),
+            **{f"preview.{key}": value for key, value in preview.items()},
+        },
+    })
+    server = TenrankaiServer(config=config, port=args.port, site_dir=SITE_DIR)
+    if not server.start(timeout=args.timeout):
+        print(f"  {RED}✗ {label}: {server.error}{NC}")
+        return [{"images": images, **preview, "error": server.error}]
+
+    rows = []
+    session = make_session(1)
+    try:
+        for count in args.counts:
+            url = f"{server.base_url}/api/gallery/main/preview?count={count}"
+            row: Dict[str, Any] = {"images": images, **preview, "count": count}
+            try:
+                row.update(sample_latency(session, url, args.samples))
+                paths = preview_image_paths(session.get(url, timeout=300).json())
+                row["returned"] = len(paths)
+                row.update(folder_distribution(paths))
+                problems = check_preview(paths, **preview)
+                if len(paths) > count:
+                    problems.append(f"{len(paths)} images > count {count}")
+                row["problems"] = problems
+            except (requests.exceptions.RequestException, ValueError) as e:
+                row["error"] = str(e)
+            rows.append(row)
+    finally:
+        server.stop()
+
+    for row in rows:
+        if "error" in row:
+            print(f"  {RED}✗ {label}, count={row['count']}: {row['error']}{NC}")
+        elif row["problems"]:
+            for problem in row["problems"]:
+                print(f"  {RED}✗ {label}, count={row['count']}: {problem}{NC}")
+    ok = sum(1 for row in rows if "error" not in row and not row["problems"])
+    print(f"  {GREEN if ok == len(rows) else RED}{'✓' if ok == len(rows) else '✗'} {label}: "
+          f"{ok}/{len(rows)} counts within limits{NC}")
+    return rows
+
+def print_report(rows: List[Dict[str, Any]]):
+    print_header("Preview API Summary")
+    print(f"  {'Images':>8} {'max_img':>7} {'depth':>5} {'per_fld':>7} {'count':>5} "
+          f"{'first':>8} {'p50':>8} {'p95':>8} {'Bytes':>8} {'Ret':>4} {'Fldrs':>5} "
+          f"{'Top':>4}  Depths")
+    for r in rows:
+        prefix = f"  {r['images']:>8} {r['max_images']:>7} {r['max_depth']:>5} {r['max_per_folder']:>7}"
+        if "error" in r:
+            print(f"{prefix} {RED}{r['error']}{NC}")
+            continue
+        depths = " ".join(f"d{depth}:{count}" for depth, count in r["depths"].items())
+        flag = f" {RED}✗{NC}" if r["problems"] else ""
+        print(f"{prefix} {r['count']:>5} {r['first_ms']:>6.1f}ms {r['p50_ms']:>6.1f}ms "
+              f"{r['p95_ms']:>6.1f}ms {r['bytes']:>8} {r['returned']:>4} {r['folders']:>5} "
+              f"{r['top_per_folder']:>4}  {depths}{flag}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Tenrankai gallery preview API')
+    parser.add_argument('--steps', type=int, nargs='+', default=[100, 1000, 10000],
+                        help='Gallery sizes to measure (default: 100 1000 10000)')
+    parser.add_argument('--counts', type=int, nargs='+', default=[1, 6, 12, 24, 48],
+                        help='?count= values per setting (default: 1 6 12 24 48)')
+    parser.add_argument('--max-images', type=int, nargs='+', default=[6, 24],
+                        help='[preview] max_images values (default: 6 24)')
+    parser.add_argument('--max-depth', type=int, nargs='+', default=[1, 3],
+                        help='[preview] max_depth values (default: 1 3)')
+    parser.add_argument('--max-per-folder', type=int, nargs='+', default=[1, 4],
+                        help='[preview] max_per_folder values (default: 1 4)')
+    parser.add_argument('--depth', type=int, default=3, help='Folder nesting depth (default: 3)')
+    parser.add_argument('--folders', type=int, default=10, help='Subfolders per folder (default: 10)')
+    parser.add_argument('--images-per-folder', type=int, default=100,
+                        help='Images in each folder (default: 100)')
+    parser.add_argument('--samples', type=int, default=20,
+                        help='Warm requests per URL (default: 20)')
+    parser.add_argument('--port', type=int, default=3465, help='Port to run server on')
+    parser.add_argument('--timeout', type=float, default=600.0,
+                        help='Seconds to wait for the server to scan the tree (default: 600)')
+    parser.add_argument('--json', default=None, help='Write results to this JSON file')
+    parser.add_argument('--results', default=DEFAULT_STORE,
+                        help='Results store for bench_results.py (default: %(default)s)')
+    parser.add_argument('--no-record', action='store_true',
+                        help='Do not append this run to the results store')
+    args = parser.parse_args()
+
+    needed = max(args.steps)
+    if capacity(args.depth, args.folders, args.images_per_folder) < needed:
+        print(f"{RED}✗ --depth/--folders/--images-per-folder hold fewer than {needed} images{NC}")
+        return 1
+
+    photos_dir = os.path.abspath(os.path.join(SITE_DIR, "bench", "photos"))
+    settings = [dict(zip(("max_images", "max_depth", "max_per_folder"), values))
+                for values in itertools.product(args.max_images, args.max_depth, args.max_per_folder)]
+
+    print_header("Tenrankai Preview API Benchmark")
+    print(f"{BLUE}ℹ {len(settings)} [preview] settings × {len(args.counts)} counts per gallery size; "
+          f"tree in {photos_dir}{NC}")
+
+    rows: List[Dict[str, Any]] = []
+    try:
+        for images in sorted(args.steps):
+            print(f"\n{BLUE}{images} images{NC}")
+            start = time.perf_counter()
+            total, created = generate_gallery(photos_dir, args.depth, args.folders,
+                                              args.images_per_folder, images)
+            print(f"  Generated {created} new images in {time.perf_counter() - start:.1f}s ({total} total)")
+            for preview in settings:
+                rows.extend(bench_settings(total, preview, args, photos_dir))
+    except KeyboardInterrupt:
+        print("\n\nInterrupted by user")
+
+    print_report(rows)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+        print(f"\nWrote results to {args.json}")
+    if not args.no_record:
+        metrics = {}
+        for r in rows:
+            if "error" not in r:
+                key = (f"{r['images']} max_images={r['max_images']} max_depth={r['max_depth']} "
+                       f"max_per_folder={r['max_per_folder']} count={r['count']}")
+                metrics[key] = metric(r["samples_ms"])
+        if metrics:
+            run = record_run("preview", "config.toml", metrics, site_dir=SITE_DIR, store=args.results,
+                             extra={"depth": args.depth, "folders": args.folders,
+                                    "images_per_folder": args.images_per_folder})
+            print(f"{BLUE}ℹ Recorded run {run['id']}{NC}")
+
+    ok = rows and all("error" not in r and not r["problems"] for r in rows)
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.11"
+# ///
+"""
+Benchmark results store for Tenrankai
+Benchmarks append one JSON line per run to .bench-results/results.jsonl, keyed
+by the tenrankai submodule commit, the config (name and content hash) and a
+fingerprint of the host. `compare` reduces every run to per-metric aggregates
+(p50, and p95 where runs hold enough samples), tests the candidate runs
+against the baseline runs with a one-sided Mann-Whitney U test per aggregate
+and exits non-zero on a significant regression. Requests within one run are
+not independent, so significance needs several runs on each side.
+
+    uv run bench_results.py list
+    uv run bench_results.py compare --baseline <run id or submodule commit>
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+import tomllib
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+# ANSI color codes
+GREEN = '\033[0;32m'
+RED = '\033[0;31m'
+YELLOW = '\033[1;33m'
+BLUE = '\033[0;34m'
+NC = '\033[0m'  # No Color
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_STORE = os.environ.get("TENRANKAI_RESULTS",
+                               os.path.join(REPO_ROOT, ".bench-results", "results.jsonl"))
+# Samples kept per metric; larger sets are reduced to evenly spaced quantiles
+MAX_SAMPLES = 1000
+# Runs per side needed before a difference can be called significant
+MIN_RUNS = 5
+# Samples a run needs for its p95 to be compared
+MIN_P95_SAMPLES = 20
+
+def submodule_commit(tenrankai_dir: str = "tenrankai") -> str:
+    """Commit checked out in the tenrankai submodule, or "unknown" """
+    try:
+        result = subprocess.run(["git", "submodule", "status", tenrankai_dir], cwd=REPO_ROOT,
+                                capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return "unknown"
+    fields = result.stdout.split()
+    if result.returncode != 0 or not fields:
+        return "unknown"
+    # A leading "-" means the submodule is not checked out
+    if fields[0].startswith("-"):
+        return "unknown"
+    return fields[0].lstrip("+U")
+
+def config_fingerprint(config: str, site_dir: str = "tenrankai-dot-com") -> str:
+    """Hash of a bootstrap config and every file of its ConfigStorage tree"""
+    path = config if os.path.isabs(config) else os.path.join(site_dir, config)
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+    except OSError:
+        return "missing"
+    digest.update(raw)
+    try:
+        storage = tomllib.loads(raw.decode("utf-8")).get("app", {}).get("config_storage")
+    except (tomllib.TOMLDecodeError, UnicodeDecodeError):
+        storage = None
+    if storage:
+        storage_dir = os.path.join(os.path.dirname(path), storage)
+        for file in sorted(glob.glob(os.path.join(storage_dir, "**", "*.toml"), recursive=True)):
+            digest.update(os.path.relpath(file, storage_dir).encode())
+            with open(file, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+def host_info() -> Dict[str, Any]:
+    """Properties of the machine that affect benchmark results"""
+    info: Dict[str, Any] = {
+        "system": platform.system(),
+        "release": platform.release(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "cpu_model": platform.processor(),
+        "memory_kb": None,
+    }
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    info["cpu_model"] = line.split(":", 1)[1].strip()
+                    break
+        with open("/proc/meminfo") as f:
+            info["memory_kb"] = int(f.readline().split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return info
+
+def host_fingerprint(info: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(info, sort_keys=True).encode()).hexdigest()[:12]
+
+def downsample(values: List[float], limit: int = MAX_SAMPLES) -> List[float]:
+    """At most limit evenly spaced quantiles of values, which keeps their distribution"""
+    ordered = sorted(values)
+    if len(ordered) <= limit:
+        return ordered
+    step = (len(ordered) - 1) / (limit - 1)
+    return [ordered[round(i * step)] for i in range(limit)]
+
+def metric(samples: List[float], unit: str = "ms", better: str = "lower") -> Dict[str, Any]:
+    """A metric entry for record_run: samples and which direction is an improvement"""
+    return {"samples": downsample(samples), "unit": unit, "better": better}
+
+def record_run(benchmark: str, config: str, metrics: Dict[str, Dict[str, Any]],
+               site_dir: str = "tenrankai-dot-com", tenrankai_dir: str = "tenrankai",
+               store: Optional[str] = None, extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Append one run to the store and return it"""
+    store = store or DEFAULT_STORE
+    info = host_info()
+    run = {
+        "id": f"{time.strftime('%Y%m%dT%H%M%S')}-{os.urandom(3).hex()}",
+        "timestamp": time.time(),
+        "benchmark": benchmark,
+        "submodule": submodule_commit(tenrankai_dir),
+        "config": os.path.relpath(config, site_dir) if os.path.isabs(config) else config,
+        "config_hash": config_fingerprint(config, site_dir),
+        "host": host_fingerprint(info),
+        "host_info": info,
+        "metrics": {name: m for name, m in metrics.items() if m["samples"]},
+        "extra": extra or {},
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(store)), exist_ok=True)
+    # One write of one line per run: runs are only ever appended
+    with open(store, "a") as f:
+        f.write(json.dumps(run, separators=(",", ":")) + "\n")
+    return run
+
+def load_runs(store: str) -> List[Dict[str, Any]]:
+    runs = []
+    try:
+        with open(store) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        runs.append(json.loads(line))
+                    except ValueError:
+                        continue  # A run interrupted mid-write
+    except OSError:
+        pass
+    return runs
+
+@lru_cache(maxsize=None)
+def u_distribution(n1: int, n2: int) -> Tuple[int, ...]:
+    """Number of orderings of n1 baseline and n2 candidate values giving each U"""
+    if n1 == 0 or n2 == 0:
+        return (1,)
+    # The largest value is either a candidate, beating all n1 baselines, or a baseline
+    with_candidate, with_baseline = u_distribution(n1, n2 - 1), u_distribution(n1 - 1, n2)
+    counts = [0] * (n1 * n2 + 1)
+    for u, count in enumerate(with_candidate):
+        counts[u + n1] += count
+    for u, count in enumerate(with_baseline):
+        counts[u] += count
+    return tuple(counts)
+
+def mann_whitney(baseline: List[float], candidate: List[float], better: str) -> Tuple[float, float]:
+    """One-sided Mann-Whitney U test that candidate is worse than baseline.
+
+    Returns (U statistic of the candidate, p-value). The p-value is exact for
+    small samples without ties, otherwise it uses the normal approximation
+    with tie and continuity corrections.
+    """
+    n1, n2 = len(baseline), len(candidate)
+    combined = sorted([(value, 0) for value in baseline] + [(value, 1) for value in candidate])
+    ranks = [0.0] * len(combined)
+    ties = 0.0
+    i = 0
+    while i < len(combined):
+        j = i
+        while j + 1 < len(combined) and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        count = j - i + 1
+        ties += count ** 3 - count
+        i = j + 1
+    rank_sum = sum(rank for rank, (_, group) in zip(ranks, combined) if group == 1)
+    u = rank_sum - n2 * (n2 + 1) / 2
+    if not ties and n1 + n2 <= 60:
+        counts = u_distribution(n1, n2)
+        # Worse means larger for lower-is-better metrics and smaller otherwise
+        tail = counts[math.ceil(u):] if better == "lower" else counts[:math.floor(u) + 1]
+        return u, sum(tail) / sum(counts)
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+    if variance <= 0:
+        return u, 1.0
+    mean = n1 * n2 / 2
+    # Worse means larger for lower-is-better metrics and smaller otherwise
+    excess = (u - mean) if better == "lower" else (mean - u)
+    z = (excess - 0.5) / math.sqrt(variance)
+    return u, 0.5 * math.erfc(z / math.sqrt(2))
+
+def median(values: List[float]) -> float:
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    return ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+def select_runs(runs: List[Dict[str, Any]], ref: str) -> List[Dict[str, Any]]:
+    """Runs whose id or submodule commit starts with ref"""
+    return [run for run in runs if run["id"].startswith(ref) or run["submodule"].startswith(ref)]
+
+def run_aggregates(runs: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """One value per run for each metric's p50 and, where every run has enough samples, p95"""
+    metrics: Dict[str, Dict[str, Any]] = {}
+    for run in runs:
+        for name, m in run["metrics"].items():
+            entry = metrics.setdefault(name, {"runs": [], "unit": m["unit"], "better": m["better"]})
+            entry["runs"].append(m["samples"])
+    aggregates: Dict[str, Dict[str, Any]] = {}
+    for name, entry in metrics.items():
+        stats = {"p50": 50}
+        if all(len(samples) >= MIN_P95_SAMPLES for samples in entry["runs"]):
+            stats["p95"] = 95
+        for stat, pct in stats.items():
+            aggregates[f"{name} {stat}"] = {
+                "values": [percentile(samples, pct) for samples in entry["runs"]],
+                "unit": entry["unit"], "better": entry["better"],
+            }
+    return aggregates
+
+def smallest_p(n1: int, n2: int) -> float:
+    """Smallest one-sided exact Mann-Whitney p-value n1 and n2 values can reach"""
+    return 1 / math.comb(n1 + n2, n1)
+
+def runs_needed(alpha: float, family: int) -> int:
+    """Runs per side needed for one aggregate of a family of this size to reach Holm's first threshold"""
+    runs = 1
+    while smallest_p(runs, runs) >= alpha / max(family, 1):
+        runs += 1
+    return runs
+
+def underpowered(rows: List[Dict[str, Any]], alpha: float) -> bool:
+    """Whether no tested aggregate could be significant, whatever the data.
+
+    Holm rejects nothing unless some p-value is below alpha / family size, and
+    with few runs even a complete separation gives a larger exact p-value.
+    """
+    tested = [row for row in rows if row["p"] is not None]
+    return bool(tested) and all(smallest_p(row["baseline_n"], row["candidate_n"]) >= alpha / len(tested)
+                                for row in tested)
+
+def compare(baseline_runs: List[Dict[str, Any]], candidate_runs: List[Dict[str, Any]],
+            alpha: float, min_change: float, min_runs: int = MIN_RUNS,
+            metrics: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Test every shared metric aggregate, one value per run.
+
+    Holm's correction keeps the family-wise error rate at alpha. metrics, if
+    given, limits the family to aggregates whose names contain one of them.
+    """
+    baseline, candidate = run_aggregates(baseline_runs), run_aggregates(candidate_runs)
+    names = sorted(set(baseline) & set(candidate))
+    if metrics:
+        names = [name for name in names if any(wanted in name for wanted in metrics)]
+    rows = []
+    for name in names:
+        b, c = baseline[name]["values"], candidate[name]["values"]
+        better = candidate[name]["better"]
+        row = {"metric": name, "unit": candidate[name]["unit"], "better": better,
+               "baseline_n": len(b), "candidate_n": len(c),
+               "baseline_median": median(b), "candidate_median": median(c)}
+        base = row["baseline_median"]
+        row["change"] = (row["candidate_median"] - base) / base if base else 0.0
+        if len(b) < min_runs or len(c) < min_runs:
+            row["p"] = None
+        else:
+            row["p"] = mann_whitney(b, c, better)[1]
+        rows.append(row)
+
+    tested = sorted((row for row in rows if row["p"] is not None), key=lambda row: row["p"])
+    still_rejecting = True
+    for index, row in enumerate(tested):
+        threshold = alpha / (len(tested) - index)
+        still_rejecting = still_rejecting and row["p"] < threshold
+        worse = row["change"] > min_change if row["better"] == "lower" else row["change"] < -min_change
+        row["regression"] = still_rejecting and worse
+    for row in rows:
+        row.setdefault("regression", False)
+    return rows
+
+def print_runs(runs: List[Dict[str, Any]]):
+    print(f"  {'Run':<22} {'Benchmark':<16} {'Submodule':<12} {'Config':<28} {'Host':<12} Metrics")
+    for run in runs:
+        print(f"  {run['id']:<22} {run['benchmark']:<16} {run['submodule'][:10]:<12} "
+              f"{run['config'][:28]:<28} {run['host']:<12} {len(run['metrics'])}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect and compare stored Tenrankai benchmark runs')
+    parser.add_argument('--store', default=DEFAULT_STORE, help='Results file (default: %(default)s)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    list_parser = commands.add_parser('list', help='List stored runs')
+    list_parser.add_argument('--benchmark', default=None, help='Only runs of this benchmark')
+
+    compare_parser = commands.add_parser('compare', help='Test a run against a baseline')
+    compare_parser.add_argument('--baseline', required=True,
+                                help='Run id or submodule commit (prefix) of the baseline runs')
+    compare_parser.add_argument('--candidate', default=None,
+                                help='Run id or submodule commit (prefix); default: the submodule commit of the latest run')
+    compare_parser.add_argument('--benchmark', default=None,
+                                help='Benchmark to compare (default: that of the latest candidate run)')
+    compare_parser.add_argument('--any-host', action='store_true',
+                                help='Also use baseline runs from other hosts and configs')
+    compare_parser.add_argument('--alpha', type=float, default=0.01,
+                                help='Significance level across all metrics (default: 0.01)')
+    compare_parser.add_argument('--min-change', type=float, default=0.03,
+                                help='Ignore median changes smaller than this fraction (default: 0.03)')
+    compare_parser.add_argument('--min-runs', type=int, default=MIN_RUNS,
+                                help='Runs needed on each side to test a metric (default: %(default)s)')
+    compare_parser.add_argument('--metric', action='append', dest='metrics',
+                                help='Only test aggregates whose name contains this (repeatable); '
+                                     'a smaller family needs fewer runs')
+    args = parser.parse_args()
+
+    runs = load_runs(args.store)
+    if args.command == 'list':
+        runs = [run for run in runs if not args.benchmark or run["benchmark"] == args.benchmark]
+        if not runs:
+            print(f"{YELLOW}⚠ No runs in {args.store}{NC}")
+            return 0
+        print_runs(runs)
+        return 0
+
+    candidates = select_runs(runs, args.candidate) if args.candidate else runs
+    if args.benchmark:
+        candidates = [run for run in candidates if run["benchmark"] == args.benchmark]
+    if candidates and not args.candidate:
+        # Every run of the latest run's submodule commit
+        candidates = [run for run in candidates if run["submodule"] == candidates[-1]["submodule"]]
+    if not candidates:
+        print(f"{RED}✗ No candidate runs found{NC}")
+        return 2
+    latest = candidates[-1]
+    candidates = [run for run in candidates if run["benchmark"] == latest["benchmark"]
+                  and run["config_hash"] == latest["config_hash"] and run["host"] == latest["host"]]
+    baselines = [run for run in select_runs(runs, args.baseline)
+                 if run["benchmark"] == latest["benchmark"] and run not in candidates
+                 and (args.any_host or (run["config_hash"] == latest["config_hash"]
+                                        and run["host"] == latest["host"]))]
+    if not baselines:
+        print(f"{RED}✗ No baseline runs of {latest['benchmark']} match '{args.baseline}' "
+              f"on this config and host (use --any-host to widen){NC}")
+        return 2
+
+    print(f"\n{YELLOW}Comparing {latest['benchmark']}{NC}")
+    print(f"  Baseline:  {len(baselines)} run(s), submodule {baselines[-1]['submodule'][:10]}")
+    print(f"  Candidate: {len(candidates)} run(s), submodule {latest['submodule'][:10]}")
+    rows = compare(baselines, candidates, args.alpha, args.min_change, args.min_runs, args.metrics)
+    if not rows:
+        print(f"{RED}✗ The runs share no metrics{NC}")
+        return 2
+    powerless = underpowered(rows, args.alpha)
+
+    print(f"\n  {'Metric':<44} {'Baseline':>10} {'Candidate':>10} {'Change':>8} {'p':>9}  Result")
+    for row in rows:
+        p = f"{row['p']:.2g}" if row["p"] is not None else "-"
+        if row["regression"]:
+            result = f"{RED}regression{NC}"
+        elif row["p"] is None:
+            result = f"{YELLOW}too few runs{NC}"
+        elif powerless:
+            result = f"{YELLOW}underpowered{NC}"
+        else:
+            result = f"{GREEN}ok{NC}"
+        print(f"  {row['metric'][:44]:<44} {row['baseline_median']:>10.2f} {row['candidate_median']:>10.2f} "
+              f"{row['change']:>+7.1%} {p:>9}  {result}")
+
+    regressions = [row for row in rows if row["regression"]]
+    if regressions:
+        print(f"\n{RED}✗ {len(regressions)} significant regression(s) at alpha {args.alpha}{NC}")
+        return 1
+    if powerless:
+        family = sum(1 for row in rows if row["p"] is not None)
+        fewest = min(min(row["baseline_n"], row["candidate_n"]) for row in rows if row["p"] is not None)
+        print(f"\n{YELLOW}⚠ No regression can be detected: with {family} aggregates Holm needs p < "
+              f"{args.alpha / family:.2g}, but {fewest} runs per side reach at best "
+              f"{smallest_p(fewest, fewest):.2g}. Record {runs_needed(args.alpha, family)} runs per side, "
+              f"or narrow the family with --metric.{NC}")
+        return 2
+    print(f"\n{GREEN}✓ No significant regressions at alpha {args.alpha}{NC}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
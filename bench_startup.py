@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.11"
+# dependencies = ["requests"]
+# ///
+"""
+Cold-start benchmark for Tenrankai
+Launches the release binary repeatedly for each bootstrap config and measures
+time from Popen to the port accepting connections and to the first 200 on /
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+from typing import Any, Dict, List, Optional
+
+from bench_results import DEFAULT_STORE, metric, record_run
+from test_tenrankai_site import (
+    BLUE, GREEN, NC, RED, YELLOW,
+    TenrankaiServer, load_gallery_configs,
+)
+
+DEFAULT_CONFIGS = ["config.toml", "config.dev.toml", "config.production.toml"]
+SITE_DIR = "tenrankai-dot-com"
+
+def print_header(text: str):
+    print(f"\n{YELLOW}{text}{NC}")
+    print("=" * len(text))
+
+def cache_directories(config: str) -> List[str]:
+    """Local gallery cache directories used by a config (S3 caches are skipped)"""
+    dirs = []
+    for gallery in load_gallery_configs(config, SITE_DIR):
+        cache_dir = gallery.get("cache_directory")
+        if cache_dir and "://" not in cache_dir:
+            dirs.append(os.path.join(SITE_DIR, cache_dir))
+    return dirs
+
+def clear_caches(config: str):
+    for cache_dir in cache_directories(config):
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+def spread(values: List[float]) -> Dict[str, float]:
+    """Median and spread of a list of seconds, reported in milliseconds"""
+    if not values:
+        return {}
+    return {
+        "median_ms": statistics.median(values) * 1000,
+        "min_ms": min(values) * 1000,
+        "max_ms": max(values) * 1000,
+        "stdev_ms": (statistics.stdev(values) if len(values) > 1 else 0.0) * 1000,
+    }
+
+def run_once(config: str, port: int, timeout: float) -> Optional[Dict[str, float]]:
+    """Start and stop the server once, returning its startup timings or None on failure"""
+    server = TenrankaiServer(config=config, port=port, site_dir=SITE_DIR)
+    # Probe every 1-2 ms so the timings resolve startup regressions
+    ready = server.start(timeout=timeout, initial_delay=0.001, max_delay=0.002)
+    server.stop()
+    if not ready:
+        print(f"  {RED}✗ {server.error}{NC}")
+        return None
+    return {"port_open": server.port_open_after, "first_ok": server.ready_after}
+
+def bench_config(config: str, mode: str, runs: int, port: int, timeout: float) -> Dict[str, Any]:
+    """Benchmark one config with either an empty ("cold") or primed ("warm") cache"""
+    print(f"\n{BLUE}{config} ({mode} cache, {runs} runs){NC}")
+    if mode == "warm":
+        # One unrecorded run so the cache exists before measuring
+        run_once(config, port, timeout)
+    
+    samples = []
+    failures = 0
+    for _ in range(runs):
+        if mode == "cold":
+            clear_caches(config)
+        sample = run_once(config, port, timeout)
+        if sample is None:
+            failures += 1
+        else:
+            samples.append(sample)
+    
+    result = {
+        "config": config,
+        "cache": mode,
+        "runs": runs,
+        "failures": failures,
+        "port_open": spread([s["port_open"] for s in samples]),
+        "first_ok": spread([s["first_ok"] for s in samples]),
+        "samples": samples,
+    }
+    if samples:
+        print(f"  {GREEN}✓ port open median {result['port_open']['median_ms']:.1f}ms, "
+              f"first 200 median {result['first_ok']['median_ms']:.1f}ms{NC}")
+    return result
+
+def print_report(results: List[Dict[str, Any]]):
+    print_header("Startup Summary")
+    print(f"  {'Config':<24} {'Cache':<5} {'OK':>5}   {'Port open (ms)':<28} {'First 200 (ms)':<28}")
+    print(f"  {'':<24} {'':<5} {'':>5}   {'median':>8} {'min':>6} {'max':>6} {'sd':>5}  "
+          f"{'median':>8} {'min':>6} {'max':>6} {'sd':>5}")
+    for r in results:
+        ok = f"{r['runs'] - r['failures']}/{r['runs']}"
+        line = f"  {r['config']:<24} {r['cache']:<5} {ok:>5}   "
+        for key in ("port_open", "first_ok"):
+            stats = r[key]
+            if stats:
+                line += (f"{stats['median_ms']:>8.1f} {stats['min_ms']:>6.1f} "
+                         f"{stats['max_ms']:>6.1f} {stats['stdev_ms']:>5.1f}  ")
+            else:
+                line += f"{'-':>8} {'-':>6} {'-':>6} {'-':>5}  "
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Tenrankai cold-start time')
+    parser.add_argument('--configs', nargs='+', default=DEFAULT_CONFIGS,
+                        help='Bootstrap configs to benchmark (default: all three)')
+    parser.add_argument('--runs', type=int, default=10, help='Launches per config (default: 10)')
+    parser.add_argument('--cache', nargs='+', choices=['cold', 'warm'], default=['cold'],
+                        help='Cache modes: cold empties the gallery cache before every run (default: cold)')
+    parser.add_argument('--port', type=int, default=3461, help='Port to run server on')
+    parser.add_argument('--timeout', type=float, default=30.0,
+                        help='Seconds to wait for each start (default: 30)')
+    parser.add_argument('--json', default=None, help='Write results to this JSON file')
+    parser.add_argument('--results', default=DEFAULT_STORE,
+                        help='Results store for bench_results.py (default: %(default)s)')
+    parser.add_argument('--no-record', action='store_true',
+                        help='Do not append these runs to the results store')
+    args = parser.parse_args()
+    
+    if not os.path.exists("tenrankai/target/release/tenrankai"):
+        print(f"{RED}✗ Release binary not found, run 'make build' first{NC}")
+        return 1
+    
+    print_header("Tenrankai Startup Benchmark")
+    results = []
+    try:
+        for config in args.configs:
+            for mode in args.cache:
+                results.append(bench_config(config, mode, args.runs, args.port, args.timeout))
+    except KeyboardInterrupt:
+        print("\n\nInterrupted by user")
+    
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote results to {args.json}")
+    if not args.no_record:
+        # One stored run per config, so each is compared against the same config
+        for config in args.configs:
+            metrics = {}
+            for r in results:
+                if r["config"] == config:
+                    for key in ("port_open", "first_ok"):
+                        metrics[f"{r['cache']} {key}"] = metric([s[key] * 1000 for s in r["samples"]])
+            if any(m["samples"] for m in metrics.values()):
+                run = record_run("startup", config, metrics, site_dir=SITE_DIR, store=args.results)
+                print(f"{BLUE}ℹ Recorded {config} as run {run['id']}{NC}")
+    
+    return 0 if results and all(r["failures"] == 0 for r in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.11"
+# dependencies = ["requests", "pillow"]
+# ///
+"""
+Tile zoom benchmark for Tenrankai
+Opens large images in tile-zoom mode and requests every tile of every zoom
+level, coarsest first, the way the viewer does as a user zooms in. Reports
+per-level cold (generation) and warm latency, tiles generated and cache bytes
+"""
+
+import argparse
+import json
+import math
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+import requests
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+from bench_results import DEFAULT_STORE, metric, record_run  # noqa: E402
+from bench_variants import directory_bytes  # noqa: E402
+from generate_gallery import parse_size, write_image  # noqa: E402
+from test_tenrankai_site import (  # noqa: E402
+    BLUE, GREEN, NC, RED, YELLOW,
+    TenrankaiServer, make_session, percentile, prepare_bench_config,
+)
+
+SITE_DIR = "tenrankai-dot-com"
+GALLERY_CONFIG = "sites/default/galleries/main.toml"
+SEED_IMAGE = os.path.join(SITE_DIR, "photos", "landscapes", "CRW_1978.jpg")
+# Placeholders: {prefix} {image} {level} (halvings from full size) {zoom} (0 = coarsest) {x} {y}
+DEFAULT_TILE_URL = "{prefix}/{image}?tile={level}/{x}/{y}"
+
+def print_header(text: str):
+    print(f"\n{YELLOW}{text}{NC}")
+    print("=" * len(text))
+
+def zoom_levels(width: int, height: int, tile_size: int) -> List[Dict[str, int]]:
+    """Levels from full size down to the first that fits one tile, coarsest first"""
+    levels = []
+    level = 0
+    while True:
+        w, h = math.ceil(width / 2 ** level), math.ceil(height / 2 ** level)
+        levels.append({"level": level, "width": w, "height": h,
+                       "columns": math.ceil(w / tile_size), "rows": math.ceil(h / tile_size)})
+        if w <= tile_size and h <= tile_size:
+            break
+        level += 1
+    levels.reverse()
+    for zoom, entry in enumerate(levels):
+        entry["zoom"] = zoom
+    return levels
+
+def tile_urls(template: str, prefix: str, image: str, level: Dict[str, int]) -> List[str]:
+    """Every tile of one level, row by row"""
+    return [template.format(prefix=prefix, image=image, level=level["level"], zoom=level["zoom"], x=x, y=y)
+            for y in range(level["rows"]) for x in range(level["columns"])]
+
+def fetch_tiles(session: requests.Session, base_url: str, urls: List[str],
+                concurrency: int) -> Tuple[float, List[Tuple[int, float, int]]]:
+    """Request tiles like a viewer opening a level; returns (wall seconds, [(status, seconds, bytes)])"""
+    def fetch(url: str) -> Tuple[int, float, int]:
+        start = time.perf_counter()
+        try:
+            response = session.get(f"{base_url}{url}", timeout=300)
+        except requests.exceptions.RequestException:
+            return 0, time.perf_counter() - start, 0
+        return response.status_code, time.perf_counter() - start, len(response.content)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(fetch, urls))
+    return time.perf_counter() - start, results
+
+def latency_stats(results: List[Tuple[int, float, int]]) -> Dict[str, Any]:
+    timings = sorted(seconds for status, seconds, _ in results if status == 200)
+    return {
+        "p50_ms": percentile(timings, 50) * 1000,
+        "p95_ms": percentile(timings, 95) * 1000,
+        "max_ms": (timings[-1] if timings else 0.0) * 1000,
+        "samples_ms": [t * 1000 for t in timings],
+    }
+
+def bench_image(session: requests.Session, server: TenrankaiServer, args, image: str,
+                size: Tuple[int, int], cache_dir: str) -> List[Dict[str, Any]]:
+    levels = zoom_levels(size[0], size[1], args.tile_size)
+    print(f"\n{BLUE}{image} ({size[0]}x{size[1]}, {len(levels)} levels, "
+          f"{sum(l['columns'] * l['rows'] for l in levels)} tiles){NC}")
+    rows = []
+    for level in levels:
+        urls = tile_urls(args.tile_url, args.prefix, image, level)
+        cache_before = directory_bytes(cache_dir)
+        cold_wall, cold = fetch_tiles(session, server.base_url, urls, args.concurrency)
+        time.sleep(args.settle)
+        cache_written = directory_bytes(cache_dir) - cache_before
+        warm_wall, warm = fetch_tiles(session, server.base_url, urls, args.concurrency)
+        row = {
+            "image": image,
+            "zoom": level["zoom"],
+            "level": level["level"],
+            "dimensions": f"{level['width']}x{level['height']}",
+            "tiles": len(urls),
+            "generated": sum(1 for status, _, _ in cold if status == 200),
+            "failed": sum(1 for status, _, _ in cold + warm if status != 200),
+            "bytes": sum(length for _, _, length in cold),
+            "cache_bytes_written": cache_written,
+            "cold_wall_ms": cold_wall * 1000,
+            "warm_wall_ms": warm_wall * 1000,
+            "cold": latency_stats(cold),
+            "warm": latency_stats(warm),
+        }
+        rows.append(row)
+        mark = f"{GREEN}✓{NC}" if not row["failed"] else f"{RED}✗ {row['failed']} failed{NC}"
+        print(f"  zoom {row['zoom']} {row['dimensions']:>11} {row['tiles']:>4} tiles  "
+              f"cold {row['cold']['p50_ms']:>7.1f}ms p50, {row['cold_wall_ms']:>8.1f}ms burst  "
+              f"warm {row['warm']['p50_ms']:>6.1f}ms p50  {mark}")
+    return rows
+
+def print_report(rows: List[Dict[str, Any]], cache_total: int):
+    print_header("Tile Zoom Summary")
+    print(f"  {'Image':<24} {'Zoom':>4} {'Size':>11} {'Tiles':>5} {'Cold p50':>9} {'Cold p95':>9} "
+          f"{'Burst':>9} {'Warm p50':>9} {'Warm p95':>9} {'Bytes':>10} {'Cache +':>10}")
+    for r in rows:
+        print(f"  {r['image'][:24]:<24} {r['zoom']:>4} {r['dimensions']:>11} {r['tiles']:>5} "
+              f"{r['cold']['p50_ms']:>7.1f}ms {r['cold']['p95_ms']:>7.1f}ms {r['cold_wall_ms']:>7.0f}ms "
+              f"{r['warm']['p50_ms']:>7.1f}ms {r['warm']['p95_ms']:>7.1f}ms "
+              f"{r['bytes']:>10} {r['cache_bytes_written']:>10}")
+    generated = sum(r["generated"] for r in rows)
+    print(f"\n  {generated} tiles generated, {cache_total / 1048576:.1f}MB written to the tile cache")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Tenrankai tile zoom')
+    parser.add_argument('--synthetic', type=parse_size, nargs='*', default=[(8000, 6000)],
+                        help='Synthetic images to add, as WIDTHxHEIGHT (default: 8000x6000)')
+    parser.add_argument('--tile-size', type=int, default=1024,
+                        help='[tiles] tile_size for the bench gallery (default: 1024)')
+    parser.add_argument('--tile-url', default=DEFAULT_TILE_URL,
+                        help=f'Tile URL template (default: {DEFAULT_TILE_URL})')
+    parser.add_argument('--prefix', default='/gallery', help='Gallery URL prefix (default: /gallery)')
+    parser.add_argument('--concurrency', type=int, default=6,
+                        help='Tiles requested at once, like a browser (default: 6)')
+    parser.add_argument('--settle', type=float, default=0.2,
+                        help='Seconds to wait before measuring cache growth (default: 0.2)')
+    parser.add_argument('--port', type=int, default=3469, help='Port to run server on')
+    parser.add_argument('--json', default=None, help='Write results to this JSON file')
+    parser.add_argument('--results', default=DEFAULT_STORE,
+                        help='Results store for bench_results.py (default: %(default)s)')
+    parser.add_argument('--no-record', action='store_true',
+                        help='Do not append this run to the results store')
+    args = parser.parse_args()
+
+    source_dir = os.path.abspath(os.path.join(SITE_DIR, "bench", "tiles"))
+    cache_dir = os.path.abspath(os.path.join(SITE_DIR, "bench", "cache", "tiles"))
+    os.makedirs(source_dir, exist_ok=True)
+    images = [os.path.basename(SEED_IMAGE)]
+    shutil.copyfile(SEED_IMAGE, os.path.join(source_dir, images[0]))
+    for index, (width, height) in enumerate(args.synthetic):
+        name = f"synthetic_{width}x{height}.jpg"
+        if not os.path.exists(os.path.join(source_dir, name)):
+            write_image(os.path.join(source_dir, name), index, (width, height))
+        images.append(name)
+    sizes = {}
+    for image in images:
+        with Image.open(os.path.join(source_dir, image)) as opened:
+            sizes[image] = opened.size
+
+    # Start from an empty cache so every first tile request generates the tile
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.makedirs(cache_dir, exist_ok=True)
+    config = prepare_bench_config("tiles", {
+        GALLERY_CONFIG: {
+            "source_directory": source_dir,
+            "cache_directory": cache_dir,
+            "tiles.tile_size": args.tile_size,
+        },
+    })
+
+    print_header("Tenrankai Tile Zoom Benchmark")
+    print(f"{BLUE}ℹ {len(images)} images, tile size {args.tile_size}, {args.concurrency} concurrent, "
+          f"tiles at {args.tile_url}{NC}")
+    server = TenrankaiServer(config=config, port=args.port, site_dir=SITE_DIR)
+    if not server.start(timeout=60):
+        print(f"{RED}✗ {server.error}{NC}")
+        print(server.output(40))
+        return 1
+
+    rows: List[Dict[str, Any]] = []
+    session = make_session(args.concurrency)
+    try:
+        for image in images:
+            rows.extend(bench_image(session, server, args, image, sizes[image], cache_dir))
+    except KeyboardInterrupt:
+        print("\n\nInterrupted by user")
+    finally:
+        session.close()
+        server.stop()
+
+    cache_total = directory_bytes(cache_dir)
+    print_report(rows, cache_total)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"levels": rows, "cache_bytes": cache_total}, f, indent=2)
+        print(f"\nWrote results to {args.json}")
+    if not args.no_record and rows:
+        metrics = {}
+        for r in rows:
+            level = f"{r['image']} zoom {r['zoom']}"
+            metrics[f"{level} cold"] = metric(r["cold"]["samples_ms"])
+            metrics[f"{level} warm"] = metric(r["warm"]["samples_ms"])
+            metrics[f"{level} burst"] = metric([r["cold_wall_ms"]])
+        run = record_run("tiles", "config.toml", metrics, site_dir=SITE_DIR, store=args.results,
+                         extra={"tile_size": args.tile_size, "concurrency": args.concurrency})
+        print(f"{BLUE}ℹ Recorded run {run['id']}{NC}")
+
+    ok = rows and all(not r["failed"] for r in rows)
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.11"
+# dependencies = ["requests"]
+# ///
+"""
+Image variant generation benchmark for Tenrankai
+Requests every size of every gallery image in JPEG, WebP and AVIF starting from
+an empty cache, and reports first-hit (generation) and warm-hit latency
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+import requests
+
+from bench_results import DEFAULT_STORE, metric, record_run
+from test_tenrankai_site import (
+    BLUE, GREEN, NC, RED, YELLOW,
+    TenrankaiServer, find_images, load_gallery_configs, make_session,
+)
+
+SITE_DIR = "tenrankai-dot-com"
+
+# URL size name -> gallery config table holding its dimensions
+SIZES = [
+    ("thumbnail", "thumbnail"),
+    ("gallery", "gallery_size"),
+    ("medium", "medium"),
+    ("large", "large"),
+]
+
+# Accept headers a browser sends when it prefers each format
+FORMATS = {
+    "jpeg": "image/jpeg,image/*;q=0.8",
+    "webp": "image/webp,image/jpeg;q=0.9,image/*;q=0.8",
+    "avif": "image/avif,image/webp;q=0.9,image/jpeg;q=0.8,image/*;q=0.7",
+}
+
+def print_header(text: str):
+    print(f"\n{YELLOW}{text}{NC}")
+    print("=" * len(text))
+
+def directory_bytes(path: str) -> int:
+    """Total size of all files below path"""
+    total = 0
+    stack = [path]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    total += entry.stat(follow_symlinks=False).st_size
+    return total
+
+def timed_get(session: requests.Session, url: str, accept: str) -> Tuple[float, requests.Response]:
+    start = time.perf_counter()
+    response = session.get(url, headers={"Accept": accept}, timeout=300)
+    return time.perf_counter() - start, response
+
+def bench_variant(session: requests.Session, base_url: str, url_prefix: str, image: str,
+                  size: str, fmt: str, cache_dir: str, warm_runs: int, settle: float) -> Dict[str, Any]:
+    """Time the first (generating) request for one variant, then the warm repeats"""
+    url = f"{base_url}{url_prefix}/{image}?size={size}"
+    accept = FORMATS[fmt]
+    
+    cache_before = directory_bytes(cache_dir)
+    cold, response = timed_get(session, url, accept)
+    # Give asynchronous cache writes a moment to land before measuring them
+    time.sleep(settle)
+    cache_written = directory_bytes(cache_dir) - cache_before
+    
+    result = {
+        "image": image,
+        "size": size,
+        "format": fmt,
+        "status": response.status_code,
+        "content_type": response.headers.get("Content-Type", ""),
+        "bytes": len(response.content),
+        "cold_ms": cold * 1000,
+        "cache_bytes_written": cache_written,
+    }
+    if response.status_code != 200:
+        return result
+    
+    warm = [timed_get(session, url, accept)[0] for _ in range(warm_runs)]
+    result["warm_ms"] = statistics.median(warm) * 1000
+    return result
+
+def print_report(results: List[Dict[str, Any]], dimensions: Dict[str, str]):
+    print_header("Variant Generation Summary")
+    print(f"  {'Image':<28} {'Size':<18} {'Fmt':<5} {'Served':<11} {'Cold':>9} {'Warm':>8} "
+          f"{'Ratio':>6} {'Bytes':>9} {'Cache +':>9}")
+    for r in results:
+        size = f"{r['size']} {dimensions.get(r['size'], '')}"
+        served = r["content_type"].split(";")[0].replace("image/", "") or "-"
+        if r["status"] != 200:
+            print(f"  {r['image']:<28} {size:<18} {r['format']:<5} {RED}HTTP {r['status']}{NC}")
+            continue
+        ratio = r["cold_ms"] / r["warm_ms"] if r["warm_ms"] else 0.0
+        print(f"  {r['image']:<28} {size:<18} {r['format']:<5} {served:<11} "
+              f"{r['cold_ms']:>7.1f}ms {r['warm_ms']:>6.1f}ms {ratio:>5.0f}x "
+              f"{r['bytes']:>9} {r['cache_bytes_written']:>9}")
+    
+    ok = [r for r in results if r["status"] == 200]
+    if ok:
+        worst = max(ok, key=lambda r: r["cold_ms"])
+        print(f"\n  Worst first hit: {worst['image']} {worst['size']} {worst['format']} "
+              f"{worst['cold_ms']:.1f}ms")
+        for fmt in FORMATS:
+            cold = [r["cold_ms"] for r in ok if r["format"] == fmt]
+            if cold:
+                print(f"  {fmt:<5} median first hit {statistics.median(cold):.1f}ms "
+                      f"over {len(cold)} variants")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Tenrankai image variant generation')
+    parser.add_argument('--config', default='config.toml', help='Config file to use')
+    parser.add_argument('--gallery', default='main', help='Gallery name (default: main)')
+    parser.add_argument('--image', action='append', dest='images',
+                        help='Image path relative to the gallery source (repeatable, default: all)')
+    parser.add_argument('--formats', nargs='+', choices=list(FORMATS), default=list(FORMATS),
+                        help='Formats to request via Accept (default: all)')
+    parser.add_argument('--warm-runs', type=int, default=5,
+                        help='Warm requests per variant; the median is reported (default: 5)')
+    parser.add_argument('--settle', type=float, default=0.2,
+                        help='Seconds to wait before measuring cache growth (default: 0.2)')
+    parser.add_argument('--port', type=int, default=3462, help='Port to run server on')
+    parser.add_argument('--json', default=None, help='Write results to this JSON file')
+    parser.add_argument('--results', default=DEFAULT_STORE,
+                        help='Results store for bench_results.py (default: %(default)s)')
+    parser.add_argument('--no-record', action='store_true',
+                        help='Do not append this run to the results store')
+    args = parser.parse_args()
+    
+    galleries = [g for g in load_gallery_configs(args.config, SITE_DIR) if g.get("name") == args.gallery]
+    if not galleries:
+        print(f"{RED}✗ Gallery '{args.gallery}' not found in {args.config}{NC}")
+        return 1
+    gallery = galleries[0]
+    source_dir = os.path.join(SITE_DIR, gallery["source_directory"])
+    cache_dir = os.path.join(SITE_DIR, gallery["cache_directory"])
+    url_prefix = gallery.get("url_prefix", "/gallery").rstrip("/")
+    if "://" in source_dir or "://" in cache_dir:
+        print(f"{RED}✗ Only local source and cache directories are supported{NC}")
+        return 1
+    
+    dimensions = {}
+    for size, table in SIZES:
+        if table in gallery:
+            dimensions[size] = f"{gallery[table].get('width')}x{gallery[table].get('height')}"
+    
+    images = args.images or find_images(source_dir)
+    if not images:
+        print(f"{RED}✗ No images found in {source_dir}{NC}")
+        return 1
+    
+    print_header("Tenrankai Variant Generation Benchmark")
+    print(f"{BLUE}ℹ {len(images)} images x {len(SIZES)} sizes x {len(args.formats)} formats, "
+          f"jpeg_quality {gallery.get('jpeg_quality')}, webp_quality {gallery.get('webp_quality')}{NC}")
+    if gallery.get("pregenerate"):
+        print(f"{YELLOW}⚠ [pregenerate] is enabled; first hits may be served from pre-generated files{NC}")
+    
+    # Empty the cache before the server starts so no variant survives in memory or on disk
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.makedirs(cache_dir, exist_ok=True)
+    print(f"{GREEN}✓ Emptied {cache_dir}{NC}")
+    
+    server = TenrankaiServer(config=args.config, port=args.port, site_dir=SITE_DIR)
+    if not server.start(timeout=30):
+        print(f"{RED}✗ {server.error}{NC}")
+        print(server.output(40))
+        return 1
+    
+    results = []
+    session = make_session(1)
+    try:
+        for image in images:
+            print(f"\n{BLUE}{image}{NC}")
+            for size, _ in SIZES:
+                for fmt in args.formats:
+                    r = bench_variant(session, server.base_url, url_prefix, image, size, fmt,
+                                      cache_dir, args.warm_runs, args.settle)
+                    results.append(r)
+                    if r["status"] == 200:
+                        print(f"  {GREEN}✓ {size:<9} {fmt:<5} cold {r['cold_ms']:7.1f}ms  "
+                              f"warm {r['warm_ms']:6.1f}ms{NC}")
+                    else:
+                        print(f"  {RED}✗ {size:<9} {fmt:<5} HTTP {r['status']}{NC}")
+    except KeyboardInterrupt:
+        print("\n\nInterrupted by user")
+    except requests.exceptions.RequestException as e:
+        print(f"{RED}✗ Request failed: {e}{NC}")
+    finally:
+        server.stop()
+    
+    print_report(results, dimensions)
+    print(f"\n  Cache size after run: {directory_bytes(cache_dir)} bytes in {cache_dir}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote results to {args.json}")
+    if not args.no_record:
+        metrics = {}
+        for size, _ in SIZES:
+            for fmt in args.formats:
+                ok = [r for r in results if r["size"] == size and r["format"] == fmt and r["status"] == 200]
+                metrics[f"{size} {fmt} cold"] = metric([r["cold_ms"] for r in ok])
+                metrics[f"{size} {fmt} warm"] = metric([r["warm_ms"] for r in ok])
+        if any(m["samples"] for m in metrics.values()):
+            run = record_run("variants", args.config, metrics, site_dir=SITE_DIR, store=args.results,
+                             extra={"gallery": args.gallery, "images": images})
+            print(f"{BLUE}ℹ Recorded run {run['id']}{NC}")
+    
+    return 0 if results and all(r["status"] == 200 for r in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.11"
+# dependencies = ["requests"]
+# ///
+"""
+Virtual-host routing benchmark for Tenrankai
+Adds growing numbers of synthetic sites (scripts/generate_sites.py) with exact,
+wildcard-subdomain and catch-all hostnames, checks that every Host header is
+routed to the right site, and measures throughput and latency while requests
+are spread across all of those hosts
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tomllib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+from bench_results import DEFAULT_STORE, downsample, metric, record_run  # noqa: E402
+from generate_sites import DOMAIN, SITE_MARKER, generate_sites, write_marker  # noqa: E402
+from test_tenrankai_site import (  # noqa: E402
+    BLUE, GREEN, NC, RED, YELLOW,
+    TenrankaiServer, make_session, prepare_bench_config, summarize_latencies,
+)
+
+SITE_DIR = "tenrankai-dot-com"
+DEFAULT_SITE = "sites/default/site.toml"
+MATCH_CLASSES = ["exact", "wildcard", "priority", "catch-all"]
+
+# (match class, Host header, expected site)
+HostCase = Tuple[str, str, str]
+
+def print_header(text: str):
+    print(f"\n{YELLOW}{text}{NC}")
+    print("=" * len(text))
+
+def absolute_paths(value: Any) -> List[str]:
+    """Site directories from site.toml (a path or a list) made absolute against SITE_DIR"""
+    paths = value if isinstance(value, list) else [value]
+    return [os.path.abspath(os.path.join(SITE_DIR, path)) for path in paths]
+
+def host_cases(sites: List[Dict[str, Any]], catch_all: int) -> List[HostCase]:
+    """Host headers covering every generated site plus unmatched hosts for the default site"""
+    cases = []
+    for site in sites:
+        hostname = site["hostnames"][0]
+        if site["kind"] == "wildcard":
+            # Any subdomain except www, which vh-priority claims for w0000
+            cases.append(("wildcard", hostname.replace("*", "client"), site["name"]))
+        else:
+            cases.append((site["kind"], hostname, site["name"]))
+    cases += [("catch-all", f"unknown{i}.other.test", "default") for i in range(catch_all)]
+    return cases
+
+def check_routing(base_url: str, cases: List[HostCase], workers: int) -> List[str]:
+    """Request the site marker with each Host header and return routing mistakes"""
+    session = make_session(workers)
+
+    def check(case: HostCase) -> str:
+        _, host, expected = case
+        try:
+            response = session.get(f"{base_url}/static/{SITE_MARKER}", headers={"Host": host}, timeout=30)
+        except requests.exceptions.RequestException as e:
+            return f"{host}: {e}"
+        if response.status_code != 200:
+            return f"{host}: HTTP {response.status_code}"
+        if response.text.strip() != expected:
+            return f"{host}: served by {response.text.strip()[:40]!r}, expected {expected!r}"
+        return ""
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        problems = [problem for problem in pool.map(check, cases) if problem]
+    session.close()
+    return problems
+
+def run_load(base_url: str, cases: List[HostCase], path: str, concurrency: int,
+             duration: float) -> Dict[str, Dict[str, float]]:
+    """Closed-loop load with a random match class, then a random host of that class, per request"""
+    by_class: Dict[str, List[str]] = {}
+    for match, host, _ in cases:
+        by_class.setdefault(match, []).append(host)
+    classes = sorted(by_class)
+    stop_at = time.perf_counter() + duration
+
+    def worker(index: int) -> Dict[str, Tuple[List[float], int]]:
+        rng = random.Random(index)
+        session = make_session(1)
+        latencies: Dict[str, List[float]] = {match: [] for match in classes}
+        errors = {match: 0 for match in classes}
+        while time.perf_counter() < stop_at:
+            match = rng.choice(classes)
+            host = rng.choice(by_class[match])
+            start = time.perf_counter()
+            try:
+                ok = session.get(f"{base_url}{path}", headers={"Host": host}, timeout=10).status_code < 400
+            except requests.exceptions.RequestException:
+                ok = False
+            if ok:
+                latencies[match].append(time.perf_counter() - start)
+            else:
+                errors[match] += 1
+        session.close()
+        return {match: (latencies[match], errors[match]) for match in classes}
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        partials = list(pool.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    stats = {}
+    all_latencies: List[float] = []
+    all_errors = 0
+    for match in classes:
+        latencies = [value for partial in partials for value in partial[match][0]]
+        errors = sum(partial[match][1] for partial in partials)
+        stats[match] = summarize_latencies(latencies, errors, elapsed)
+        stats[match]["samples_ms"] = downsample([value * 1000 for value in latencies])
+        all_latencies += latencies
+        all_errors += errors
+    stats["TOTAL"] = summarize_latencies(all_latencies, all_errors, elapsed)
+    return stats
+
+def bench_step(total: int, args, default_site: Dict[str, Any]) -> Dict[str, Any]:
+    wildcard = round(total * args.wildcard_fraction)
+    exact = total - wildcard
+    print(f"\n{BLUE}{total} sites ({exact} exact, {wildcard} wildcard){NC}")
+
+    marker_root = os.path.abspath(os.path.join(SITE_DIR, "bench", "vhosts-static"))
+    templates = absolute_paths(default_site["templates"])
+    static_files = absolute_paths(default_site["static_files"])
+    config = prepare_bench_config("vhosts", {
+        DEFAULT_SITE: {"static_files": [os.path.join(marker_root, "default")] + static_files},
+    })
+    storage_dir = os.path.join(os.path.dirname(config), "config.d")
+    sites = generate_sites(storage_dir, marker_root, exact, wildcard, templates, static_files)
+    write_marker(marker_root, "default")
+    cases = host_cases(sites, args.catch_all)
+
+    server = TenrankaiServer(config=config, port=args.port, site_dir=SITE_DIR)
+    if not server.start(timeout=args.timeout):
+        print(f"  {RED}✗ {server.error}{NC}")
+        print(server.output(40))
+        return {"sites": len(sites), "error": server.error}
+
+    result: Dict[str, Any] = {"sites": len(sites), "startup_ms": server.ready_after * 1000}
+    try:
+        # Check an even sample when there are more hosts than --check-limit
+        stride = max(1, len(cases) // args.check_limit)
+        checked = cases[::stride]
+        result["checked"] = len(checked)
+        result["misrouted"] = check_routing(server.base_url, checked, args.concurrency)
+        result["load"] = run_load(server.base_url, cases, args.path, args.concurrency, args.duration)
+    finally:
+        server.stop()
+
+    if result["misrouted"]:
+        for problem in result["misrouted"][:10]:
+            print(f"  {RED}✗ {problem}{NC}")
+        print(f"  {RED}✗ {len(result['misrouted'])} of {result['checked']} hosts misrouted{NC}")
+    else:
+        print(f"  {GREEN}✓ {result['checked']} hosts routed correctly{NC}")
+    total_stats = result["load"]["TOTAL"]
+    print(f"  {GREEN}✓ ready {result['startup_ms']:.0f}ms, {total_stats['rps']:.0f} req/s, "
+          f"p99 {total_stats['p99_ms']:.1f}ms{NC}")
+    return result
+
+def print_report(results: List[Dict[str, Any]]):
+    print_header("Virtual-Host Routing Summary")
+    print(f"  {'Sites':>6} {'Startup':>9} {'Routed':>11} {'Class':<10} {'Req/s':>9} "
+          f"{'p50':>8} {'p99':>8} {'Err%':>6}")
+    for r in results:
+        if "error" in r:
+            print(f"  {r['sites']:>6} {RED}{r['error']}{NC}")
+            continue
+        routed = f"{r['checked'] - len(r['misrouted'])}/{r['checked']}"
+        first = True
+        for match in MATCH_CLASSES + ["TOTAL"]:
+            stats = r["load"].get(match)
+            if not stats:
+                continue
+            lead = f"  {r['sites']:>6} {r['startup_ms']:>7.0f}ms {routed:>11}" if first else " " * 31
+            first = False
+            print(f"{lead} {match:<10} {stats['rps']:>9.1f} {stats['p50_ms']:>6.1f}ms "
+                  f"{stats['p99_ms']:>6.1f}ms {stats['error_rate'] * 100:>5.1f}%")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Tenrankai virtual-host routing')
+    parser.add_argument('--steps', type=int, nargs='+', default=[10, 100, 1000],
+                        help='Synthetic site counts to measure (default: 10 100 1000)')
+    parser.add_argument('--wildcard-fraction', type=float, default=0.5,
+                        help='Share of sites with wildcard hostnames (default: 0.5)')
+    parser.add_argument('--catch-all', type=int, default=20,
+                        help='Unmatched hosts that must reach the default site (default: 20)')
+    parser.add_argument('--path', default=f'/static/{SITE_MARKER}',
+                        help=f'Path requested under load (default: /static/{SITE_MARKER})')
+    parser.add_argument('--concurrency', type=int, default=8, help='Load workers (default: 8)')
+    parser.add_argument('--duration', type=float, default=10.0,
+                        help='Seconds of load per step (default: 10)')
+    parser.add_argument('--check-limit', type=int, default=2000,
+                        help='Hosts checked for correct routing per step at most (default: 2000)')
+    parser.add_argument('--port', type=int, default=3467, help='Port to run server on')
+    parser.add_argument('--timeout', type=float, default=120.0,
+                        help='Seconds to wait for the server to start (default: 120)')
+    parser.add_argument('--json', default=None, help='Write results to this JSON file')
+    parser.add_argument('--results', default=DEFAULT_STORE,
+                        help='Results store for bench_results.py (default: %(default)s)')
+    parser.add_argument('--no-record', action='store_true',
+                        help='Do not append this run to the results store')
+    args = parser.parse_args()
+
+    with open(os.path.join(SITE_DIR, "config.d", DEFAULT_SITE), "rb") as f:
+        default_site = tomllib.load(f)
+
+    print_header("Tenrankai Virtual-Host Routing Benchmark")
+    print(f"{BLUE}ℹ Exact hosts site*.{DOMAIN}, wildcard hosts *.w*.{DOMAIN}, "
+          f"{args.catch_all} catch-all hosts; {args.concurrency} workers on {args.path}{NC}")
+
+    results = []
+    try:
+        for total in sorted(args.steps):
+            results.append(bench_step(total, args, default_site))
+    except KeyboardInterrupt:
+        print("\n\nInterrupted by user")
+
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote results to {args.json}")
+    if not args.no_record:
+        metrics = {}
+        for r in results:
+            if "error" in r:
+                continue
+            metrics[f"{r['sites']} startup"] = metric([r["startup_ms"]])
+            metrics[f"{r['sites']} throughput"] = metric([r["load"]["TOTAL"]["rps"]], unit="req/s",
+                                                          better="higher")
+            for match in MATCH_CLASSES:
+                if match in r["load"]:
+                    metrics[f"{r['sites']} {match}"] = metric(r["load"][match]["samples_ms"])
+        if metrics:
+            run = record_run("vhosts", "config.toml", metrics, site_dir=SITE_DIR, store=args.results,
+                             extra={"path": args.path, "concurrency": args.concurrency,
+                                    "duration": args.duration})
+            print(f"{BLUE}ℹ Recorded run {run['id']}{NC}")
+
+    ok = results and all("error" not in r and not r["misrouted"] for r in results)
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.11"
+# dependencies = ["requests"]
+# ///
+"""
+Site crawler for Tenrankai
+Starts from /, /docs, /blog and /gallery, follows same-origin links and asset
+references (plus links to any extra allowed origins) concurrently, and records
+status, size and latency of every URL it discovers, reporting broken links with
+the pages that reference them
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import urldefrag, urljoin, urlsplit
+
+import requests
+
+from bench_results import DEFAULT_STORE, metric, record_run
+from test_tenrankai_site import (
+    BLUE, GREEN, NC, RED, YELLOW,
+    TenrankaiServer, make_session,
+)
+
+SITE_DIR = "tenrankai-dot-com"
+DEFAULT_SEEDS = ["/", "/docs", "/blog", "/gallery"]
+
+# Attributes holding a single URL, and attributes holding a srcset list
+LINK_ATTRIBUTES = {"href", "src", "poster", "data-src"}
+SRCSET_ATTRIBUTES = {"srcset", "data-srcset"}
+LINK_CONTENT_TYPES = ("text/html", "text/css")
+CSS_URL_RE = re.compile(r"""url\(\s*['"]?([^'")]+)['"]?\s*\)|@import\s+['"]([^'"]+)['"]""")
+
+def print_header(text: str):
+    print(f"\n{YELLOW}{text}{NC}")
+    print("=" * len(text))
+
+class LinkParser(HTMLParser):
+    """Collect link and asset references from an HTML page"""
+
+    def __init__(self):
+        super().__init__()
+        self.links: List[str] = []
+        self.in_style = False
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]):
+        for name, value in attrs:
+            if not value:
+                continue
+            if name in LINK_ATTRIBUTES:
+                self.links.append(value)
+            elif name in SRCSET_ATTRIBUTES:
+                self.links += [part.strip().split()[0] for part in value.split(",") if part.strip()]
+        if tag == "style":
+            self.in_style = True
+
+    def handle_data(self, data: str):
+        if self.in_style:
+            self.links += css_links(data)
+
+    def handle_endtag(self, tag: str):
+        if tag == "style":
+            self.in_style = False
+
+def css_links(text: str) -> List[str]:
+    """url(...) and @import references in a stylesheet"""
+    return [match[0] or match[1] for match in CSS_URL_RE.findall(text)]
+
+def extract_links(content_type: str, text: str) -> List[str]:
+    if content_type == "text/html":
+        parser = LinkParser()
+        parser.feed(text)
+        return parser.links
+    if content_type == "text/css":
+        return css_links(text)
+    return []
+
+def fetch(session: requests.Session, url: str, timeout: float) -> Dict[str, Any]:
+    """GET one URL, returning its status, size, latency and outgoing links"""
+    start = time.perf_counter()
+    try:
+        response = session.get(url, timeout=timeout, allow_redirects=False)
+        body = response.content
+    except requests.exceptions.RequestException as e:
+        return {"url": url, "status": None, "error": str(e),
+                "latency_ms": (time.perf_counter() - start) * 1000, "bytes": 0, "links": []}
+    latency = time.perf_counter() - start
+    content_type = response.headers.get("Content-Type", "").split(";")[0].strip()
+    links = []
+    # Only decode bodies that can hold links; charset detection on a large image is slow
+    if response.status_code == 200 and content_type in LINK_CONTENT_TYPES:
+        links = extract_links(content_type, response.text)
+    if response.is_redirect and "Location" in response.headers:
+        links.append(response.headers["Location"])
+    return {"url": url, "status": response.status_code, "content_type": content_type,
+            "bytes": len(body), "latency_ms": latency * 1000, "links": links}
+
+def origin_of(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+def normalize(link: str, base: str, origins: Set[str]) -> Optional[str]:
+    """Absolute URL for a link on one of the crawled origins, without its fragment, or None"""
+    link = link.strip()
+    if not link or link.startswith(("mailto:", "javascript:", "data:", "tel:")):
+        return None
+    url = urldefrag(urljoin(base, link))[0]
+    if origin_of(url) not in origins:
+        return None
+    return url
+
+def crawl(base_url: str, seeds: List[str], concurrency: int = 8, per_host: int = 8,
+          max_urls: int = 10000, max_frontier: int = 10000, timeout: float = 30.0,
+          extra_origins: Tuple[str, ...] = ()) -> Dict[str, Any]:
+    """Breadth-first concurrent crawl of base_url's origin and any extra_origins.
+
+    At most `concurrency` requests are in flight overall and `per_host` per host;
+    both must be at least 1.
+    The frontier holds at most max_frontier URLs waiting to be fetched; links
+    found while it is full are counted as dropped. Every URL is fetched once.
+    """
+    if concurrency < 1 or per_host < 1:
+        raise ValueError("concurrency and per_host must be at least 1")
+    origins = {origin_of(base_url)} | {origin_of(extra) for extra in extra_origins}
+    frontier: deque = deque()
+    visited: Set[str] = set()
+    referrers: Dict[str, List[str]] = {}
+    results: Dict[str, Dict[str, Any]] = {}
+    dropped = 0
+
+    def enqueue(url: str, referrer: Optional[str]):
+        nonlocal dropped
+        if referrer:
+            referrers.setdefault(url, [])
+            if referrer not in referrers[url] and len(referrers[url]) < 5:
+                referrers[url].append(referrer)
+        if url in visited:
+            return
+        if len(frontier) >= max_frontier or len(visited) >= max_urls:
+            dropped += 1
+            return
+        visited.add(url)
+        frontier.append(url)
+
+    for seed in seeds:
+        url = normalize(seed, base_url, origins)
+        if url:
+            enqueue(url, None)
+
+    sessions = [make_session(1) for _ in range(concurrency)]
+    idle = list(sessions)
+    in_flight: Dict[Any, Tuple[str, requests.Session]] = {}
+    host_load: Counter = Counter()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        while frontier or in_flight:
+            # Hand out URLs whose host still has capacity, keeping the order of the rest
+            deferred = deque()
+            while frontier and idle:
+                url = frontier.popleft()
+                host = urlsplit(url).netloc
+                if host_load[host] >= per_host:
+                    deferred.append(url)
+                    continue
+                session = idle.pop()
+                host_load[host] += 1
+                in_flight[pool.submit(fetch, session, url, timeout)] = (url, session)
+            frontier.extendleft(reversed(deferred))
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                url, session = in_flight.pop(future)
+                idle.append(session)
+                host_load[urlsplit(url).netloc] -= 1
+                result = future.result()
+                results[url] = result
+                for link in result.pop("links"):
+                    target = normalize(link, url, origins)
+                    if target:
+                        enqueue(target, url)
+    elapsed = time.perf_counter() - start
+    for session in sessions:
+        session.close()
+
+    for url, result in results.items():
+        result["referrers"] = referrers.get(url, [])
+    return {"elapsed": elapsed, "dropped": dropped, "urls": results}
+
+def relative(url: str, base_url: str) -> str:
+    """Path of a URL on base_url, or the full URL on another origin"""
+    if url == base_url or url.startswith(base_url + "/"):
+        return url[len(base_url):] or "/"
+    return url
+
+def print_report(report: Dict[str, Any], base_url: str, slowest: int) -> int:
+    """Print the crawl summary and broken links, returning the number of broken URLs"""
+    results = list(report["urls"].values())
+    print_header("Crawl Summary")
+    statuses = Counter(str(r["status"] or "error") for r in results)
+    total_bytes = sum(r["bytes"] for r in results)
+    print(f"  {len(results)} URLs in {report['elapsed']:.1f}s "
+          f"({len(results) / report['elapsed']:.1f} URLs/s), {total_bytes / 1048576:.1f}MB")
+    print(f"  Status: {', '.join(f'{s} x{n}' for s, n in sorted(statuses.items()))}")
+    by_type = Counter(r.get("content_type") or "-" for r in results)
+    print(f"  Types:  {', '.join(f'{t} x{n}' for t, n in by_type.most_common())}")
+    if report["dropped"]:
+        print(f"  {YELLOW}⚠ {report['dropped']} links dropped because the frontier or URL limit was full{NC}")
+
+    print(f"\n  Slowest {slowest}:")
+    for r in sorted(results, key=lambda r: r["latency_ms"], reverse=True)[:slowest]:
+        print(f"    {r['latency_ms']:>8.1f}ms {r['bytes']:>9} {relative(r['url'], base_url)}")
+
+    broken = [r for r in results if r["status"] is None or r["status"] >= 400]
+    if broken:
+        print(f"\n{RED}✗ {len(broken)} broken links:{NC}")
+        for r in sorted(broken, key=lambda r: r["url"]):
+            reason = r.get("error") or f"HTTP {r['status']}"
+            print(f"  {RED}{relative(r['url'], base_url)}{NC}: {reason}")
+            for referrer in r["referrers"]:
+                print(f"      linked from {relative(referrer, base_url)}")
+    else:
+        print(f"\n{GREEN}✓ No broken links{NC}")
+    return len(broken)
+
+def main():
+    parser = argparse.ArgumentParser(description='Crawl a Tenrankai site and report broken links')
+    parser.add_argument('--config', default='config.toml', help='Config file to use')
+    parser.add_argument('--port', type=int, default=3466, help='Port to run server on')
+    parser.add_argument('--url', default=None,
+                        help='Crawl an already running server at this base URL instead of starting one')
+    parser.add_argument('--seed', action='append', dest='seeds',
+                        help=f'Start path (repeatable, default: {" ".join(DEFAULT_SEEDS)})')
+    parser.add_argument('--concurrency', type=int, default=8,
+                        help='Requests in flight overall (default: 8)')
+    parser.add_argument('--per-host', type=int, default=8,
+                        help='Requests in flight per host (default: 8)')
+    parser.add_argument('--allow-origin', action='append', dest='origins', default=[],
+                        help='Also follow links to this origin, e.g. another virtual host (repeatable)')
+    parser.add_argument('--max-urls', type=int, default=10000,
+                        help='Stop discovering after this many URLs (default: 10000)')
+    parser.add_argument('--max-frontier', type=int, default=10000,
+                        help='URLs waiting to be fetched at most (default: 10000)')
+    parser.add_argument('--slowest', type=int, default=10, help='Slowest URLs to list (default: 10)')
+    parser.add_argument('--json', default=None, help='Write every URL result to this JSON file')
+    parser.add_argument('--results', default=DEFAULT_STORE,
+                        help='Results store for bench_results.py (default: %(default)s)')
+    parser.add_argument('--no-record', action='store_true',
+                        help='Do not append this run to the results store')
+    args = parser.parse_args()
+    if args.concurrency < 1 or args.per_host < 1:
+        print(f"{RED}✗ --concurrency and --per-host must be at least 1{NC}")
+        return 1
+
+    server = None
+    base_url = args.url.rstrip("/") if args.url else None
+    if not base_url:
+        server = TenrankaiServer(config=args.config, port=args.port, site_dir=SITE_DIR)
+        if not server.start(timeout=30):
+            print(f"{RED}✗ {server.error}{NC}")
+            print(server.output(40))
+            return 1
+        base_url = server.base_url
+
+    print_header("Tenrankai Site Crawl")
+    seeds = args.seeds or DEFAULT_SEEDS
+    print(f"{BLUE}ℹ {base_url} from {' '.join(seeds)}, {args.concurrency} concurrent "
+          f"({args.per_host} per host){NC}")
+    try:
+        report = crawl(base_url, seeds, concurrency=args.concurrency, per_host=args.per_host,
+                       max_urls=args.max_urls, max_frontier=args.max_frontier,
+                       extra_origins=tuple(args.origins))
+    except KeyboardInterrupt:
+        print("\n\nInterrupted by user")
+        return 1
+    finally:
+        if server:
+            server.stop()
+
+    broken = print_report(report, base_url, args.slowest)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote results to {args.json}")
+    if not args.no_record:
+        latencies: Dict[str, List[float]] = {}
+        for r in report["urls"].values():
+            if r["status"] == 200:
+                latencies.setdefault(r["content_type"] or "-", []).append(r["latency_ms"])
+        metrics = {f"{content_type} latency": metric(values) for content_type, values in latencies.items()}
+        metrics["crawl rate"] = metric([len(report["urls"]) / report["elapsed"]] if report["elapsed"] else [],
+                                       unit="URLs/s", better="higher")
+        run = record_run("crawl", args.config, metrics, site_dir=SITE_DIR, store=args.results,
+                         extra={"urls": len(report["urls"]), "concurrency": args.concurrency})
+        print(f"{BLUE}ℹ Recorded run {run['id']}{NC}")
+    return 1 if broken else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
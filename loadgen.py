@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Multi-process load engine for the Tenrankai benchmarks
+One interpreter cannot drive a release build to saturation because of the GIL,
+so run_load() fans closed-loop workers out over several processes. Each
+process has its own connection pool and records latencies into a
+LatencyHistogram; the parent merges them. Each worker process reports its own
+CPU use so client-bound runs can be flagged. run_open_loop() sends requests on
+a fixed arrival schedule instead and measures latency from the intended send
+time.
+"""
+
+import math
+import multiprocessing
+import os
+import threading
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# A worker process above this share of one CPU is limiting the load it generates
+SATURATED_CPU = 0.85
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram backed by one array of counters.
+
+    Buckets are 1 µs wide up to LINEAR_US, then grow by PRECISION per bucket up
+    to MAX_US, so every recorded value is known to within 1%. Histograms with
+    the same layout merge by adding counters. A merged histogram is identical
+    to one that recorded every value itself.
+    """
+
+    LINEAR_US = 1000
+    PRECISION = 0.01
+    MAX_US = 120_000_000
+
+    def __init__(self):
+        self.log_base = math.log1p(self.PRECISION)
+        self.counts = array("Q", bytes(8 * (self.bucket(self.MAX_US) + 1)))
+        self.total = 0
+        self.min_us = 0
+        self.max_us = 0
+
+    def bucket(self, value_us: int) -> int:
+        if value_us < self.LINEAR_US:
+            return value_us
+        return self.LINEAR_US + int(math.log(value_us / self.LINEAR_US) / self.log_base)
+
+    def bucket_value(self, index: int) -> float:
+        """Highest value (µs) that falls into a bucket"""
+        if index < self.LINEAR_US:
+            return float(index)
+        return self.LINEAR_US * math.exp((index - self.LINEAR_US + 1) * self.log_base)
+
+    def record(self, seconds: float):
+        value_us = min(max(0, int(seconds * 1_000_000)), self.MAX_US)
+        self.counts[self.bucket(value_us)] += 1
+        self.min_us = value_us if not self.total else min(self.min_us, value_us)
+        self.max_us = max(self.max_us, value_us)
+        self.total += 1
+
+    def merge(self, other: "LatencyHistogram"):
+        if not other.total:
+            return
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.min_us = other.min_us if not self.total else min(self.min_us, other.min_us)
+        self.max_us = max(self.max_us, other.max_us)
+        self.total += other.total
+
+    def percentile(self, pct: float) -> float:
+        """Nearest-rank percentile in seconds, capped at the largest recorded value"""
+        if not self.total:
+            return 0.0
+        rank = max(1, math.ceil(pct / 100.0 * self.total))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.bucket_value(index), self.max_us) / 1_000_000
+        return self.max_us / 1_000_000
+
+    def quantiles(self, limit: int = 1000) -> List[float]:
+        """Up to limit evenly spaced quantiles in seconds, for stores that keep samples"""
+        count = min(limit, self.total)
+        if count <= 1:
+            return [self.percentile(50)] if count else []
+        return [self.percentile(100.0 * i / (count - 1)) for i in range(count)]
+
+    def summary(self, errors: int, elapsed: float) -> Dict[str, float]:
+        """The same keys as test_tenrankai_site.summarize_latencies"""
+        requests_made = self.total + errors
+        return {
+            "requests": requests_made,
+            "errors": errors,
+            "error_rate": errors / requests_made if requests_made else 0.0,
+            "rps": self.total / elapsed if elapsed > 0 else 0.0,
+            "p50_ms": self.percentile(50) * 1000,
+            "p95_ms": self.percentile(95) * 1000,
+            "p99_ms": self.percentile(99) * 1000,
+            "max_ms": self.max_us / 1000,
+        }
+
+def _worker_process(base_url: str, endpoints: List[str], connections: int, start_at: float,
+                    duration: float, offset: int) -> Dict[str, Any]:
+    """Closed-loop load from one process: connections threads sharing one pooled session"""
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=connections, pool_block=True))
+    histograms = {path: LatencyHistogram() for path in endpoints}
+    errors = {path: 0 for path in endpoints}
+    lock = threading.Lock()
+
+    delay = start_at - time.time()
+    if delay > 0:
+        time.sleep(delay)
+    stop_at = time.perf_counter() + duration
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+
+    def loop(index: int):
+        i = offset + index
+        while time.perf_counter() < stop_at:
+            path = endpoints[i % len(endpoints)]
+            i += 1
+            start = time.perf_counter()
+            try:
+                ok = session.get(f"{base_url}{path}", timeout=10).status_code < 400
+            except requests.exceptions.RequestException:
+                ok = False
+            latency = time.perf_counter() - start
+            with lock:
+                if ok:
+                    histograms[path].record(latency)
+                else:
+                    errors[path] += 1
+
+    with ThreadPoolExecutor(max_workers=connections) as pool:
+        list(pool.map(loop, range(connections)))
+    wall = time.perf_counter() - wall_start
+    session.close()
+    return {"histograms": histograms, "errors": errors,
+            "cpu_share": (time.process_time() - cpu_start) / wall if wall > 0 else 0.0}
+
+def client_report(cpu_shares: List[float]) -> Dict[str, Any]:
+    """Per-process CPU use and whether any process limited the load it generated"""
+    busiest = max(cpu_shares) if cpu_shares else 0.0
+    return {
+        "processes": len(cpu_shares),
+        "cpu_percent": [share * 100 for share in cpu_shares],
+        "max_cpu_percent": busiest * 100,
+        "saturated": busiest >= SATURATED_CPU,
+    }
+
+def run_load(base_url: str, endpoints: List[str], concurrency: int, duration: float,
+             processes: Optional[int] = None) -> Dict[str, Any]:
+    """Closed-loop load with concurrency connections spread over worker processes.
+
+    Returns {"duration", "endpoints": {path: summary}, "total": summary,
+    "histograms": {path: LatencyHistogram}, "client": client_report(...)}.
+    """
+    processes = max(1, min(processes or os.cpu_count() or 1, concurrency))
+    per_process = [concurrency // processes + (1 if i < concurrency % processes else 0)
+                   for i in range(processes)]
+    # Fresh interpreters rather than forks of a harness that is running threads
+    context = multiprocessing.get_context("spawn")
+    # Time for every process to start before the shared start time
+    start_at = time.time() + 1.0 + 0.05 * processes
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context) as pool:
+        futures = [pool.submit(_worker_process, base_url, endpoints, connections, start_at,
+                               duration, sum(per_process[:i]))
+                   for i, connections in enumerate(per_process)]
+        partials = [future.result() for future in futures]
+
+    histograms = {path: LatencyHistogram() for path in endpoints}
+    total = LatencyHistogram()
+    errors = {path: 0 for path in endpoints}
+    for partial in partials:
+        for path in endpoints:
+            histograms[path].merge(partial["histograms"][path])
+            total.merge(partial["histograms"][path])
+            errors[path] += partial["errors"][path]
+    return {
+        "duration": duration,
+        "endpoints": {path: histograms[path].summary(errors[path], duration) for path in endpoints},
+        "total": total.summary(sum(errors.values()), duration),
+        "histograms": histograms,
+        "client": client_report([partial["cpu_share"] for partial in partials]),
+    }
+
+def parse_rate(spec: str) -> Dict[str, Any]:
+    """PATH=RPS for a constant rate or PATH=START:END for a linear ramp over the run"""
+    path, _, rates = spec.rpartition("=")
+    start, _, end = rates.partition(":")
+    if not path.startswith("/"):
+        raise ValueError(f"expected PATH=RPS or PATH=START:END, got {spec!r}")
+    route = {"path": path, "start_rps": float(start), "end_rps": float(end or start)}
+    if route["start_rps"] < 0 or route["end_rps"] < 0:
+        raise ValueError(f"negative rate in {spec!r}")
+    return route
+
+def arrival_times(route: Dict[str, Any], duration: float) -> List[float]:
+    """Evenly spaced intended send times (seconds from start) for a constant or ramping rate.
+
+    With the rate going linearly from r0 to r1, requests sent by time t are
+    r0*t + (r1 - r0)*t^2 / (2*duration); the k-th request is sent where that equals k.
+    """
+    r0, r1 = route["start_rps"], route["end_rps"]
+    total = int((r0 + r1) / 2 * duration)
+    slope = (r1 - r0) / duration
+    times = []
+    for k in range(total):
+        if abs(slope) < 1e-12:
+            t = k / r0
+        else:
+            t = (-r0 + math.sqrt(max(0.0, r0 * r0 + 2 * slope * k))) / slope
+        times.append(t)
+    return times
+
+def _open_loop_process(base_url: str, arrivals: List[Any], start_at: float, duration: float,
+                       max_in_flight: int, windows: int) -> Dict[str, Any]:
+    """Send [(intended offset, path), ...] on schedule; latency runs from the intended send time"""
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=max_in_flight, pool_block=True))
+    paths = sorted({path for _, path in arrivals})
+    latency = {path: LatencyHistogram() for path in paths}
+    service = {path: LatencyHistogram() for path in paths}
+    lag = LatencyHistogram()
+    windowed = {path: [LatencyHistogram() for _ in range(windows)] for path in paths}
+    errors = {path: 0 for path in paths}
+    lock = threading.Lock()
+
+    delay = start_at - time.time()
+    if delay > 0:
+        time.sleep(delay)
+    origin = time.perf_counter()
+    cpu_start = time.process_time()
+
+    def send(offset: float, path: str):
+        intended = origin + offset
+        sent = time.perf_counter()
+        try:
+            ok = session.get(f"{base_url}{path}", timeout=30).status_code < 400
+        except requests.exceptions.RequestException:
+            ok = False
+        done = time.perf_counter()
+        with lock:
+            lag.record(sent - intended)
+            if ok:
+                latency[path].record(done - intended)
+                service[path].record(done - sent)
+                windowed[path][min(windows - 1, int(offset / duration * windows))].record(done - intended)
+            else:
+                errors[path] += 1
+
+    # The pool bounds connections, not arrivals: requests that find every
+    # connection busy wait in its queue, and that wait counts as latency
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        for offset, path in arrivals:
+            wait = origin + offset - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            pool.submit(send, offset, path)
+    wall = time.perf_counter() - origin
+    session.close()
+    return {"latency": latency, "service": service, "lag": lag, "windows": windowed, "errors": errors,
+            "cpu_share": (time.process_time() - cpu_start) / wall if wall > 0 else 0.0}
+
+def run_open_loop(base_url: str, routes: List[Dict[str, Any]], duration: float,
+                  processes: int = 1, max_in_flight: int = 256, windows: int = 10) -> Dict[str, Any]:
+    """Open-loop load: every route sends on its own fixed schedule whatever the server does.
+
+    Latency is measured from when each request should have been sent, which
+    corrects for coordinated omission: a stalled server delays the queued
+    requests behind it, and that delay shows up in the percentiles.
+    """
+    schedule = sorted((t, route["path"]) for route in routes for t in arrival_times(route, duration))
+    processes = max(1, min(processes, len(schedule) or 1))
+    # Deal arrivals round-robin so every process sends an even share of each rate
+    shares = [schedule[i::processes] for i in range(processes)]
+    per_process = max(1, max_in_flight // processes)
+    context = multiprocessing.get_context("spawn")
+    start_at = time.time() + 1.0 + 0.05 * processes
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context) as pool:
+        futures = [pool.submit(_open_loop_process, base_url, share, start_at, duration, per_process, windows)
+                   for share in shares]
+        partials = [future.result() for future in futures]
+
+    report: Dict[str, Any] = {"duration": duration, "routes": {}, "lag": LatencyHistogram()}
+    for partial in partials:
+        report["lag"].merge(partial["lag"])
+    for route in routes:
+        path = route["path"]
+        latency, service = LatencyHistogram(), LatencyHistogram()
+        windowed = [LatencyHistogram() for _ in range(windows)]
+        errors = 0
+        for partial in partials:
+            if path not in partial["latency"]:
+                continue
+            latency.merge(partial["latency"][path])
+            service.merge(partial["service"][path])
+            for merged, histogram in zip(windowed, partial["windows"][path]):
+                merged.merge(histogram)
+            errors += partial["errors"][path]
+        stats = latency.summary(errors, duration)
+        stats["target_rps"] = (route["start_rps"] + route["end_rps"]) / 2
+        stats["service_p99_ms"] = service.percentile(99) * 1000
+        window_length = duration / windows
+        stats["windows"] = [{
+            "start_s": i * window_length,
+            "target_rps": route["start_rps"] + (route["end_rps"] - route["start_rps"]) * (i + 0.5) / windows,
+            "requests": histogram.total,
+            "p50_ms": histogram.percentile(50) * 1000,
+            "p99_ms": histogram.percentile(99) * 1000,
+        } for i, histogram in enumerate(windowed)]
+        report["routes"][path] = stats
+        report.setdefault("histograms", {})[path] = latency
+    report["client"] = client_report([partial["cpu_share"] for partial in partials])
+    return report
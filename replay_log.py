@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.11"
+# dependencies = ["requests"]
+# ///
+"""
+Access-log replay for Tenrankai
+Replays the GET and HEAD requests of nginx access logs against a server
+started by the harness, keeping the original Host and Accept headers and the
+original gaps between requests divided by --speedup. Reports latency per route
+class and every response code that differs from the log
+
+For Host, Accept and millisecond timestamps, log with this format:
+
+    log_format tenrankai_replay '$remote_addr - $remote_user [$time_local] "$request" '
+                                '$status $body_bytes_sent "$http_referer" "$http_user_agent" '
+                                '"$host" "$http_accept" $request_time $msec';
+
+The plain "combined" format also works; requests then replay without Host and
+Accept headers and are spread evenly within each logged second
+"""
+
+import argparse
+import glob
+import gzip
+import json
+import os
+import re
+import sys
+import threading
+import time
+import tomllib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import requests
+
+from bench_results import DEFAULT_STORE, metric, record_run
+from test_tenrankai_site import (
+    BLUE, GREEN, NC, RED, YELLOW,
+    TenrankaiServer, load_gallery_configs, make_session, percentile,
+)
+
+SITE_DIR = "tenrankai-dot-com"
+LOG_LINE_RE = re.compile(
+    r'(?P<remote>\S+) \S+ \S+ \[(?P<time>[^\]]+)\] "(?P<method>[A-Z]+) (?P<path>\S+)[^"]*" '
+    r'(?P<status>\d{3}) \S+ "[^"]*" "[^"]*"'
+    r'(?: "(?P<host>[^"]*)" "(?P<accept>[^"]*)" (?P<request_time>[\d.]+|-)(?: (?P<msec>[\d.]+))?)?'
+)
+REPLAYED_METHODS = ("GET", "HEAD")
+# Logged statuses that depend on request headers or the client, not on the server
+UNCOMPARABLE_STATUSES = {304, 412, 416, 499}
+
+def print_header(text: str):
+    print(f"\n{YELLOW}{text}{NC}")
+    print("=" * len(text))
+
+def open_log(path: str):
+    return gzip.open(path, "rt", errors="replace") if path.endswith(".gz") else open(path, errors="replace")
+
+def read_entries(paths: List[str]) -> Iterator[Dict[str, Any]]:
+    """Parsed log lines in file order; lines that do not parse are skipped"""
+    for path in paths:
+        with open_log(path) as f:
+            for line in f:
+                match = LOG_LINE_RE.match(line)
+                if not match:
+                    continue
+                entry = match.groupdict()
+                if entry["msec"]:
+                    entry["t"] = float(entry["msec"])
+                else:
+                    entry["t"] = datetime.strptime(entry["time"], "%d/%b/%Y:%H:%M:%S %z").timestamp()
+                entry["status"] = int(entry["status"])
+                rt = entry.get("request_time")
+                entry["request_time"] = float(rt) if rt and rt != "-" else None
+                yield entry
+
+def schedule(entries: List[Dict[str, Any]], speedup: float) -> List[Dict[str, Any]]:
+    """Give every entry an offset in seconds from the start of the replay.
+
+    Whole-second timestamps from $time_local are spread evenly across their
+    second so a busy second does not become a single burst.
+    """
+    entries.sort(key=lambda e: e["t"])
+    start = entries[0]["t"]
+    i = 0
+    while i < len(entries):
+        j = i
+        while j < len(entries) and entries[j]["t"] == entries[i]["t"]:
+            j += 1
+        whole_second = entries[i]["msec"] is None
+        for k in range(i, j):
+            spread = (k - i) / (j - i) if whole_second else 0.0
+            entries[k]["offset"] = (entries[k]["t"] - start + spread) / speedup
+        i = j
+    return entries
+
+def url_prefixes(config: str) -> Tuple[List[str], List[str]]:
+    """(gallery prefixes, posts prefixes) of every site in a config's ConfigStorage tree"""
+    galleries = [g.get("url_prefix", "/gallery").rstrip("/") for g in load_gallery_configs(config, SITE_DIR)]
+    posts = []
+    with open(os.path.join(SITE_DIR, config), "rb") as f:
+        storage = tomllib.load(f).get("app", {}).get("config_storage")
+    if storage:
+        for path in glob.glob(os.path.join(SITE_DIR, storage, "sites", "*", "posts", "*.toml")):
+            with open(path, "rb") as f:
+                prefix = tomllib.load(f).get("url_prefix")
+            if prefix:
+                posts.append(prefix.rstrip("/"))
+    return galleries, posts
+
+def route_class(path: str, galleries: List[str], posts: List[str]) -> str:
+    route, _, query = path.partition("?")
+    if route.startswith("/static/"):
+        return "static"
+    if route.startswith("/api/"):
+        return "preview" if route.endswith("/preview") else "api"
+    for prefix in galleries:
+        if route == prefix or route.startswith(prefix + "/"):
+            if "tile=" in query:
+                return "tile"
+            if "size=" in query:
+                return "variant"
+            return "gallery"
+    for prefix in posts:
+        if route == prefix:
+            return "posts index"
+        if route.startswith(prefix + "/"):
+            return "post"
+    return "page"
+
+def replay(base_url: str, entries: List[Dict[str, Any]], concurrency: int,
+           default_host: Optional[str]) -> List[Dict[str, Any]]:
+    """Send every entry at its offset; the pool bounds requests in flight"""
+    results: List[Dict[str, Any]] = []
+    lock = threading.Lock()
+    local = threading.local()
+
+    def send(entry: Dict[str, Any], intended: float):
+        if not hasattr(local, "session"):
+            local.session = make_session(1)
+        headers = {}
+        host = entry["host"] or default_host
+        if host:
+            headers["Host"] = host
+        if entry["accept"] and entry["accept"] != "-":
+            headers["Accept"] = entry["accept"]
+        sent = time.perf_counter()
+        try:
+            response = local.session.request(entry["method"], f"{base_url}{entry['path']}",
+                                              headers=headers, timeout=60, allow_redirects=False)
+            status = response.status_code
+        except requests.exceptions.RequestException:
+            status = 0
+        finished = time.perf_counter()
+        with lock:
+            results.append({"path": entry["path"], "route": entry["route"], "logged": entry["status"],
+                            "status": status, "latency": finished - sent, "lag": sent - intended,
+                            "logged_time": entry["request_time"]})
+
+    pool = ThreadPoolExecutor(max_workers=concurrency)
+    start = time.perf_counter()
+    try:
+        for entry in entries:
+            intended = start + entry["offset"]
+            delay = intended - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, entry, intended)
+    finally:
+        pool.shutdown(wait=True)
+    return results
+
+def print_report(results: List[Dict[str, Any]], wall: float, log_span: float) -> int:
+    """Print per-route latency and status differences; returns the number of differences"""
+    print_header("Replay Summary")
+    print(f"  {len(results)} requests in {wall:.1f}s (log span {log_span:.1f}s)")
+    lags = sorted(r["lag"] for r in results)
+    print(f"  Send lag p50 {percentile(lags, 50) * 1000:.1f}ms, p99 {percentile(lags, 99) * 1000:.1f}ms "
+          f"(time requests waited for a free client worker)")
+
+    routes = sorted({r["route"] for r in results})
+    print(f"\n  {'Route':<12} {'Reqs':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} "
+          f"{'log p50':>8} {'log p99':>8} {'Errors':>7} {'Diffs':>6}")
+    diffs: Counter = Counter()
+    for route in routes + ["TOTAL"]:
+        rows = results if route == "TOTAL" else [r for r in results if r["route"] == route]
+        latencies = sorted(r["latency"] for r in rows if r["status"])
+        logged = sorted(r["logged_time"] for r in rows if r["logged_time"] is not None)
+        errors = sum(1 for r in rows if r["status"] == 0 or r["status"] >= 500)
+        differing = [r for r in rows if r["status"] != r["logged"] and r["logged"] not in UNCOMPARABLE_STATUSES]
+        if route != "TOTAL":
+            diffs.update((route, r["logged"], r["status"]) for r in differing)
+        log_p50 = f"{percentile(logged, 50) * 1000:.1f}ms" if logged else "-"
+        log_p99 = f"{percentile(logged, 99) * 1000:.1f}ms" if logged else "-"
+        print(f"  {route:<12} {len(rows):>7} {percentile(latencies, 50) * 1000:>6.1f}ms "
+              f"{percentile(latencies, 95) * 1000:>6.1f}ms {percentile(latencies, 99) * 1000:>6.1f}ms "
+              f"{(latencies[-1] if latencies else 0.0) * 1000:>6.1f}ms {log_p50:>8} {log_p99:>8} "
+              f"{errors:>7} {len(differing):>6}")
+
+    if diffs:
+        print(f"\n{YELLOW}Status differences (route, logged -> replayed):{NC}")
+        for (route, logged, status), count in diffs.most_common(20):
+            example = next(r["path"] for r in results
+                           if (r["route"], r["logged"], r["status"]) == (route, logged, status))
+            print(f"  {RED}✗ {route:<12} {logged} -> {status or 'error'}  x{count}  e.g. {example}{NC}")
+        return sum(diffs.values())
+    print(f"\n{GREEN}✓ Every replayed status matched the log{NC}")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay nginx access logs against Tenrankai')
+    parser.add_argument('logs', nargs='+', help='nginx access log files (.gz is read too)')
+    parser.add_argument('--speedup', type=float, default=1.0,
+                        help='Divide the original gaps between requests by this factor (default: 1)')
+    parser.add_argument('--limit', type=int, default=None, help='Replay only the first N requests')
+    parser.add_argument('--concurrency', type=int, default=64,
+                        help='Requests in flight at most (default: 64)')
+    parser.add_argument('--host', default=None,
+                        help='Host header for entries logged without one (default: none)')
+    parser.add_argument('--config', default='config.toml', help='Config file to use')
+    parser.add_argument('--port', type=int, default=3470, help='Port to run server on')
+    parser.add_argument('--url', default=None,
+                        help='Replay against an already running server at this base URL instead of starting one')
+    parser.add_argument('--json', default=None, help='Write every replayed request to this JSON file')
+    parser.add_argument('--results', default=DEFAULT_STORE,
+                        help='Results store for bench_results.py (default: %(default)s)')
+    parser.add_argument('--no-record', action='store_true',
+                        help='Do not append this run to the results store')
+    args = parser.parse_args()
+
+    entries = []
+    skipped = Counter()
+    for entry in read_entries(args.logs):
+        if entry["method"] not in REPLAYED_METHODS:
+            skipped[entry["method"]] += 1
+            continue
+        entries.append(entry)
+        if args.limit and len(entries) >= args.limit:
+            break
+    if not entries:
+        print(f"{RED}✗ No GET or HEAD requests found in {' '.join(args.logs)}{NC}")
+        return 1
+    schedule(entries, args.speedup)
+    galleries, posts = url_prefixes(args.config)
+    for entry in entries:
+        entry["route"] = route_class(entry["path"], galleries, posts)
+
+    server = None
+    base_url = args.url.rstrip("/") if args.url else None
+    if not base_url:
+        server = TenrankaiServer(config=args.config, port=args.port, site_dir=SITE_DIR)
+        if not server.start(timeout=30):
+            print(f"{RED}✗ {server.error}{NC}")
+            print(server.output(40))
+            return 1
+        base_url = server.base_url
+
+    log_span = entries[-1]["t"] - entries[0]["t"]
+    print_header("Tenrankai Access-Log Replay")
+    print(f"{BLUE}ℹ {len(entries)} requests over {log_span:.0f}s of log, replayed at {args.speedup:g}x "
+          f"against {base_url}{NC}")
+    if skipped:
+        print(f"{BLUE}ℹ Skipped {sum(skipped.values())} requests with other methods "
+              f"({', '.join(f'{m} {n}' for m, n in skipped.most_common())}){NC}")
+    start = time.perf_counter()
+    try:
+        results = replay(base_url, entries, args.concurrency, args.host)
+    except KeyboardInterrupt:
+        print("\n\nInterrupted by user")
+        return 1
+    finally:
+        if server:
+            server.stop()
+    wall = time.perf_counter() - start
+
+    differences = print_report(results, wall, log_span)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote results to {args.json}")
+    if not args.no_record:
+        metrics = {route: metric([r["latency"] * 1000 for r in results if r["route"] == route and r["status"]])
+                   for route in sorted({r["route"] for r in results})}
+        metrics["send lag"] = metric([r["lag"] * 1000 for r in results])
+        run = record_run("replay", args.config, metrics, site_dir=SITE_DIR, store=args.results,
+                         extra={"logs": [os.path.basename(path) for path in args.logs],
+                                "requests": len(results), "speedup": args.speedup})
+        print(f"{BLUE}ℹ Recorded run {run['id']}{NC}")
+    return 1 if differences else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""Analyze Tenrankai gallery variant caches.
+
+Indexes each gallery's cache_directory with os.scandir on a thread pool and
+breaks the cache down by size class (thumbnail/gallery/medium/large), format
+(JPEG/WebP/AVIF) and folder. Variants are matched back to source_directory to
+find orphans (variants whose source image is gone) and missing variants, and
+to measure how much of what [pregenerate] would produce is already cached.
+
+Variant file names are matched with --layout, a regular expression over the
+path relative to the cache directory with named groups "source", "size" and
+"format". The default expects names like "landscapes/CRW_1978.jpg.medium.webp"
+or "landscapes/CRW_1978_thumbnail@2x.avif". Files under a "tiles" directory
+count as tiles; anything else that does not match is listed as unrecognized.
+
+Uses the standard library only.
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+import tomllib
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from validate_config import collapse_inline_tables
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIZE_CLASSES = ("thumbnail", "gallery", "medium", "large")
+FORMATS = {"jpg": "jpeg", "jpeg": "jpeg", "webp": "webp", "avif": "avif", "png": "png"}
+SOURCE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".avif", ".heic", ".heif", ".tif", ".tiff")
+DEFAULT_LAYOUT = (r"^(?P<source>.+?)[._-](?P<size>thumbnail|gallery|medium|large)"
+                  r"(?P<density>@2x)?\.(?P<format>jpe?g|webp|avif|png)$")
+
+def scan_tree(root, jobs):
+    """[(path relative to root with "/" separators, bytes)] for every file, one directory per task"""
+    files = []
+    errors = []
+
+    def scan(directory):
+        found, subdirs = [], []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            found.append((entry.path, entry.stat(follow_symlinks=False).st_size))
+                    except OSError:
+                        continue
+        except OSError as e:
+            errors.append(f"{directory}: {e.strerror}")
+        return found, subdirs
+
+    prefix = len(os.path.join(root, ""))
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        pending = {pool.submit(scan, root)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                found, subdirs = future.result()
+                files.extend((path[prefix:].replace(os.sep, "/"), size) for path, size in found)
+                pending.update(pool.submit(scan, subdir) for subdir in subdirs)
+    return files, errors
+
+def load_toml(path):
+    with open(path, encoding="utf-8") as f:
+        return tomllib.loads(collapse_inline_tables(f.read()))
+
+def gallery_configs(config):
+    """(gallery file, gallery data) for every gallery of a bootstrap config's ConfigStorage tree"""
+    storage = load_toml(config).get("app", {}).get("config_storage")
+    if not storage:
+        return []
+    pattern = os.path.join(os.path.dirname(config), storage, "sites", "*", "galleries", "*.toml")
+    return [(path, load_toml(path)) for path in sorted(glob.glob(pattern))]
+
+def expected_variants(gallery):
+    """(size, format) pairs [pregenerate] would write for every image, or None without pregeneration"""
+    pregenerate = gallery.get("pregenerate")
+    if not pregenerate:
+        return None
+    formats = [f for f, enabled in pregenerate.get("formats", {"jpeg": True}).items() if enabled]
+    sizes = [s for s, enabled in pregenerate.get("sizes", {}).items() if enabled]
+    return {(size, fmt) for size in sizes for fmt in formats}
+
+def folder_of(path, depth):
+    parts = path.split("/")[:-1]
+    return "/".join(parts[:depth]) or "."
+
+def analyze(cache_dir, source_dir, expected, layout, depth, jobs):
+    cache_files, errors = scan_tree(cache_dir, jobs)
+    sources = []
+    # Without a readable local source tree every variant would look orphaned
+    source_scanned = False
+    if source_dir and os.path.isdir(source_dir):
+        source_files, source_errors = scan_tree(source_dir, jobs)
+        errors += source_errors
+        source_scanned = not any(error.startswith(f"{source_dir}: ") for error in source_errors)
+        sources = [path for path, _ in source_files if path.lower().endswith(SOURCE_EXTENSIONS)]
+    # Variants may be keyed by the source path with or without its extension
+    source_keys = {}
+    for path in sources:
+        source_keys[path] = path
+        source_keys.setdefault(os.path.splitext(path)[0], path)
+
+    totals = {"files": 0, "bytes": 0}
+    by_size = defaultdict(lambda: [0, 0])
+    by_format = defaultdict(lambda: [0, 0])
+    by_folder = defaultdict(lambda: [0, 0])
+    present = defaultdict(set)
+    orphans = []
+    unrecognized = []
+    for path, size in cache_files:
+        totals["files"] += 1
+        totals["bytes"] += size
+        folder = by_folder[folder_of(path, depth)]
+        folder[0] += 1
+        folder[1] += size
+        match = layout.match(path)
+        if not match:
+            key = "tile" if "tiles" in path.split("/")[:-1] else "unrecognized"
+            by_size[key][0] += 1
+            by_size[key][1] += size
+            ext = path.rsplit(".", 1)[-1].lower() if "." in path else ""
+            fmt = by_format[FORMATS.get(ext, ext or "none")]
+            fmt[0] += 1
+            fmt[1] += size
+            if key == "unrecognized":
+                unrecognized.append(path)
+            continue
+        fields = match.groupdict()
+        size_class = fields["size"] + (fields.get("density") or "")
+        fmt = FORMATS[fields["format"].lower()]
+        by_size[size_class][0] += 1
+        by_size[size_class][1] += size
+        by_format[fmt][0] += 1
+        by_format[fmt][1] += size
+        source = source_keys.get(fields["source"])
+        if source is None:
+            if source_scanned:
+                orphans.append((path, size))
+        elif not fields.get("density"):
+            present[source].add((fields["size"], fmt))
+
+    missing = []
+    coverage = None
+    if expected is not None and sources:
+        wanted = len(sources) * len(expected)
+        have = 0
+        for path in sources:
+            got = present.get(path, set()) & expected
+            have += len(got)
+            missing.extend((path, size, fmt) for size, fmt in sorted(expected - got))
+        coverage = have / wanted if wanted else 1.0
+
+    return {
+        "cache_directory": cache_dir,
+        "source_directory": source_dir,
+        "files": totals["files"],
+        "bytes": totals["bytes"],
+        "sources": len(sources),
+        "by_size": {k: {"files": v[0], "bytes": v[1]} for k, v in by_size.items()},
+        "by_format": {k: {"files": v[0], "bytes": v[1]} for k, v in by_format.items()},
+        "by_folder": {k: {"files": v[0], "bytes": v[1]} for k, v in by_folder.items()},
+        "orphans": [{"path": p, "bytes": s} for p, s in orphans] if source_scanned else None,
+        "missing": [{"source": p, "size": s, "format": f} for p, s, f in missing],
+        "expected": sorted(f"{s}/{f}" for s, f in expected) if expected is not None else None,
+        "coverage": coverage,
+        "unrecognized": unrecognized,
+        "errors": errors,
+    }
+
+def format_bytes(count):
+    for unit in ("B", "KB", "MB", "GB"):
+        if count < 1024 or unit == "GB":
+            return f"{count:.0f}{unit}" if unit == "B" else f"{count:.1f}{unit}"
+        count /= 1024
+
+def print_breakdown(title, table, order=None, limit=None):
+    keys = sorted(table, key=lambda k: -table[k]["bytes"])
+    if order:
+        keys = [k for k in order if k in table] + [k for k in keys if k not in order]
+    total = sum(v["bytes"] for v in table.values()) or 1
+    print(f"  {title}")
+    for key in keys[:limit]:
+        entry = table[key]
+        print(f"    {key:<28} {entry['files']:>10} files {format_bytes(entry['bytes']):>10} "
+              f"{entry['bytes'] / total:>6.1%}")
+    if limit and len(keys) > limit:
+        print(f"    ... {len(keys) - limit} more")
+
+def print_report(name, report, show):
+    print(f"\n{name}: {report['cache_directory']}")
+    print(f"  {report['files']} files, {format_bytes(report['bytes'])}; "
+          f"{report['sources']} source images in {report['source_directory']}")
+    for error in report["errors"][:show]:
+        print(f"  ⚠ cannot read {error}")
+    if not report["files"]:
+        print("  ⚠ Cache is empty")
+        return
+    sizes = [s + d for s in SIZE_CLASSES for d in ("", "@2x")] + ["tile", "unrecognized"]
+    print_breakdown("By size class", report["by_size"], order=sizes)
+    print_breakdown("By format", report["by_format"], order=["jpeg", "webp", "avif", "png"])
+    print_breakdown("By folder (largest first)", report["by_folder"], limit=show)
+
+    if report["unrecognized"]:
+        share = len(report["unrecognized"]) / report["files"]
+        print(f"  ⚠ {len(report['unrecognized'])} files ({share:.0%}) do not match --layout, "
+              f"e.g. {report['unrecognized'][0]}")
+    if report["orphans"] is None:
+        print("  ⚠ No readable local source directory: orphan detection skipped")
+    elif report["orphans"]:
+        orphan_bytes = sum(o["bytes"] for o in report["orphans"])
+        print(f"  ⚠ {len(report['orphans'])} orphaned variants ({format_bytes(orphan_bytes)}) "
+              f"have no source image:")
+        for orphan in report["orphans"][:show]:
+            print(f"      {orphan['path']}")
+    else:
+        print("  ✓ No orphaned variants")
+    if report["coverage"] is None:
+        print("  ⚠ No [pregenerate] section (or no source images): coverage not computed")
+        return
+    print(f"  Pregenerate coverage: {report['coverage']:.1%} of {report['sources']} images "
+          f"x {', '.join(report['expected'])}")
+    if report["missing"]:
+        print(f"  ⚠ {len(report['missing'])} variants missing:")
+        for entry in report["missing"][:show]:
+            print(f"      {entry['source']} {entry['size']} {entry['format']}")
+    else:
+        print("  ✓ Every pregenerated variant is cached")
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze Tenrankai gallery variant caches")
+    parser.add_argument("--config", default=os.path.join(REPO_ROOT, "tenrankai-dot-com", "config.toml"),
+                        help="Bootstrap config whose galleries to analyze")
+    parser.add_argument("--gallery", action="append", dest="galleries",
+                        help="Gallery name to analyze (repeatable, default: every local gallery)")
+    parser.add_argument("--cache", help="Analyze this cache directory instead of the config's galleries")
+    parser.add_argument("--source", help="Source directory for --cache")
+    parser.add_argument("--gallery-file", help="Gallery TOML whose [pregenerate] applies to --cache")
+    parser.add_argument("--layout", default=DEFAULT_LAYOUT,
+                        help="Regex over cache-relative paths with groups source, size, format (and density)")
+    parser.add_argument("--depth", type=int, default=1, help="Folder depth of the folder breakdown")
+    parser.add_argument("--show", type=int, default=10, help="Examples listed per finding")
+    parser.add_argument("--jobs", type=int, default=min(32, (os.cpu_count() or 1) * 4),
+                        help="Directories scanned in parallel")
+    parser.add_argument("--json", help="Write the full report, including every orphan and missing variant")
+    args = parser.parse_args()
+
+    try:
+        layout = re.compile(args.layout)
+    except re.error as e:
+        print(f"✗ Invalid --layout: {e}")
+        return 1
+    if not {"source", "size", "format"} <= set(layout.groupindex):
+        print("✗ --layout needs named groups source, size and format")
+        return 1
+
+    targets = []
+    if args.cache:
+        expected = expected_variants(load_toml(args.gallery_file)) if args.gallery_file else None
+        targets.append((os.path.basename(os.path.normpath(args.cache)), args.cache, args.source, expected))
+    else:
+        site_root = os.path.dirname(args.config)
+        for path, gallery in gallery_configs(args.config):
+            name = gallery.get("name", os.path.splitext(os.path.basename(path))[0])
+            cache, source = gallery.get("cache_directory", ""), gallery.get("source_directory", "")
+            if args.galleries and name not in args.galleries:
+                continue
+            if "://" in cache:
+                print(f"⚠ {name}: S3 cache {cache} skipped")
+                continue
+            source = None if "://" in source else os.path.join(site_root, source)
+            targets.append((name, os.path.join(site_root, cache), source, expected_variants(gallery)))
+    if not targets:
+        print("✗ No local gallery caches to analyze")
+        return 1
+
+    start = time.perf_counter()
+    reports = {}
+    for name, cache, source, expected in targets:
+        if not os.path.isdir(cache):
+            print(f"\n{name}: ⚠ cache directory {cache} does not exist")
+            continue
+        reports[name] = analyze(cache, source, expected, layout, args.depth, args.jobs)
+        print_report(name, reports[name], args.show)
+    files = sum(r["files"] for r in reports.values())
+    print(f"\n{files} cache files indexed in {time.perf_counter() - start:.2f}s")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(reports, f, indent=2)
+        print(f"Wrote report to {args.json}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
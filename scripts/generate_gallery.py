@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# /// script
+# dependencies = ["pillow"]
+# ///
+"""Generate a large synthetic photo tree for gallery scaling tests.
+
+Folders are laid out breadth-first with a fixed fan-out, and images fill the
+folders in that order, so a larger --limit only adds files to the same tree
+and a smaller one removes the generated images and sidecars beyond it. Files
+not named like generated ones are never removed.
+Every folder gets a _folder.md and every image a .md sidecar, like the demo
+gallery in tenrankai-dot-com/photos. Images are small JPEGs with EXIF data.
+
+Requires: pip install pillow
+"""
+
+import argparse
+import os
+import re
+import sys
+from datetime import datetime, timedelta
+from typing import Iterator, Optional, Set, Tuple
+
+from PIL import Image, ImageDraw
+
+EXIF_IFD = 0x8769
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+# Names the generator writes; prune never touches anything else
+GENERATED_DIR_RE = re.compile(r"folder_\d{2}(?:[/\\]folder_\d{2})*")
+GENERATED_FILE_RE = re.compile(r"img_\d{6}\.(?:jpg|md)|_folder\.md")
+CAMERAS = [
+    ("Canon", "Canon EOS R5"),
+    ("NIKON CORPORATION", "NIKON D850"),
+    ("FUJIFILM", "X-T5"),
+    ("SONY", "ILCE-7RM5"),
+]
+
+def folder_paths(depth: int, folders: int) -> Iterator[str]:
+    """Relative folder paths, breadth-first: folder_00, folder_01, ..., folder_00/folder_00, ..."""
+    level = [""]
+    for _ in range(depth):
+        level = [os.path.join(parent, f"folder_{i:02d}") for parent in level for i in range(folders)]
+        yield from level
+
+def capacity(depth: int, folders: int, images_per_folder: int) -> int:
+    return images_per_folder * sum(folders ** level for level in range(1, depth + 1))
+
+def make_exif(index: int) -> Image.Exif:
+    make, model = CAMERAS[index % len(CAMERAS)]
+    taken = datetime(2020, 1, 1) + timedelta(minutes=37 * index)
+    exif = Image.Exif()
+    exif[0x010F] = make                              # Make
+    exif[0x0110] = model                             # Model
+    exif[0x0112] = 1                                 # Orientation
+    exif[0x0132] = taken.strftime("%Y:%m:%d %H:%M:%S")
+    exif_ifd = exif.get_ifd(EXIF_IFD)
+    exif_ifd[0x9003] = taken.strftime("%Y:%m:%d %H:%M:%S")  # DateTimeOriginal
+    exif_ifd[0x8827] = 100 * (1 + index % 32)               # ISOSpeedRatings
+    return exif
+
+def write_image(path: str, index: int, size: Tuple[int, int]):
+    """Write a small JPEG whose colours vary with index, so files are not identical"""
+    width, height = size
+    hue = (index * 47) % 256
+    image = Image.new("RGB", size, (hue, 255 - hue, (hue * 3) % 256))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle([width // 4, height // 4, 3 * width // 4, 3 * height // 4],
+                   fill=((hue * 7) % 256, (hue * 5) % 256, hue))
+    image.save(path, "JPEG", quality=80, exif=make_exif(index).tobytes())
+
+def write_text(path: str, text: str):
+    if not os.path.exists(path):
+        with open(path, "w") as f:
+            f.write(text)
+
+def prune(output: str, keep: Set[str]) -> int:
+    """Delete generated files under output that are not in keep, and the generated
+    folders left empty; returns the images remaining in the tree.
+    
+    Only paths following the generator's naming (folder_NN/.../img_NNNNNN.jpg,
+    its .md sidecar and the folders' _folder.md) are touched, so photos placed
+    next to the synthetic tree are kept.
+    """
+    images = 0
+    for root, _, files in os.walk(output, topdown=False):
+        generated_dir = GENERATED_DIR_RE.fullmatch(os.path.relpath(root, output)) is not None
+        for name in files:
+            path = os.path.join(root, name)
+            if generated_dir and GENERATED_FILE_RE.fullmatch(name) and path not in keep:
+                os.remove(path)
+            elif name.lower().endswith(IMAGE_EXTENSIONS):
+                images += 1
+        if generated_dir and not os.listdir(root):
+            os.rmdir(root)
+    return images
+
+def generate_gallery(output: str, depth: int = 3, folders: int = 10, images_per_folder: int = 100,
+                     limit: Optional[int] = None, size: Tuple[int, int] = (160, 120)) -> Tuple[int, int]:
+    """Fill output with limit generated images, reusing existing files and
+    removing generated ones beyond limit.
+    
+    Returns (images in tree, including any that were not generated, images
+    created by this call).
+    """
+    total = capacity(depth, folders, images_per_folder)
+    if limit is None or limit > total:
+        limit = total
+    
+    os.makedirs(output, exist_ok=True)
+    keep = {os.path.join(output, "_folder.md")}
+    write_text(os.path.join(output, "_folder.md"),
+               "# Synthetic Gallery\n\nGenerated photo tree for gallery scaling tests.\n")
+    
+    index = 0
+    created = 0
+    for folder in folder_paths(depth, folders):
+        if index >= limit:
+            break
+        folder_dir = os.path.join(output, folder)
+        os.makedirs(folder_dir, exist_ok=True)
+        keep.add(os.path.join(folder_dir, "_folder.md"))
+        write_text(os.path.join(folder_dir, "_folder.md"),
+                   f"# {folder.replace(os.sep, ' / ')}\n\n"
+                   f"Synthetic folder at depth {folder.count(os.sep) + 1}.\n")
+        for _ in range(min(images_per_folder, limit - index)):
+            name = f"img_{index:06d}"
+            image_path = os.path.join(folder_dir, f"{name}.jpg")
+            if not os.path.exists(image_path):
+                write_image(image_path, index, size)
+                created += 1
+            make, model = CAMERAS[index % len(CAMERAS)]
+            keep.update((image_path, os.path.join(folder_dir, f"{name}.md")))
+            write_text(os.path.join(folder_dir, f"{name}.md"),
+                       f"# Synthetic Photo {index}\n\n"
+                       f"Generated image {index} in `{folder}`.\n\n"
+                       f"**Camera**: {make} {model}\n")
+            index += 1
+    return prune(output, keep), created
+
+def parse_size(value: str) -> Tuple[int, int]:
+    width, _, height = value.lower().partition("x")
+    return int(width), int(height)
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic photo tree')
+    parser.add_argument('output', help='Directory to create (e.g. tenrankai-dot-com/bench/photos)')
+    parser.add_argument('--depth', type=int, default=3, help='Folder nesting depth (default: 3)')
+    parser.add_argument('--folders', type=int, default=10, help='Subfolders per folder (default: 10)')
+    parser.add_argument('--images-per-folder', type=int, default=100,
+                        help='Images in each folder (default: 100)')
+    parser.add_argument('--limit', type=int, default=None,
+                        help='Stop after this many images (default: fill every folder)')
+    parser.add_argument('--size', type=parse_size, default=(160, 120),
+                        help='Image dimensions as WIDTHxHEIGHT (default: 160x120)')
+    args = parser.parse_args()
+    
+    total, created = generate_gallery(args.output, args.depth, args.folders,
+                                      args.images_per_folder, args.limit, args.size)
+    print(f"✓ {args.output}: {total} images ({created} new), "
+          f"capacity {capacity(args.depth, args.folders, args.images_per_folder)}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
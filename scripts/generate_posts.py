@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Generate a synthetic posts corpus for posts-index scaling tests.
+
+Writes blog/ and docs/ directories of markdown posts with TOML front matter in
+the same format as tenrankai-dot-com/posts/docs/*.md:
+
+    +++
+    title = "..."
+    summary = "..."
+    date = "2026-01-13"
+    +++
+
+Existing files are overwritten so that the corpus is reproducible from --seed.
+"""
+
+import argparse
+import os
+import random
+import sys
+from datetime import date, timedelta
+from typing import List
+
+TOPICS = [
+    "Galleries", "Permissions", "Caching", "Deployment", "Theming", "Watermarks",
+    "Tile Zoom", "Virtual Hosts", "S3 Storage", "Authentication", "Posts", "Metadata",
+]
+WORDS = (
+    "tenrankai gallery image cache folder config server request template site preview "
+    "thumbnail permission role upload resize format quality webp avif jpeg markdown post "
+    "index page reload storage prefix directory metadata exif camera lens zoom tile"
+).split()
+
+def sentence(rng: random.Random) -> str:
+    words = rng.choices(WORDS, k=rng.randint(8, 18))
+    return " ".join(words).capitalize() + "."
+
+def paragraph(rng: random.Random) -> str:
+    return " ".join(sentence(rng) for _ in range(rng.randint(3, 6)))
+
+def post_body(rng: random.Random, title: str, sections: int) -> str:
+    parts = [f"# {title}", "", paragraph(rng), ""]
+    for i in range(sections):
+        parts += [f"## {rng.choice(TOPICS)} {i + 1}", "", paragraph(rng), ""]
+        kind = i % 3
+        if kind == 0:
+            parts += ["```toml", f'name = "{rng.choice(WORDS)}"',
+                      f"images_per_page = {rng.randint(10, 100)}", "```", ""]
+        elif kind == 1:
+            parts += [f"- {sentence(rng)}" for _ in range(4)] + [""]
+        else:
+            parts += ["| Setting | Value |", "|---------|-------|"]
+            parts += [f"| `{rng.choice(WORDS)}` | {rng.randint(1, 500)} |" for _ in range(3)] + [""]
+    return "\n".join(parts)
+
+def generate_posts(output: str, kind: str, count: int, sections: int = 4, seed: int = 1) -> List[str]:
+    """Write count posts to output/kind and return their slugs"""
+    rng = random.Random(f"{seed}-{kind}")
+    directory = os.path.join(output, kind)
+    os.makedirs(directory, exist_ok=True)
+    first_day = date(2020, 1, 1)
+    slugs = []
+    for i in range(count):
+        topic = TOPICS[i % len(TOPICS)]
+        slug = f"{i:05d}-{topic.lower().replace(' ', '-')}"
+        title = f"{topic} {'Guide' if kind == 'docs' else 'Update'} {i}"
+        published = first_day + timedelta(days=i % 2000)
+        front_matter = (
+            "+++\n"
+            f'title = "{title}"\n'
+            f'summary = "{sentence(rng)}"\n'
+            f'date = "{published.isoformat()}"\n'
+            "+++\n\n"
+        )
+        with open(os.path.join(directory, f"{slug}.md"), "w") as f:
+            f.write(front_matter + post_body(rng, title, sections))
+        slugs.append(slug)
+    return slugs
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic posts corpus')
+    parser.add_argument('output', help='Directory to fill with blog/ and docs/ (e.g. tenrankai-dot-com/bench/posts)')
+    parser.add_argument('--blog', type=int, default=2000, help='Blog posts to write (default: 2000)')
+    parser.add_argument('--docs', type=int, default=5000, help='Docs posts to write (default: 5000)')
+    parser.add_argument('--sections', type=int, default=4, help='Sections per post (default: 4)')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed (default: 1)')
+    args = parser.parse_args()
+    
+    for kind, count in (("blog", args.blog), ("docs", args.docs)):
+        generate_posts(args.output, kind, count, args.sections, args.seed)
+        print(f"✓ {os.path.join(args.output, kind)}: {count} posts")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
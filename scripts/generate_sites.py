@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Generate synthetic virtual-host sites in a ConfigStorage tree.
+
+Adds sites/vh-*/site.toml files next to the existing sites:
+
+    vh-exact-NNNN   hostnames = ["siteNNNN.example.test"]
+    vh-wild-NNNN    hostnames = ["*.wNNNN.example.test"]
+    vh-priority     hostnames = ["www.w0000.example.test"]
+
+vh-priority overlaps the first wildcard site, so requests for it show whether
+an exact hostname wins over a glob. Every site serves its own static
+directory first, holding a vhost-site.txt file with the site name, so a client
+can tell which site answered a request. Sites from earlier runs are removed.
+"""
+
+import argparse
+import glob
+import json
+import os
+import shutil
+import sys
+from typing import Any, Dict, List
+
+SITE_PREFIX = "vh-"
+SITE_MARKER = "vhost-site.txt"
+DOMAIN = "example.test"
+
+def write_marker(marker_root: str, name: str) -> str:
+    """Create marker_root/name/vhost-site.txt and return the directory"""
+    directory = os.path.join(marker_root, name)
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, SITE_MARKER), "w") as f:
+        f.write(name)
+    return directory
+
+def generate_sites(storage_dir: str, marker_root: str, exact: int, wildcard: int,
+                   templates: List[str], static_files: List[str]) -> List[Dict[str, Any]]:
+    """Write the synthetic sites and return [{"name", "kind", "hostnames"}, ...]"""
+    for old in glob.glob(os.path.join(storage_dir, "sites", f"{SITE_PREFIX}*")):
+        shutil.rmtree(old)
+    shutil.rmtree(marker_root, ignore_errors=True)
+
+    sites = [{"name": f"{SITE_PREFIX}exact-{i:04d}", "kind": "exact",
+              "hostnames": [f"site{i:04d}.{DOMAIN}"]} for i in range(exact)]
+    sites += [{"name": f"{SITE_PREFIX}wild-{i:04d}", "kind": "wildcard",
+               "hostnames": [f"*.w{i:04d}.{DOMAIN}"]} for i in range(wildcard)]
+    if wildcard:
+        sites.append({"name": f"{SITE_PREFIX}priority", "kind": "priority",
+                      "hostnames": [f"www.w0000.{DOMAIN}"]})
+
+    for site in sites:
+        marker = write_marker(marker_root, site["name"])
+        directory = os.path.join(storage_dir, "sites", site["name"])
+        os.makedirs(directory, exist_ok=True)
+        # JSON string and list syntax is valid TOML for these values
+        with open(os.path.join(directory, "site.toml"), "w") as f:
+            f.write(f"# Synthetic {site['kind']} site generated by scripts/generate_sites.py\n\n"
+                    f"hostnames = {json.dumps(site['hostnames'])}\n"
+                    f"templates = {json.dumps(templates)}\n"
+                    f"static_files = {json.dumps([marker] + static_files)}\n"
+                    f'base_url = "https://{site["hostnames"][0].replace("*", "www")}"\n')
+    return sites
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic virtual-host sites')
+    parser.add_argument('storage', help='ConfigStorage directory to add sites to')
+    parser.add_argument('--markers', required=True,
+                        help='Directory for the per-site static marker directories')
+    parser.add_argument('--exact', type=int, default=100, help='Sites with exact hostnames (default: 100)')
+    parser.add_argument('--wildcard', type=int, default=100,
+                        help='Sites with wildcard-subdomain hostnames (default: 100)')
+    parser.add_argument('--templates', nargs='+', required=True,
+                        help='Template directories for every site (absolute paths)')
+    parser.add_argument('--static', nargs='+', default=[],
+                        help='Static directories served after the marker (absolute paths)')
+    args = parser.parse_args()
+
+    sites = generate_sites(args.storage, os.path.abspath(args.markers), args.exact, args.wildcard,
+                           args.templates, args.static)
+    print(f"✓ {args.storage}: {len(sites)} sites")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
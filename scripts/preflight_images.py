@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+"""Pre-flight check of gallery source images before deployment.
+
+Walks each gallery's source_directory and reads, from headers only via mmap
+(no pixel data is decoded):
+
+    JPEG        SOF dimensions, progressive coding, components (CMYK), EXIF
+                orientation, EXIF (IFD1) embedded thumbnail, ICC profile
+    HEIC/AVIF   ispe dimensions, irot/imir transforms, colr ICC or nclx
+                primaries, thmb item references
+    PNG         IHDR dimensions, iCCP profile
+
+From that it estimates the cost of resizing each image to the gallery's
+configured sizes and the total work [pregenerate] would do, and flags the
+outliers (huge or heavy originals, CMYK) that make first hits slow.
+
+The cost model is a rough single-core estimate in milliseconds: decoding
+scales with source megapixels and compressed bytes, resizing with source
+megapixels, encoding with output megapixels and format. Scale it to a machine
+with --cost-scale.
+
+Uses the standard library only.
+"""
+
+import argparse
+import json
+import mmap
+import os
+import statistics
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from analyze_cache import gallery_configs, load_toml
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXTENSIONS = (".jpg", ".jpeg", ".png", ".heic", ".heif", ".avif")
+# Size class -> gallery config table
+SIZE_TABLES = {"thumbnail": "thumbnail", "gallery": "gallery_size", "medium": "medium", "large": "large"}
+# Cost model, milliseconds per megapixel (or per MB of compressed input)
+DECODE_MS_PER_MP = {"jpeg": 8.0, "png": 20.0, "heic": 35.0, "avif": 40.0}
+DECODE_MS_PER_MB = 6.0
+PROGRESSIVE_FACTOR = 1.6
+RESIZE_MS_PER_MP = 4.0
+ROTATE_MS_PER_MP = 2.0
+ENCODE_MS_PER_MP = {"jpeg": 6.0, "webp": 30.0, "avif": 200.0, "png": 40.0}
+# EXIF orientation -> (clockwise rotation for display, mirrored)
+EXIF_ORIENTATION = {1: (0, False), 2: (0, True), 3: (180, False), 4: (180, True),
+                    5: (270, True), 6: (90, False), 7: (90, True), 8: (270, False)}
+
+def icc_summary(data):
+    """Colour space and description from the first bytes of an ICC profile"""
+    if len(data) < 132:
+        return None
+    info = {"color_space": data[16:20].decode("latin-1").strip(), "description": None}
+    count = struct.unpack(">I", data[128:132])[0]
+    for i in range(min(count, 64)):
+        entry = 132 + 12 * i
+        if entry + 12 > len(data):
+            break
+        signature, offset, size = struct.unpack(">4sII", data[entry:entry + 12])
+        if signature != b"desc" or offset + 12 > len(data):
+            continue
+        kind = data[offset:offset + 4]
+        if kind == b"desc":
+            length = struct.unpack(">I", data[offset + 8:offset + 12])[0]
+            text = data[offset + 12:offset + 12 + length].split(b"\0")[0].decode("latin-1")
+        elif kind == b"mluc" and offset + 28 <= len(data):
+            length, start = struct.unpack(">II", data[offset + 20:offset + 28])
+            text = data[offset + start:offset + start + length].decode("utf-16-be", "replace")
+        else:
+            break
+        info["description"] = text.strip() or None
+        break
+    return info
+
+def parse_exif(view, start, end, info):
+    """Orientation and IFD1 thumbnail from an EXIF APP1 payload (TIFF header at start)"""
+    order = {b"II": "<", b"MM": ">"}.get(bytes(view[start:start + 2]))
+    if not order:
+        return
+
+    def ifd_entries(offset):
+        base = start + offset
+        if base + 2 > end:
+            return [], 0
+        count = struct.unpack(order + "H", view[base:base + 2])[0]
+        entries = []
+        for i in range(count):
+            entry = base + 2 + 12 * i
+            if entry + 12 > end:
+                break
+            tag, kind, _, value = struct.unpack(order + "HHI4s", view[entry:entry + 12])
+            entries.append((tag, kind, value))
+        next_at = base + 2 + 12 * count
+        following = struct.unpack(order + "I", view[next_at:next_at + 4])[0] if next_at + 4 <= end else 0
+        return entries, following
+
+    ifd0, ifd1 = ifd_entries(struct.unpack(order + "I", view[start + 4:start + 8])[0])
+    for tag, kind, value in ifd0:
+        if tag == 0x0112:
+            info["orientation"] = struct.unpack(order + "H", value[:2])[0]
+    if ifd1:
+        tags = {tag for tag, _, _ in ifd_entries(ifd1)[0]}
+        info["thumbnail"] = info["thumbnail"] or 0x0201 in tags
+
+def parse_jpeg(view, info):
+    pos = 2
+    size = len(view)
+    while pos + 4 <= size:
+        if view[pos] != 0xFF:
+            return
+        marker = view[pos + 1]
+        if marker == 0xFF:
+            pos += 1  # Fill byte
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            pos += 2
+            continue
+        if marker == 0xDA:
+            return  # Image data starts; every header segment has been seen
+        length = struct.unpack(">H", view[pos + 2:pos + 4])[0]
+        body, end = pos + 4, min(pos + 2 + length, size)
+        if marker == 0xE1 and bytes(view[body:body + 6]) == b"Exif\0\0":
+            parse_exif(view, body + 6, end, info)
+        elif marker == 0xE2 and bytes(view[body:body + 12]) == b"ICC_PROFILE\0" and info["icc"] is None:
+            # Chunk 1 of the profile holds its header and tag table
+            info["icc"] = icc_summary(bytes(view[body + 14:end])) or {"color_space": "?", "description": None}
+        elif 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width, components = struct.unpack(">xHHB", view[body:body + 6])
+            info.update(width=width, height=height, components=components,
+                        progressive=marker in (0xC2, 0xC6, 0xCA, 0xCE))
+        pos += 2 + length
+
+def boxes(view, start, end):
+    """(type, body start, box end) of the ISOBMFF boxes between start and end"""
+    pos = start
+    while pos + 8 <= end:
+        size, kind = struct.unpack(">I4s", view[pos:pos + 8])
+        header = 8
+        if size == 1 and pos + 16 <= end:
+            size = struct.unpack(">Q", view[pos + 8:pos + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            return
+        yield kind.decode("latin-1"), pos + header, min(pos + size, end)
+        pos += size
+
+def parse_heif(view, info):
+    primary = None
+    properties = []
+    associations = {}
+    for kind, body, end in boxes(view, 0, len(view)):
+        if kind == "ftyp":
+            brands = {bytes(view[i:i + 4]) for i in range(body, end, 4)}
+            info["format"] = "avif" if brands & {b"avif", b"avis"} else "heic"
+        if kind != "meta":
+            continue
+        for child, cbody, cend in boxes(view, body + 4, end):
+            if child == "pitm":
+                version = view[cbody]
+                primary = struct.unpack(">H" if version == 0 else ">I",
+                                        view[cbody + 4:cbody + (6 if version == 0 else 8)])[0]
+            elif child == "iref":
+                for ref, _, _ in boxes(view, cbody + 4, cend):
+                    if ref == "thmb":
+                        info["thumbnail"] = True
+            elif child == "iprp":
+                for part, pbody, pend in boxes(view, cbody, cend):
+                    if part == "ipco":
+                        properties = list(boxes(view, pbody, pend))
+                    elif part == "ipma":
+                        version, flags = view[pbody], int.from_bytes(view[pbody + 1:pbody + 4], "big")
+                        pos = pbody + 8
+                        for _ in range(struct.unpack(">I", view[pbody + 4:pbody + 8])[0]):
+                            if version < 1:
+                                item = struct.unpack(">H", view[pos:pos + 2])[0]
+                                pos += 2
+                            else:
+                                item = struct.unpack(">I", view[pos:pos + 4])[0]
+                                pos += 4
+                            indexes = []
+                            count = view[pos]
+                            pos += 1
+                            for _ in range(count):
+                                if flags & 1:
+                                    indexes.append(struct.unpack(">H", view[pos:pos + 2])[0] & 0x7FFF)
+                                    pos += 2
+                                else:
+                                    indexes.append(view[pos] & 0x7F)
+                                    pos += 1
+                            associations[item] = indexes
+        break
+
+    mirrored = False
+    rotation = 0
+    for index in associations.get(primary, []):
+        if not 1 <= index <= len(properties):
+            continue
+        kind, body, end = properties[index - 1]
+        if kind == "ispe":
+            info["width"], info["height"] = struct.unpack(">II", view[body + 4:body + 12])
+        elif kind == "irot":
+            # Anticlockwise quarter turns
+            rotation = (360 - 90 * (view[body] & 3)) % 360
+        elif kind == "imir":
+            mirrored = True
+        elif kind == "colr":
+            colour = bytes(view[body:body + 4])
+            if colour in (b"prof", b"rICC"):
+                info["icc"] = icc_summary(bytes(view[body + 4:end])) or {"color_space": "?", "description": None}
+            elif colour == b"nclx":
+                primaries = struct.unpack(">H", view[body + 4:body + 6])[0]
+                info["nclx_primaries"] = {1: "BT.709/sRGB", 9: "BT.2020", 12: "Display P3"}.get(primaries,
+                                                                                             str(primaries))
+    info["rotation"], info["mirrored"] = rotation, mirrored
+
+def parse_png(view, info):
+    info["width"], info["height"] = struct.unpack(">II", view[16:24])
+    for kind, body, end in png_chunks(view):
+        if kind == b"iCCP":
+            name = bytes(view[body:min(end, body + 80)]).split(b"\0")[0].decode("latin-1")
+            info["icc"] = {"color_space": "?", "description": name}
+        elif kind in (b"IDAT", b"IEND"):
+            return
+
+def png_chunks(view):
+    pos = 8
+    while pos + 8 <= len(view):
+        length, kind = struct.unpack(">I4s", view[pos:pos + 8])
+        yield kind, pos + 8, pos + 8 + length
+        pos += 12 + length
+
+def inspect(path):
+    """Header facts of one image file, without decoding pixels"""
+    info = {"path": path, "format": None, "bytes": 0, "width": None, "height": None,
+            "orientation": 1, "rotation": 0, "mirrored": False, "icc": None, "thumbnail": False,
+            "progressive": False, "components": None, "error": None}
+    try:
+        with open(path, "rb") as f:
+            info["bytes"] = os.fstat(f.fileno()).st_size
+            if not info["bytes"]:
+                info["error"] = "empty file"
+                return info
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    head = bytes(view[:12])
+                    if head.startswith(b"\xff\xd8"):
+                        info["format"] = "jpeg"
+                        parse_jpeg(view, info)
+                        info["rotation"], info["mirrored"] = EXIF_ORIENTATION.get(info["orientation"], (0, False))
+                    elif head.startswith(b"\x89PNG\r\n\x1a\n"):
+                        info["format"] = "png"
+                        parse_png(view, info)
+                    elif head[4:8] == b"ftyp":
+                        parse_heif(view, info)
+                    else:
+                        info["error"] = "unknown format"
+                finally:
+                    view.release()
+    except (OSError, ValueError, struct.error, IndexError) as e:
+        info["error"] = str(e) or type(e).__name__
+    if not info["error"] and not info["width"]:
+        info["error"] = "no dimensions in header"
+    return info
+
+def output_megapixels(width, height, box):
+    """Megapixels of an image fitted inside box (never enlarged)"""
+    scale = min(1.0, box[0] / width, box[1] / height)
+    return round(width * scale) * round(height * scale) / 1e6
+
+def estimate(info, boxes_by_size, formats, cost_scale):
+    """Milliseconds to generate each variant, the slowest single first hit and the pregeneration total"""
+    width, height = info["width"], info["height"]
+    if info["rotation"] in (90, 270):
+        width, height = height, width
+    megapixels = width * height / 1e6
+    decode = megapixels * DECODE_MS_PER_MP.get(info["format"], 20.0) + info["bytes"] / 1e6 * DECODE_MS_PER_MB
+    if info["progressive"]:
+        decode *= PROGRESSIVE_FACTOR
+    prepare = decode + megapixels * RESIZE_MS_PER_MP
+    if info["rotation"] or info["mirrored"]:
+        prepare += megapixels * ROTATE_MS_PER_MP
+    variants = {}
+    for size, box in boxes_by_size.items():
+        out = output_megapixels(width, height, box)
+        for fmt in formats:
+            # On-demand generation decodes the source for every variant
+            variants[f"{size}/{fmt}"] = (prepare + out * ENCODE_MS_PER_MP[fmt]) * cost_scale
+    return {"megapixels": megapixels, "variants": variants,
+            "first_hit_ms": max(variants.values(), default=0.0),
+            "pregenerate_ms": sum(variants.values())}
+
+def gallery_plan(gallery, formats_override):
+    """({size: (width, height)}, [formats]) from a gallery config and its [pregenerate]"""
+    pregenerate = gallery.get("pregenerate", {})
+    enabled_sizes = pregenerate.get("sizes")
+    boxes_by_size = {}
+    for size, table in SIZE_TABLES.items():
+        box = gallery.get(table)
+        if isinstance(box, dict) and box.get("width") and box.get("height"):
+            if enabled_sizes is None or enabled_sizes.get(size):
+                boxes_by_size[size] = (box["width"], box["height"])
+    formats = formats_override or [f for f, on in pregenerate.get("formats", {"jpeg": True}).items() if on]
+    return boxes_by_size, [f for f in formats if f in ENCODE_MS_PER_MP]
+
+def find_images(root):
+    found = []
+    stack = [root]
+    while stack:
+        try:
+            entries = list(os.scandir(stack.pop()))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(entry.path)
+            elif entry.name.lower().endswith(EXTENSIONS):
+                found.append(entry.path)
+    return sorted(found)
+
+def flags_for(info, cost, args, median_bytes_per_mp):
+    flags = []
+    if cost["megapixels"] >= args.max_megapixels:
+        flags.append(f"{cost['megapixels']:.0f}MP")
+    if info["bytes"] >= args.max_bytes * 1e6:
+        flags.append(f"{info['bytes'] / 1e6:.1f}MB original")
+    bytes_per_mp = info["bytes"] / max(cost["megapixels"], 0.01)
+    if median_bytes_per_mp and bytes_per_mp > args.outlier_factor * median_bytes_per_mp:
+        flags.append(f"{bytes_per_mp / 1e6:.1f}MB per megapixel")
+    if cost["first_hit_ms"] >= args.slow_ms:
+        flags.append(f"~{cost['first_hit_ms']:.0f}ms first hit")
+    if info["components"] == 4 or (info["icc"] or {}).get("color_space") == "CMYK":
+        flags.append("CMYK")
+    return flags
+
+def print_summary(name, records, plan, args):
+    boxes_by_size, formats = plan
+    images = [r for r in records if not r["error"]]
+    print(f"\n{name}: {len(records)} images, {sum(r['bytes'] for r in records) / 1e6:.1f}MB")
+    for r in records:
+        if r["error"]:
+            print(f"  ✗ {r['path']}: {r['error']}")
+    if not images:
+        return 0
+    by_format = {}
+    for r in images:
+        by_format[r["format"]] = by_format.get(r["format"], 0) + 1
+    rotated = sum(1 for r in images if r["rotation"] or r["mirrored"])
+    profiles = {}
+    for r in images:
+        icc = r["icc"]
+        label = (icc.get("description") or icc.get("color_space")) if icc else r.get("nclx_primaries", "none")
+        profiles[label] = profiles.get(label, 0) + 1
+    print(f"  Formats: {', '.join(f'{k} {v}' for k, v in sorted(by_format.items()))}")
+    print(f"  Megapixels: median {statistics.median(r['cost']['megapixels'] for r in images):.1f}, "
+          f"max {max(r['cost']['megapixels'] for r in images):.1f}; "
+          f"{rotated} need rotation; {sum(r['thumbnail'] for r in images)} have an embedded thumbnail; "
+          f"{sum(r['progressive'] for r in images)} progressive")
+    print(f"  Colour profiles: {', '.join(f'{k} {v}' for k, v in sorted(profiles.items(), key=lambda i: -i[1]))}")
+
+    sizes = ", ".join(f"{s} {w}x{h}" for s, (w, h) in boxes_by_size.items())
+    first_hits = sorted(r["cost"]["first_hit_ms"] for r in images)
+    total_ms = sum(r["cost"]["pregenerate_ms"] for r in images)
+    print(f"  Plan: {sizes} x {', '.join(formats)} = {len(boxes_by_size) * len(formats) * len(images)} variants")
+    print(f"  Estimated slowest first hit per image: median {statistics.median(first_hits):.0f}ms, "
+          f"max {first_hits[-1]:.0f}ms")
+    print(f"  Estimated pregeneration: {total_ms / 1000:.1f} CPU-seconds "
+          f"({total_ms / 1000 / max(1, args.server_cores):.1f}s on {args.server_cores} cores)")
+
+    folders = {}
+    for r in images:
+        folder = os.path.dirname(os.path.relpath(r["path"], r["root"])) or "."
+        entry = folders.setdefault(folder, [0, 0, 0.0])
+        entry[0] += 1
+        entry[1] += r["bytes"]
+        entry[2] += r["cost"]["pregenerate_ms"]
+    print("  By folder (most work first)")
+    for folder, (count, size, ms) in sorted(folders.items(), key=lambda i: -i[1][2])[:args.show]:
+        print(f"    {folder:<32} {count:>7} images {size / 1e6:>9.1f}MB {ms / 1000:>9.1f} CPU-s")
+
+    flagged = [r for r in images if r["flags"]]
+    if flagged:
+        print(f"  ⚠ {len(flagged)} outliers (slowest first):")
+        for r in sorted(flagged, key=lambda r: -r["cost"]["first_hit_ms"])[:args.show]:
+            print(f"      {os.path.relpath(r['path'], r['root'])}: {', '.join(r['flags'])}")
+    else:
+        print("  ✓ No outliers")
+    return len(flagged)
+
+def main():
+    parser = argparse.ArgumentParser(description="Check gallery source images from their headers")
+    parser.add_argument("paths", nargs="*", help="Directories or files to check instead of the config's galleries")
+    parser.add_argument("--config", default=os.path.join(REPO_ROOT, "tenrankai-dot-com", "config.toml"),
+                        help="Bootstrap config whose galleries to check")
+    parser.add_argument("--gallery", action="append", dest="galleries",
+                        help="Gallery name to check (repeatable, default: every local gallery)")
+    parser.add_argument("--gallery-file", help="Gallery TOML giving sizes and [pregenerate] for paths")
+    parser.add_argument("--formats", nargs="+", choices=sorted(ENCODE_MS_PER_MP),
+                        help="Output formats to estimate (default: [pregenerate] formats, or jpeg)")
+    parser.add_argument("--max-megapixels", type=float, default=40.0, help="Flag larger originals")
+    parser.add_argument("--max-bytes", type=float, default=3.0, help="Flag originals of at least this many MB")
+    parser.add_argument("--slow-ms", type=float, default=500.0, help="Flag estimated first hits this slow")
+    parser.add_argument("--outlier-factor", type=float, default=3.0,
+                        help="Flag bytes per megapixel this many times the gallery median")
+    parser.add_argument("--cost-scale", type=float, default=1.0, help="Multiply every cost estimate")
+    parser.add_argument("--server-cores", type=int, default=os.cpu_count() or 1,
+                        help="Cores the server pregenerates with")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Processes reading headers")
+    parser.add_argument("--show", type=int, default=10, help="Rows listed per table")
+    parser.add_argument("--strict", action="store_true", help="Exit 1 when any image is flagged or unreadable")
+    parser.add_argument("--json", help="Write every image's header facts and estimates to this file")
+    args = parser.parse_args()
+
+    targets = []
+    if args.paths:
+        gallery = load_toml(args.gallery_file) if args.gallery_file else {
+            table: {"width": w, "height": h} for table, (w, h) in
+            [("thumbnail", (300, 300)), ("gallery_size", (800, 800)), ("medium", (1200, 1200)),
+             ("large", (1600, 1600))]}
+        for path in args.paths:
+            files = find_images(path) if os.path.isdir(path) else [path]
+            root = path if os.path.isdir(path) else os.path.dirname(path)
+            targets.append((path, root, files, gallery_plan(gallery, args.formats)))
+    else:
+        site_root = os.path.dirname(args.config)
+        for path, gallery in gallery_configs(args.config):
+            name = gallery.get("name", os.path.splitext(os.path.basename(path))[0])
+            source = gallery.get("source_directory", "")
+            if args.galleries and name not in args.galleries:
+                continue
+            if "://" in source:
+                print(f"⚠ {name}: S3 source {source} skipped")
+                continue
+            root = os.path.join(site_root, source)
+            targets.append((name, root, find_images(root), gallery_plan(gallery, args.formats)))
+    if not targets:
+        print("✗ No local galleries or paths to check")
+        return 1
+
+    start = time.perf_counter()
+    all_records = {}
+    flagged = errors = 0
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        for name, root, files, plan in targets:
+            records = list(pool.map(inspect, files, chunksize=64))
+            for r in records:
+                r["root"] = root
+                if not r["error"]:
+                    r["cost"] = estimate(r, plan[0], plan[1], args.cost_scale)
+            readable = [r for r in records if not r["error"]]
+            ratios = [r["bytes"] / max(r["cost"]["megapixels"], 0.01) for r in readable]
+            median_ratio = statistics.median(ratios) if len(ratios) >= 3 else 0.0
+            for r in readable:
+                r["flags"] = flags_for(r, r["cost"], args, median_ratio)
+            flagged += print_summary(name, records, plan, args)
+            errors += len(records) - len(readable)
+            all_records[name] = records
+    count = sum(len(records) for records in all_records.values())
+    elapsed = time.perf_counter() - start
+    print(f"\n{count} images read in {elapsed:.2f}s ({count / elapsed * 60 if elapsed else 0:.0f} per minute)")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(all_records, f, indent=2)
+        print(f"Wrote report to {args.json}")
+    return 1 if args.strict and (flagged or errors) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
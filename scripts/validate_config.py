@@ -1,53 +1,537 @@
 #!/usr/bin/env python3
 """Validate Tenrankai TOML configuration files.
 
-Requires: pip install toml
+Validates each bootstrap config and every file of its ConfigStorage tree
+(sites/*/site.toml, galleries/*.toml, posts/*.toml, permissions.toml).
+Files are parsed in parallel and results are cached by content hash, so
+unchanged files are skipped on later runs.
+
+With --lint, a performance pass flags settings known to hurt throughput
+(missing pregeneration in production, short refresh intervals, oversized
+pages, variant sizes above the source resolution, cache and sources on
+different filesystems) and prints the dev-vs-production drift of those knobs.
+
+Uses the standard library tomllib (Python 3.11+); no dependencies.
 """
 
-import sys
+import argparse
+import glob
+import hashlib
+import json
 import os
-import toml
+import re
+import struct
+import sys
+import time
+import tomllib
+from concurrent.futures import ThreadPoolExecutor
 
-configs = [
-    "tenrankai-dot-com/config.toml",
-    "tenrankai-dot-com/config.dev.toml",
-    "tenrankai-dot-com/config.production.toml",
-]
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE = os.path.join(REPO_ROOT, ".cache", "validate_config.json")
+# Bump when checks change so cached results from older checks are discarded
+VALIDATOR_VERSION = "2"
 
-exit_code = 0
+# Performance lint thresholds
+MIN_CACHE_REFRESH_MINUTES = 30
+MIN_POSTS_REFRESH_MINUTES = 15
+MAX_IMAGES_PER_PAGE = 60
+MAX_POSTS_PER_PAGE = 30
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+COMMENTED_PREGENERATE_RE = re.compile(r"^\s*#\s*\[pregenerate\]", re.MULTILINE)
+# Knobs compared between the dev and production trees, per file kind
+PERF_KNOBS = {
+    "gallery": ["images_per_page", "cache_refresh_interval_minutes", "jpeg_quality", "webp_quality",
+                "pregenerate.formats", "pregenerate.sizes", "pregenerate.tiles", "tiles.tile_size",
+                "thumbnail", "gallery_size", "medium", "large", "preview",
+                "source_directory", "cache_directory"],
+    "posts": ["posts_per_page", "refresh_interval_minutes", "source_directory"],
+}
 
-for config in configs:
-    try:
-        with open(config, "r") as f:
-            data = toml.load(f)
-        print(f"✓ {config} is valid TOML")
+def collapse_inline_tables(text):
+    """Join multi-line inline tables onto one line.
+
+    Tenrankai accepts TOML 1.1 inline tables that span lines (and may have
+    trailing commas and comments), which TOML 1.0 parsers such as tomllib reject.
+    """
+    out = []
+    depth = 0
+    i = 0
+    quote = None
+    while i < len(text):
+        ch = text[i]
+        if quote:
+            out.append(ch)
+            if ch == "\\" and quote == '"' and i + 1 < len(text):
+                out.append(text[i + 1])
+                i += 1
+            elif text.startswith(quote, i):
+                quote = None
+        elif ch in "\"'":
+            quote = ch
+            out.append(ch)
+        elif ch == "#":
+            end = text.find("\n", i)
+            end = len(text) if end == -1 else end
+            if depth == 0:
+                out.append(text[i:end])
+            i = end
+            continue
+        elif ch == "{":
+            depth += 1
+            out.append(ch)
+        elif ch == "}":
+            depth = max(0, depth - 1)
+            # Drop a trailing comma before the closing brace
+            while out and out[-1] in " \t":
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            out.append(" }")
+        elif ch == "\n" and depth > 0:
+            out.append(" ")
+        else:
+            out.append(ch)
+        i += 1
+    return "".join(out)
+
+def require(data, keys, errors):
+    for key in keys:
+        if key not in data:
+            errors.append(f"missing required key: {key}")
 
-        # Check required sections - server and app are always required
-        for section in ["server", "app"]:
+def check_bootstrap(data, path):
+    errors, warnings = [], []
+    # Check required sections - server and app are always required
+    for section in ["server", "app"]:
+        if section not in data:
+            errors.append(f"missing required section: {section}")
+    # ConfigStorage configs use config_storage instead of inline sections;
+    # main() checks the directory itself since it may change without this file
+    if "config_storage" not in data.get("app", {}):
+        # Legacy config - check for inline sections
+        for section in ["templates", "static_files"]:
             if section not in data:
-                print(f"✗ {config} missing required section: {section}")
-                exit_code = 1
+                errors.append(f"missing required section: {section}")
+    return errors, warnings
 
-        # ConfigStorage configs use config_storage instead of inline sections
-        if "config_storage" in data.get("app", {}):
-            storage_path = data["app"]["config_storage"]
-            config_dir = os.path.dirname(config)
-            full_path = os.path.join(config_dir, storage_path)
-            if os.path.isdir(full_path):
-                print(f"  ✓ ConfigStorage directory exists: {storage_path}")
-            else:
-                print(f"  ⚠ ConfigStorage directory not found: {full_path}")
+def check_site(data, path):
+    errors, warnings = [], []
+    require(data, ["hostnames", "templates", "static_files"], errors)
+    hostnames = data.get("hostnames", [])
+    if not isinstance(hostnames, list) or not all(isinstance(h, str) for h in hostnames):
+        errors.append("hostnames must be a list of strings")
+    elif not hostnames:
+        warnings.append("hostnames is empty; the site is unreachable")
+    for key in ["templates", "static_files"]:
+        if key in data and not isinstance(data[key], (list, str)):
+            errors.append(f"{key} must be a path or a list of paths")
+    return errors, warnings
+
+def check_size_table(data, table, errors):
+    size = data.get(table)
+    if size is None:
+        return
+    for key in ["width", "height"]:
+        value = size.get(key)
+        if not isinstance(value, int) or value <= 0:
+            errors.append(f"[{table}] {key} must be a positive integer")
+
+def check_gallery(data, path):
+    errors, warnings = [], []
+    require(data, ["name", "url_prefix", "source_directory", "cache_directory"], errors)
+    if not str(data.get("url_prefix", "/")).startswith("/"):
+        errors.append("url_prefix must start with '/'")
+    for key in ["images_per_page", "cache_refresh_interval_minutes", "new_threshold_days"]:
+        if key in data and (not isinstance(data[key], int) or data[key] < 0):
+            errors.append(f"{key} must be a non-negative integer")
+    if "jpeg_quality" in data and not 1 <= data["jpeg_quality"] <= 100:
+        errors.append("jpeg_quality must be between 1 and 100")
+    if "webp_quality" in data and not 0 <= data["webp_quality"] <= 100:
+        errors.append("webp_quality must be between 0 and 100")
+    for table in ["thumbnail", "gallery_size", "medium", "large"]:
+        check_size_table(data, table, errors)
+    return errors, warnings
+
+def check_posts(data, path):
+    errors, warnings = [], []
+    require(data, ["name", "source_directory", "url_prefix"], errors)
+    if not str(data.get("url_prefix", "/")).startswith("/"):
+        errors.append("url_prefix must start with '/'")
+    for key in ["posts_per_page", "refresh_interval_minutes"]:
+        if key in data and (not isinstance(data[key], int) or data[key] < 0):
+            errors.append(f"{key} must be a non-negative integer")
+    return errors, warnings
+
+def check_permissions(data, path):
+    errors, warnings = [], []
+    roles = data.get("roles", {})
+    for key in ["public_role", "default_authenticated_role"]:
+        role = data.get(key)
+        if role is not None and role != "none" and role not in roles:
+            errors.append(f"{key} refers to undefined role: {role}")
+    for name, role in roles.items():
+        inherits = role.get("inherits")
+        if inherits is not None and inherits not in roles:
+            errors.append(f"role {name} inherits undefined role: {inherits}")
+        for permission, value in role.get("permissions", {}).items():
+            if not isinstance(value, bool):
+                errors.append(f"role {name} permission {permission} must be true or false")
+    for user, role in data.get("user_roles", {}).items():
+        if role not in roles:
+            errors.append(f"user {user} assigned undefined role: {role}")
+    return errors, warnings
+
+CHECKS = {
+    "bootstrap": check_bootstrap,
+    "site": check_site,
+    "gallery": check_gallery,
+    "posts": check_posts,
+    "permissions": check_permissions,
+}
+
+def storage_files(storage_dir):
+    """(path, kind) for every file of a ConfigStorage tree"""
+    files = []
+    for site_dir in sorted(glob.glob(os.path.join(storage_dir, "sites", "*"))):
+        if not os.path.isdir(site_dir):
+            continue
+        for name, kind in [("site.toml", "site"), ("permissions.toml", "permissions")]:
+            path = os.path.join(site_dir, name)
+            if os.path.exists(path):
+                files.append((path, kind))
+        files += [(p, "gallery") for p in sorted(glob.glob(os.path.join(site_dir, "galleries", "*.toml")))]
+        files += [(p, "posts") for p in sorted(glob.glob(os.path.join(site_dir, "posts", "*.toml")))]
+    return files
+
+def validate_file(path, kind, cache):
+    """Parse and check one file, reusing the cached result if its content is unchanged"""
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+    except OSError as e:
+        return {"errors": [f"cannot read: {e}"], "warnings": [], "data": {}, "cached": False}
+    digest = hashlib.sha256(VALIDATOR_VERSION.encode() + b"\0" + kind.encode() + b"\0" + raw).hexdigest()
+    cached = cache.get(path)
+    if cached and cached.get("hash") == digest:
+        return {**cached, "cached": True}
+
+    try:
+        data = tomllib.loads(collapse_inline_tables(raw.decode("utf-8")))
+        errors, warnings = CHECKS[kind](data, path)
+    except (tomllib.TOMLDecodeError, UnicodeDecodeError) as e:
+        data, errors, warnings = {}, [f"invalid TOML: {e}"], []
+    # Round-trip through JSON so cached and fresh results look the same
+    data = json.loads(json.dumps(data, default=str))
+    return {"hash": digest, "errors": errors, "warnings": warnings, "data": data, "cached": False}
+
+def cross_checks(results, files):
+    """Checks spanning files of one site: duplicate gallery/posts names and URL prefixes"""
+    errors = []
+    by_site = {}
+    for path, kind in files:
+        if kind in ("gallery", "posts"):
+            site = os.path.dirname(os.path.dirname(path))
+            by_site.setdefault(site, []).append((path, kind, results[path]["data"]))
+    for site, entries in by_site.items():
+        seen_names = {"gallery": {}, "posts": {}}
+        seen_prefixes = {}
+        for path, kind, data in entries:
+            for key, seen in [("name", seen_names[kind]), ("url_prefix", seen_prefixes)]:
+                value = data.get(key)
+                if value is None:
+                    continue
+                if value in seen:
+                    errors.append(f"{os.path.relpath(path)}: duplicate {key} '{value}' "
+                                  f"(also in {os.path.relpath(seen[value])})")
+                else:
+                    seen[value] = path
+    return errors
+
+def image_dimensions(path):
+    """(width, height) from a JPEG or PNG header without decoding the image, or None"""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(24)
+            if head.startswith(b"\x89PNG\r\n\x1a\n"):
+                return struct.unpack(">II", head[16:24])
+            if not head.startswith(b"\xff\xd8"):
+                return None
+            f.seek(2)
+            while True:
+                marker = f.read(2)
+                if len(marker) < 2 or marker[0] != 0xFF:
+                    return None
+                if marker[1] in (0xD8, 0x01) or 0xD0 <= marker[1] <= 0xD7:
+                    continue
+                length = struct.unpack(">H", f.read(2))[0]
+                # SOF0-SOF15 except DHT (C4), JPG (C8) and DAC (CC)
+                if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+                    height, width = struct.unpack(">xHH", f.read(5))
+                    return width, height
+                f.seek(length - 2, os.SEEK_CUR)
+    except (OSError, struct.error):
+        return None
+
+def source_dimensions(source_dir, limit):
+    """Header dimensions of up to limit images below source_dir"""
+    dims = []
+    stack = [source_dir]
+    while stack and len(dims) < limit:
+        try:
+            entries = list(os.scandir(stack.pop()))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(entry.path)
+            elif entry.name.lower().endswith(IMAGE_EXTENSIONS) and len(dims) < limit:
+                size = image_dimensions(entry.path)
+                if size:
+                    dims.append(size)
+    return dims
+
+def filesystem_id(path):
+    """st_dev of path, or of its nearest existing parent"""
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+    return os.stat(path).st_dev
+
+def knob(data, dotted):
+    value = data
+    for part in dotted.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+def lint_file(path, kind, data, site_root, production, sources):
+    """Performance findings for one gallery or posts file"""
+    findings = []
+    if kind == "posts":
+        refresh = data.get("refresh_interval_minutes")
+        if isinstance(refresh, int) and 0 < refresh < MIN_POSTS_REFRESH_MINUTES:
+            findings.append(f"refresh_interval_minutes = {refresh} rescans posts more often than "
+                            f"every {MIN_POSTS_REFRESH_MINUTES} minutes")
+        per_page = data.get("posts_per_page")
+        if isinstance(per_page, int) and per_page > MAX_POSTS_PER_PAGE:
+            findings.append(f"posts_per_page = {per_page} exceeds {MAX_POSTS_PER_PAGE}; "
+                            f"index pages render every summary on the page")
+        return findings
+
+    if production:
+        pregenerate = data.get("pregenerate")
+        if pregenerate is None:
+            try:
+                with open(path) as f:
+                    commented = COMMENTED_PREGENERATE_RE.search(f.read())
+            except OSError:
+                commented = None
+            state = "commented out" if commented else "missing"
+            findings.append(f"[pregenerate] is {state}; variants are generated on first request")
+        else:
+            for table in ["formats", "sizes"]:
+                enabled = pregenerate.get(table)
+                if isinstance(enabled, dict) and not any(enabled.values()):
+                    findings.append(f"[pregenerate] {table} are all disabled; nothing is pregenerated")
+    refresh = data.get("cache_refresh_interval_minutes")
+    if isinstance(refresh, int) and 0 < refresh < MIN_CACHE_REFRESH_MINUTES:
+        findings.append(f"cache_refresh_interval_minutes = {refresh} rescans the gallery more often "
+                        f"than every {MIN_CACHE_REFRESH_MINUTES} minutes")
+    per_page = data.get("images_per_page")
+    if isinstance(per_page, int) and per_page > MAX_IMAGES_PER_PAGE:
+        findings.append(f"images_per_page = {per_page} exceeds {MAX_IMAGES_PER_PAGE}")
+
+    source = data.get("source_directory")
+    cache_dir = data.get("cache_directory")
+    if not isinstance(source, str) or source.startswith("s3://"):
+        return findings
+    source_path = os.path.join(site_root, source)
+    dims = sources.get(source_path)
+    if dims:
+        for table in ["medium", "large"]:
+            box = data.get(table)
+            if not isinstance(box, dict) or not isinstance(box.get("width"), int) \
+                    or not isinstance(box.get("height"), int):
+                continue
+            fits = sum(1 for w, h in dims if max(w, h) <= max(box["width"], box["height"])
+                       and min(w, h) <= min(box["width"], box["height"]))
+            if fits:
+                findings.append(f"[{table}] {box['width']}x{box['height']} is at least the size of "
+                                f"{fits} of {len(dims)} source images")
+    if isinstance(cache_dir, str) and not cache_dir.startswith("s3://"):
+        source_dev = filesystem_id(source_path)
+        cache_dev = filesystem_id(os.path.join(site_root, cache_dir))
+        if source_dev is not None and cache_dev is not None and source_dev != cache_dev:
+            findings.append(f"cache_directory {cache_dir} is on a different filesystem from {source}")
+    return findings
+
+def format_knob(value):
+    if value is None:
+        return "-"
+    if isinstance(value, dict):
+        return ", ".join(f"{k}={format_knob(v)}" for k, v in value.items())
+    if isinstance(value, bool):
+        return str(value).lower()
+    return str(value)
+
+def knob_drift(dev_tree, prod_tree, results):
+    """(file, knob, dev value, production value) for every knob that differs"""
+    dev_dir, dev_files = dev_tree
+    prod_dir, prod_files = prod_tree
+    dev = {os.path.relpath(p, dev_dir): (kind, results[p]["data"]) for p, kind in dev_files}
+    prod = {os.path.relpath(p, prod_dir): (kind, results[p]["data"]) for p, kind in prod_files}
+    rows = []
+    for name in sorted(set(dev) | set(prod)):
+        kind = (dev.get(name) or prod.get(name))[0]
+        if kind not in PERF_KNOBS:
+            continue
+        if name not in dev or name not in prod:
+            rows.append((name, "(file)", "present" if name in dev else "-",
+                         "present" if name in prod else "-"))
+            continue
+        for key in PERF_KNOBS[kind]:
+            dev_value, prod_value = knob(dev[name][1], key), knob(prod[name][1], key)
+            if dev_value != prod_value:
+                rows.append((name, key, format_knob(dev_value), format_knob(prod_value)))
+    return rows
+
+def run_lint(configs, boot, trees, results, sample):
+    """Print performance findings per ConfigStorage tree and the dev-vs-production drift"""
+    storage = {}
+    for config in configs:
+        name = boot[config]["data"].get("app", {}).get("config_storage")
+        if name and trees[config]:
+            storage_dir = os.path.normpath(os.path.join(os.path.dirname(config), name))
+            storage.setdefault(storage_dir, (os.path.dirname(config), trees[config]))
+
+    print("\nPerformance lint")
+    sources = {}
+    findings_total = 0
+    for storage_dir, (site_root, files) in storage.items():
+        production = "production" in os.path.basename(storage_dir)
+        print(f"  {os.path.relpath(storage_dir)}{' (production)' if production else ''}")
+        for path, kind in files:
+            data = results[path]["data"]
+            if kind not in PERF_KNOBS or results[path]["errors"]:
+                continue
+            source = data.get("source_directory")
+            if kind == "gallery" and isinstance(source, str) and not source.startswith("s3://"):
+                source_path = os.path.join(site_root, source)
+                if source_path not in sources:
+                    sources[source_path] = source_dimensions(source_path, sample)
+            findings = lint_file(path, kind, data, site_root, production, sources)
+            findings_total += len(findings)
+            name = os.path.relpath(path, storage_dir)
+            for finding in findings:
+                print(f"    ⚠ {name}: {finding}")
+            if not findings:
+                print(f"    ✓ {name}")
+
+    dev_trees = [d for d in storage if "production" not in os.path.basename(d)]
+    prod_trees = [d for d in storage if "production" in os.path.basename(d)]
+    if dev_trees and prod_trees:
+        dev_dir, prod_dir = dev_trees[0], prod_trees[0]
+        rows = knob_drift((dev_dir, storage[dev_dir][1]), (prod_dir, storage[prod_dir][1]), results)
+        print(f"\nDev vs production ({os.path.relpath(dev_dir)} → {os.path.relpath(prod_dir)})")
+        if rows:
+            widths = [max(len(r[i]) for r in rows + [("File", "Knob", "Dev", "Production")]) for i in range(4)]
+            header = ("File", "Knob", "Dev", "Production")
+            print("  " + "  ".join(h.ljust(w) for h, w in zip(header, widths)).rstrip())
+            for row in rows:
+                print("  " + "  ".join(v.ljust(w) for v, w in zip(row, widths)).rstrip())
         else:
-            # Legacy config - check for inline sections
-            for section in ["templates", "static_files"]:
-                if section not in data:
-                    print(f"✗ {config} missing required section: {section}")
-                    exit_code = 1
-    except FileNotFoundError:
-        print(f"✗ {config} not found")
-        exit_code = 1
-    except Exception as e:
-        print(f"✗ {config} failed validation: {e}")
-        exit_code = 1
-
-sys.exit(exit_code)
+            print("  ✓ No drift in performance settings")
+    return findings_total
+
+def load_cache(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_cache(path, results):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    entries = {p: {k: r[k] for k in ("hash", "errors", "warnings", "data")} for p, r in results.items()}
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(entries, f)
+    os.replace(tmp, path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate Tenrankai configs and their ConfigStorage trees")
+    parser.add_argument("configs", nargs="*",
+                        help="Bootstrap configs (default: tenrankai-dot-com/config*.toml)")
+    parser.add_argument("--jobs", type=int, default=min(32, (os.cpu_count() or 1) + 4),
+                        help="Files to parse in parallel")
+    parser.add_argument("--cache-file", default=DEFAULT_CACHE, help="Content-hash cache location")
+    parser.add_argument("--no-cache", action="store_true", help="Re-check every file")
+    parser.add_argument("--lint", action="store_true",
+                        help="Also flag performance-sensitive settings and show dev-vs-production drift")
+    parser.add_argument("--lint-sample", type=int, default=1000,
+                        help="Source images per gallery to read dimensions from (headers only)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    configs = args.configs or sorted(glob.glob(os.path.join(REPO_ROOT, "tenrankai-dot-com", "config*.toml")))
+    cache = {} if args.no_cache else load_cache(args.cache_file)
+
+    # Bootstrap configs first: they name the ConfigStorage trees to validate
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        boot = dict(zip(configs, pool.map(lambda c: validate_file(c, "bootstrap", cache), configs)))
+        trees = {}
+        for config in configs:
+            storage = boot[config]["data"].get("app", {}).get("config_storage")
+            storage_dir = os.path.join(os.path.dirname(config), storage) if storage else None
+            trees[config] = storage_files(storage_dir) if storage_dir and os.path.isdir(storage_dir) else []
+        # Configs sharing a ConfigStorage tree parse each file once
+        unique = sorted({item for files in trees.values() for item in files})
+        results = dict(zip([p for p, _ in unique],
+                           pool.map(lambda item: validate_file(item[0], item[1], cache), unique)))
+
+    exit_code = 0
+    for config in configs:
+        result = boot[config]
+        display = os.path.relpath(config)
+        if result["errors"]:
+            exit_code = 1
+            for error in result["errors"]:
+                print(f"✗ {display}: {error}")
+            continue
+        print(f"✓ {display} is valid TOML")
+        storage = result["data"].get("app", {}).get("config_storage")
+        if storage and not os.path.isdir(os.path.join(os.path.dirname(config), storage)):
+            print(f"  ⚠ ConfigStorage directory not found: {storage}")
+        elif storage:
+            print(f"  ✓ ConfigStorage: {storage} ({len(trees[config])} files)")
+        for path, kind in trees[config]:
+            file_result = results[path]
+            name = os.path.relpath(path, os.path.dirname(config))
+            if file_result["errors"]:
+                exit_code = 1
+                for error in file_result["errors"]:
+                    print(f"  ✗ {name}: {error}")
+            else:
+                print(f"  ✓ {name} ({kind})")
+            for warning in file_result["warnings"]:
+                print(f"  ⚠ {name}: {warning}")
+        for error in cross_checks(results, trees[config]):
+            exit_code = 1
+            print(f"  ✗ {error}")
+
+    if args.lint:
+        run_lint(configs, boot, trees, results, args.lint_sample)
+
+    if not args.no_cache:
+        save_cache(args.cache_file, {**boot, **results})
+    checked = len(boot) + len(results)
+    hits = sum(r["cached"] for r in list(boot.values()) + list(results.values()))
+    print(f"\n{checked} files checked ({hits} unchanged, skipped) in {time.perf_counter() - start:.3f}s")
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 # /// script
+# requires-python = ">=3.11"
 # dependencies = ["requests"]
 # ///
 """
@@ -12,6 +13,8 @@ import requests
 import sys
 import os
 
+from test_tenrankai_site import LogCapture
+
 def test_server_start():
     """Test if server starts successfully"""
     print("Testing Tenrankai server startup...")
@@ -66,6 +69,8 @@ def test_basic_endpoints():
         stderr=subprocess.STDOUT,
         text=True
     )
+    # Drain output in the background so a chatty server never blocks on a full pipe
+    log = LogCapture(server.stdout).start()
     
     try:
         # Wait for startup
@@ -74,7 +79,8 @@ def test_basic_endpoints():
         
         # Check if still running
         if server.poll() is not None:
-            output = server.stdout.read()
+            log.join()
+            output = "\n".join(log.lines)
             print(f"Server died. Output:\n{output}")
             return False
         
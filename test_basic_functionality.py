@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 # /// script
+# requires-python = ">=3.11"
 # dependencies = ["requests"]
 # ///
 """
@@ -13,6 +14,8 @@ import requests
 import sys
 import os
 
+from test_tenrankai_site import LogCapture
+
 # Colors for output
 GREEN = '\033[0;32m'
 RED = '\033[0;31m'
@@ -40,13 +43,16 @@ def run_test():
         stderr=subprocess.STDOUT,
         text=True
     )
+    # Drain output in the background so a chatty server never blocks on a full pipe
+    log = LogCapture(server.stdout).start()
     
     # Wait for startup
     time.sleep(2)
     
     # Check if server is still running
     if server.poll() is not None:
-        output = server.stdout.read()
+        log.join()
+        output = "\n".join(log.lines)
         print(f"{RED}✗ Server failed to start{NC}")
         print(f"Output: {output}")
         return False
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 # /// script
+# requires-python = ">=3.11"
 # dependencies = ["requests"]
 # ///
 """
@@ -8,11 +9,12 @@ Tests all pages, static files, and API endpoints
 """
 
 import subprocess
-import time
 import requests
 import sys
 import os
-import json
+import argparse
+
+from test_tenrankai_site import TenrankaiServer
 
 # Colors
 GREEN = '\033[0;32m'
@@ -22,9 +24,11 @@ BLUE = '\033[0;34m'
 NC = '\033[0m'
 
 class ComprehensiveTester:
-    def __init__(self):
-        self.port = 3460
+    def __init__(self, configs=None, port=3460):
+        self.configs = configs or ["config.toml"]
+        self.port = port
         self.base_url = f"http://localhost:{self.port}"
+        self.server = None
         self.passed = 0
         self.failed = 0
         
@@ -63,41 +67,15 @@ class ComprehensiveTester:
             return False
     
     def test_with_server(self, test_name, test_func):
-        """Run a test function with a temporary server"""
+        """Run a test function against the shared server"""
         self.print_header(test_name)
         
-        # Start server
-        server = subprocess.Popen(
-            ["../tenrankai/target/release/tenrankai", "--config", "config.toml", 
-             "--port", str(self.port), "--quit-after", "30"],
-            cwd="tenrankai-dot-com",
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True
-        )
-        
-        # Wait for startup
-        time.sleep(2)
-        
-        # Check if running
-        if server.poll() is not None:
-            print(f"{RED}✗ Server failed to start{NC}")
-            output = server.stdout.read()
-            print(f"Output: {output}")
+        if not self.server or not self.server.is_running():
+            print(f"{RED}✗ Server is not running{NC}")
             self.failed += 1
             return
         
-        # Run the test
-        try:
-            test_func()
-        finally:
-            # Clean up
-            server.terminate()
-            try:
-                server.wait(timeout=5)
-            except:
-                server.kill()
-                server.wait()
+        test_func()
     
     def test_pages(self):
         """Test all main pages"""
@@ -181,13 +159,28 @@ class ComprehensiveTester:
                 print(f"{RED}✗ Build failed{NC}")
                 return False
         
-        # Run test suites
-        self.test_with_server("Main Pages", self.test_pages)
-        self.test_with_server("Documentation", self.test_documentation)
-        self.test_with_server("Blog Posts", self.test_blog_posts)
-        self.test_with_server("Static Files", self.test_static_files)
-        self.test_with_server("API Endpoints", self.test_api_endpoints)
-        self.test_with_server("Error Handling", self.test_error_pages)
+        # One server per config, shared by every suite and stopped at the end.
+        # quit-after is only a safety net against orphaned servers.
+        for config in self.configs:
+            self.print_header(f"Starting server ({config})")
+            self.server = TenrankaiServer(config=config, port=self.port, quit_after=600)
+            if not self.server.start():
+                print(f"{RED}✗ Server failed to start: {self.server.error}{NC}")
+                print(f"Output: {self.server.output()}")
+                self.failed += 1
+                continue
+            print(f"{GREEN}✓ Server ready in {self.server.ready_after:.2f}s{NC}")
+            
+            try:
+                # Run test suites
+                self.test_with_server("Main Pages", self.test_pages)
+                self.test_with_server("Documentation", self.test_documentation)
+                self.test_with_server("Blog Posts", self.test_blog_posts)
+                self.test_with_server("Static Files", self.test_static_files)
+                self.test_with_server("API Endpoints", self.test_api_endpoints)
+                self.test_with_server("Error Handling", self.test_error_pages)
+            finally:
+                self.server.stop()
         
         # Summary
         self.print_header("Test Summary")
@@ -202,6 +195,12 @@ class ComprehensiveTester:
             return True
 
 if __name__ == "__main__":
-    tester = ComprehensiveTester()
+    parser = argparse.ArgumentParser(description='Comprehensive Tenrankai site tests')
+    parser.add_argument('--config', action='append', dest='configs',
+                        help='Config file to test (repeatable, default: config.toml)')
+    parser.add_argument('--port', type=int, default=3460, help='Port to run server on')
+    args = parser.parse_args()
+    
+    tester = ComprehensiveTester(configs=args.configs, port=args.port)
     success = tester.run_all_tests()
     sys.exit(0 if success else 1)
\ No newline at end of file
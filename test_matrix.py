@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.11"
+# dependencies = ["requests"]
+# ///
+"""
+Config matrix test for Tenrankai
+Starts one server per bootstrap config at the same time, each on its own free
+port with its own gallery cache directories, runs the functional endpoint
+checks against all of them in parallel and prints one combined report
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+import requests
+
+from bench_results import DEFAULT_STORE, metric, record_run
+from test_tenrankai_site import (
+    BLUE, GREEN, NC, RED, YELLOW,
+    EndpointCheck, PAGE_CHECKS, STATIC_CHECKS,
+    TenrankaiServer, load_gallery_configs, make_session, prepare_bench_config,
+)
+
+DEFAULT_CONFIGS = ["config.toml", "config.dev.toml", "config.production.toml"]
+SITE_DIR = "tenrankai-dot-com"
+MATRIX_CHECKS: List[EndpointCheck] = PAGE_CHECKS + STATIC_CHECKS + [
+    ("/api/gallery/main/preview?count=6", "Gallery preview API", 200, '"images"'),
+    ("/nonexistent", "404 page", 404, None),
+]
+
+def print_header(text: str):
+    print(f"\n{YELLOW}{text}{NC}")
+    print("=" * len(text))
+
+def free_port() -> int:
+    """A port the kernel reports as unused right now"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def isolated_config(config: str) -> str:
+    """Copy a config's ConfigStorage tree, giving every local gallery its own cache directory"""
+    name = "matrix-" + os.path.splitext(config)[0].replace(".", "-")
+    cache_root = os.path.abspath(os.path.join(SITE_DIR, "bench", name, "cache"))
+    overrides = {}
+    for gallery in load_gallery_configs(config, SITE_DIR):
+        if "://" in gallery.get("cache_directory", ""):
+            continue  # S3 caches are shared by design
+        file = os.path.basename(gallery["config_path"])
+        rel_path = os.path.join("sites", gallery["site"], "galleries", file)
+        cache_dir = os.path.join(cache_root, gallery["site"], os.path.splitext(file)[0])
+        overrides[rel_path] = {"cache_directory": cache_dir}
+    return prepare_bench_config(name, overrides, base_config=config, site_dir=SITE_DIR)
+
+def check(session: requests.Session, base_url: str, endpoint: EndpointCheck) -> Dict[str, Any]:
+    path, description, expected_status, expected_content = endpoint
+    result = {"path": path, "description": description, "ok": False, "error": None}
+    start = time.perf_counter()
+    try:
+        response = session.get(f"{base_url}{path}", timeout=10)
+    except requests.exceptions.RequestException as e:
+        result["error"] = f"request failed: {e}"
+        return result
+    result["ms"] = (time.perf_counter() - start) * 1000
+    if response.status_code != expected_status:
+        result["error"] = f"expected HTTP {expected_status}, got {response.status_code}"
+    elif expected_content and expected_content not in response.text:
+        result["error"] = f"missing '{expected_content}'"
+    else:
+        result["ok"] = True
+    return result
+
+def run_config(config: str, timeout: float, workers: int) -> Dict[str, Any]:
+    """Start a server for one config, check every endpoint and stop it"""
+    result: Dict[str, Any] = {"config": config, "checks": []}
+    try:
+        bench_config = isolated_config(config)
+    except (OSError, KeyError, ValueError) as e:
+        result["error"] = f"cannot prepare config: {e}"
+        return result
+    result["port"] = free_port()
+    server = TenrankaiServer(config=bench_config, port=result["port"], site_dir=SITE_DIR)
+    if not server.start(timeout=timeout):
+        result["error"] = server.error
+        result["output"] = server.output(20)
+        return result
+    result["startup_ms"] = server.ready_after * 1000
+    session = make_session(workers)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            result["checks"] = list(pool.map(lambda endpoint: check(session, server.base_url, endpoint),
+                                             MATRIX_CHECKS))
+    finally:
+        session.close()
+        server.stop()
+    return result
+
+def print_report(results: List[Dict[str, Any]]) -> int:
+    """Print one row per check and one column per config; returns the number of failures"""
+    print_header("Config Matrix")
+    width = max(14, *(len(r["config"]) for r in results))
+    print(f"  {'Check':<36}" + "".join(f" {r['config']:>{width}}" for r in results))
+    line = f"  {'startup':<36}"
+    for r in results:
+        cell = f"{r['startup_ms']:.0f}ms" if "startup_ms" in r else "failed"
+        line += f" {cell:>{width}}"
+    print(line)
+    for index, (path, description, _, _) in enumerate(MATRIX_CHECKS):
+        line = f"  {description[:36]:<36}"
+        for r in results:
+            if not r["checks"]:
+                line += f" {'-':>{width}}"
+                continue
+            outcome = r["checks"][index]
+            cell = f"✓ {outcome['ms']:.0f}ms" if outcome["ok"] else "✗"
+            color = GREEN if outcome["ok"] else RED
+            line += f" {color}{cell:>{width}}{NC}"
+        print(line)
+
+    failures = 0
+    for r in results:
+        if "error" in r:
+            failures += 1
+            print(f"\n{RED}✗ {r['config']}: {r['error']}{NC}")
+            if r.get("output"):
+                print(r["output"])
+        for outcome in r["checks"]:
+            if not outcome["ok"]:
+                failures += 1
+                print(f"{RED}✗ {r['config']} {outcome['path']}: {outcome['error']}{NC}")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description='Test every Tenrankai config at the same time')
+    parser.add_argument('--configs', nargs='+', default=DEFAULT_CONFIGS,
+                        help='Bootstrap configs to test (default: all three)')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Concurrent checks per server (default: 4)')
+    parser.add_argument('--timeout', type=float, default=60.0,
+                        help='Seconds to wait for each server to start (default: 60)')
+    parser.add_argument('--json', default=None, help='Write results to this JSON file')
+    parser.add_argument('--results', default=DEFAULT_STORE,
+                        help='Results store for bench_results.py (default: %(default)s)')
+    parser.add_argument('--no-record', action='store_true',
+                        help='Do not append these runs to the results store')
+    args = parser.parse_args()
+
+    if not os.path.exists("tenrankai/target/release/tenrankai"):
+        print(f"{RED}✗ Release binary not found, run 'make build' first{NC}")
+        return 1
+
+    print_header("Tenrankai Config Matrix")
+    print(f"{BLUE}ℹ {len(args.configs)} configs, {len(MATRIX_CHECKS)} checks each, "
+          f"{args.workers} workers per server{NC}")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(args.configs)) as pool:
+        results = list(pool.map(lambda config: run_config(config, args.timeout, args.workers), args.configs))
+    elapsed = time.perf_counter() - start
+
+    failures = print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote results to {args.json}")
+    if not args.no_record:
+        # One stored run per config, so each is compared against the same config
+        for r in results:
+            if "error" in r or not all(outcome["ok"] for outcome in r["checks"]):
+                continue
+            metrics = {"startup": metric([r["startup_ms"]])}
+            for outcome in r["checks"]:
+                metrics[outcome["path"]] = metric([outcome["ms"]])
+            run = record_run("matrix", r["config"], metrics, site_dir=SITE_DIR, store=args.results)
+            print(f"{BLUE}ℹ Recorded {r['config']} as run {run['id']}{NC}")
+
+    if failures:
+        print(f"\n{RED}✗ {failures} failure(s) across {len(results)} configs in {elapsed:.1f}s{NC}")
+        return 1
+    print(f"\n{GREEN}✓ All {len(results)} configs passed in {elapsed:.1f}s{NC}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 # /// script
+# requires-python = ">=3.11"
 # dependencies = ["requests"]
 # ///
 """
@@ -13,9 +14,22 @@ import requests
 import sys
 import os
 import signal
+import shutil
 import json
-from typing import Optional, Dict, Any
+import math
+import re
+import socket
+import threading
+import glob
+import tomllib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Tuple
 import argparse
+from requests.adapters import HTTPAdapter
+
+from bench_results import DEFAULT_STORE, downsample, metric, record_run
+from loadgen import client_report, parse_rate, run_load, run_open_loop
 
 # ANSI color codes
 GREEN = '\033[0;32m'
@@ -24,15 +38,547 @@ YELLOW = '\033[1;33m'
 BLUE = '\033[0;34m'
 NC = '\033[0m'  # No Color
 
+# (path, description, expected_status, expected_content)
+EndpointCheck = Tuple[str, str, int, Optional[str]]
+
+def make_session(pool_size: int = 1) -> requests.Session:
+    """Create a keep-alive session whose connection pool holds up to pool_size connections"""
+    session = requests.Session()
+    # pool_block keeps the number of open connections bounded by the worker count
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+# Pages and posts checked by the functional tests
+PAGE_CHECKS: List[EndpointCheck] = [
+    ("/", "Homepage", 200, "<h1>Tenrankai</h1>"),
+    ("/features", "Features page", 200, "Features"),
+    ("/about", "About page", 200, "About Tenrankai"),
+    ("/contact", "Contact page", 200, "Get Involved"),
+    ("/gallery", "Gallery", 200, None),
+    ("/docs", "Documentation", 200, "Quick Start Guide"),
+    ("/blog", "Blog", 200, "Introducing Tenrankai"),
+    ("/docs/00-quick-start", "Quick Start doc", 200, "5-Minute Setup"),
+    ("/docs/01-installation", "Installation doc", 200, "Installation Guide"),
+    ("/docs/02-core-concepts", "Core Concepts doc", 200, "Core Concepts"),
+    ("/blog/introducing-tenrankai", "Blog post", 200, "high-performance photo gallery"),
+]
+
+# Static files checked by the functional tests
+STATIC_CHECKS: List[EndpointCheck] = [
+    ("/static/style.css", "Main CSS", 200, "font-family"),
+    ("/static/home.css", "Home CSS", 200, "hero-section"),
+    ("/static/DejaVuSans.ttf", "Font file", 200, None),
+]
+
+# Static assets, pages and posts checked by the --audit caching audit, by route class
+AUDIT_ROUTES = [
+    ("static", "/static/style.css"),
+    ("static", "/static/home.css"),
+    ("static", "/static/DejaVuSans.ttf"),
+    ("page", "/"),
+    ("page", "/features"),
+    ("page", "/about"),
+    ("page", "/contact"),
+    ("page", "/gallery"),
+    ("posts index", "/docs"),
+    ("posts index", "/blog"),
+    ("post", "/docs/00-quick-start"),
+    ("post", "/docs/01-installation"),
+    ("post", "/docs/02-core-concepts"),
+    ("post", "/blog/introducing-tenrankai"),
+]
+
+# Image variant sizes requested by the --audit caching audit
+AUDIT_VARIANT_SIZES = ["thumbnail", "gallery", "medium", "large"]
+
+# Endpoints exercised by the --bench load sweep, one per route class
+BENCH_ENDPOINTS = [
+    "/",
+    "/docs",
+    "/docs/00-quick-start",
+    "/blog",
+    "/blog/introducing-tenrankai",
+    "/static/style.css",
+    "/api/gallery/main/preview",
+]
+
+def load_gallery_configs(config: str, site_dir: str = "tenrankai-dot-com") -> List[Dict[str, Any]]:
+    """Parse galleries/*.toml for every site in a bootstrap config's ConfigStorage tree.
+    
+    Each gallery dict gains "site" and "config_path" keys. Relative paths in the
+    gallery config are relative to site_dir, the server's working directory.
+    """
+    with open(os.path.join(site_dir, config), "rb") as f:
+        bootstrap = tomllib.load(f)
+    storage = bootstrap.get("app", {}).get("config_storage")
+    if not storage:
+        return []
+    
+    galleries = []
+    pattern = os.path.join(site_dir, storage, "sites", "*", "galleries", "*.toml")
+    for path in sorted(glob.glob(pattern)):
+        with open(path, "rb") as f:
+            gallery = tomllib.load(f)
+        gallery["site"] = path.split(os.sep)[-3]
+        gallery["config_path"] = path
+        galleries.append(gallery)
+    return galleries
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".avif", ".heic")
+
+def find_images(source_dir: str) -> List[str]:
+    """Image paths below source_dir, relative to it, skipping hidden and _ folders"""
+    images = []
+    for root, dirs, files in os.walk(source_dir):
+        dirs[:] = sorted(d for d in dirs if not d.startswith((".", "_")))
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                images.append(os.path.relpath(os.path.join(root, name), source_dir).replace(os.sep, "/"))
+    return images
+
+def format_toml_value(value: Any) -> str:
+    """Render a Python value as a TOML value (inline tables for dicts)"""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, str):
+        # JSON string escapes are valid TOML basic-string escapes
+        return json.dumps(value)
+    if isinstance(value, (list, tuple)):
+        return "[" + ", ".join(format_toml_value(v) for v in value) + "]"
+    if isinstance(value, dict):
+        return "{ " + ", ".join(f"{k} = {format_toml_value(v)}" for k, v in value.items()) + " }"
+    raise TypeError(f"Cannot render {type(value).__name__} as TOML")
+
+def set_toml_value(text: str, dotted_key: str, value: Any) -> str:
+    """Set "key" or "table.key" in TOML text, keeping comments and layout.
+    
+    Existing single-line assignments are replaced in place, missing keys are added
+    to their table and missing tables are appended. Multi-line values are not supported.
+    """
+    table, _, key = dotted_key.rpartition(".")
+    assignment = f"{key} = {format_toml_value(value)}"
+    lines = text.splitlines()
+    header_re = re.compile(r"^\s*\[([^\[\]]+)\]\s*(#.*)?$")
+    key_re = re.compile(rf"^\s*{re.escape(key)}\s*=")
+    
+    current = ""
+    table_found = table == ""
+    insert_at = None
+    for i, line in enumerate(lines):
+        header = header_re.match(line)
+        if header:
+            if current == table and table_found and insert_at is None:
+                insert_at = i
+            current = header.group(1).strip()
+            table_found = table_found or current == table
+            continue
+        if current == table and key_re.match(line):
+            lines[i] = assignment
+            return "\n".join(lines) + "\n"
+    
+    if not table_found:
+        return "\n".join(lines + ["", f"[{table}]", assignment]) + "\n"
+    if insert_at is None:
+        insert_at = len(lines)
+    # Insert after the table's last assignment, above trailing blanks and comments
+    while insert_at > 0 and (not lines[insert_at - 1].strip()
+                             or lines[insert_at - 1].lstrip().startswith("#")):
+        insert_at -= 1
+    lines.insert(insert_at, assignment)
+    return "\n".join(lines) + "\n"
+
+def prepare_bench_config(name: str, overrides: Optional[Dict[str, Dict[str, Any]]] = None,
+                         base_config: str = "config.toml", site_dir: str = "tenrankai-dot-com") -> str:
+    """Copy a config and its ConfigStorage tree to site_dir/bench/<name> with overrides applied.
+    
+    overrides maps a path inside the ConfigStorage tree (for example
+    "sites/default/galleries/main.toml") to {"dotted.key": value}. Files that do
+    not exist yet are created. Returns the absolute path of the new bootstrap config.
+    """
+    bench_dir = os.path.abspath(os.path.join(site_dir, "bench", name))
+    storage_dir = os.path.join(bench_dir, "config.d")
+    with open(os.path.join(site_dir, base_config)) as f:
+        bootstrap = f.read()
+    source_storage = tomllib.loads(bootstrap)["app"]["config_storage"]
+    
+    shutil.rmtree(storage_dir, ignore_errors=True)
+    shutil.copytree(os.path.join(site_dir, source_storage), storage_dir)
+    for rel_path, values in (overrides or {}).items():
+        path = os.path.join(storage_dir, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        text = ""
+        if os.path.exists(path):
+            with open(path) as f:
+                text = f.read()
+        for dotted_key, value in values.items():
+            text = set_toml_value(text, dotted_key, value)
+        with open(path, "w") as f:
+            f.write(text)
+    
+    config_path = os.path.join(bench_dir, "config.toml")
+    with open(config_path, "w") as f:
+        f.write(set_toml_value(bootstrap, "app.config_storage", storage_dir))
+    return config_path
+
+def preview_image_paths(data: Any, url_prefix: str = "/gallery") -> List[str]:
+    """Gallery-relative image paths from a /api/gallery/<name>/preview response"""
+    paths = []
+    for entry in data.get("images", []) if isinstance(data, dict) else []:
+        value = entry
+        if isinstance(entry, dict):
+            value = next((entry[key] for key in ("path", "relative_path", "url", "src", "name")
+                          if isinstance(entry.get(key), str)), "")
+        if not isinstance(value, str):
+            continue
+        value = value.split("?")[0]
+        if value.startswith(url_prefix + "/"):
+            value = value[len(url_prefix) + 1:]
+        paths.append(value.lstrip("/"))
+    return paths
+
+def process_cpu_seconds(pid: int) -> float:
+    """User + system CPU seconds consumed by a process, from /proc/<pid>/stat"""
+    with open(f"/proc/{pid}/stat") as f:
+        # The command name may contain spaces, so split after its closing parenthesis
+        fields = f.read().rsplit(")", 1)[1].split()
+    # fields[0] is the state (field 3), so utime/stime (fields 14/15) are at 11/12
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def summarize_latencies(latencies: List[float], errors: int, elapsed: float) -> Dict[str, float]:
+    """Summarize request latencies (seconds) into throughput and millisecond percentiles"""
+    ordered = sorted(latencies)
+    requests_made = len(ordered) + errors
+    return {
+        "requests": requests_made,
+        "errors": errors,
+        "error_rate": errors / requests_made if requests_made else 0.0,
+        "rps": len(ordered) / elapsed if elapsed > 0 else 0.0,
+        "p50_ms": percentile(ordered, 50) * 1000,
+        "p95_ms": percentile(ordered, 95) * 1000,
+        "p99_ms": percentile(ordered, 99) * 1000,
+        "max_ms": (ordered[-1] if ordered else 0.0) * 1000,
+    }
+
+def read_process_stats(pid: int) -> Dict[str, float]:
+    """RSS, CPU time, threads, open FDs and I/O counters of a process from /proc/<pid>"""
+    stats: Dict[str, float] = {"cpu_seconds": process_cpu_seconds(pid)}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key == "VmRSS":
+                stats["rss_bytes"] = int(value.split()[0]) * 1024
+            elif key == "Threads":
+                stats["threads"] = int(value)
+    stats["open_fds"] = len(os.listdir(f"/proc/{pid}/fd"))
+    try:
+        with open(f"/proc/{pid}/io") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("rchar", "wchar", "read_bytes", "write_bytes"):
+                    stats[key] = int(value)
+    except PermissionError:
+        pass
+    return stats
+
+class ProcessSampler:
+    """Background sampler of /proc/<pid>, tagging each sample with the current test phase"""
+    
+    # Counters that only grow; per-phase summaries report how much they grew
+    COUNTERS = ("cpu_seconds", "rchar", "wchar", "read_bytes", "write_bytes")
+    
+    def __init__(self, pid: int, interval: float = 0.5, phase: str = "startup"):
+        self.pid = pid
+        self.interval = interval
+        self.phase = phase
+        self.samples: List[Dict[str, Any]] = []
+        self._started = time.perf_counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"sampler-{pid}", daemon=True)
+    
+    def start(self):
+        self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+    
+    def _run(self):
+        while True:
+            try:
+                sample: Dict[str, Any] = read_process_stats(self.pid)
+            except (FileNotFoundError, ProcessLookupError):
+                return  # Process has exited
+            sample["t"] = time.perf_counter() - self._started
+            sample["phase"] = self.phase
+            self.samples.append(sample)
+            if self._stop.wait(self.interval):
+                return
+    
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Per-phase peaks and counter growth, in the order phases were first seen"""
+        phases: Dict[str, Dict[str, float]] = {}
+        previous = None
+        for sample in list(self.samples):
+            phase = phases.setdefault(sample["phase"], {
+                "samples": 0, "seconds": 0.0, "rss_max": 0, "threads_max": 0, "fds_max": 0,
+                **{counter: 0 for counter in self.COUNTERS},
+            })
+            phase["samples"] += 1
+            phase["rss_max"] = max(phase["rss_max"], sample.get("rss_bytes", 0))
+            phase["threads_max"] = max(phase["threads_max"], sample.get("threads", 0))
+            phase["fds_max"] = max(phase["fds_max"], sample.get("open_fds", 0))
+            if previous is not None:
+                # Growth since the previous sample is charged to this sample's phase
+                phase["seconds"] += sample["t"] - previous["t"]
+                for counter in self.COUNTERS:
+                    phase[counter] += sample.get(counter, 0) - previous.get(counter, 0)
+            previous = sample
+        return phases
+    
+    def write_json(self, path: str):
+        with open(path, "w") as f:
+            json.dump({"pid": self.pid, "interval": self.interval, "samples": self.samples,
+                       "summary": self.summary()}, f, indent=2)
+
+ANSI_ESCAPE_RE = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+# tower-http style trace fields: "uri=/docs ... latency=3 ms status=200"
+LOG_URI_RE = re.compile(r"\b(?:uri|path)=\"?([^\s\"}]+)")
+LOG_STATUS_RE = re.compile(r"\bstatus=\"?(\d{3})\b")
+LOG_LATENCY_RE = re.compile(r"\b(?:latency|duration|elapsed)=\"?([\d.]+)\s*(ns|µs|us|ms|s)\b")
+# Access-log style lines: "GET /docs 200 3.2ms"
+LOG_ACCESS_RE = re.compile(r"\b(GET|HEAD|POST|PUT|DELETE|PATCH|OPTIONS) (/\S*) (\d{3})\b.*?([\d.]+)\s*(ns|µs|us|ms|s)\b")
+LATENCY_UNITS_MS = {"ns": 1e-6, "µs": 1e-3, "us": 1e-3, "ms": 1.0, "s": 1000.0}
+
+def parse_request_log(line: str) -> Optional[Dict[str, Any]]:
+    """Parse a server request log line into {"path", "status", "duration_ms"}, or None"""
+    line = ANSI_ESCAPE_RE.sub("", line)
+    access = LOG_ACCESS_RE.search(line)
+    if access:
+        return {"path": access.group(2), "status": int(access.group(3)),
+                "duration_ms": float(access.group(4)) * LATENCY_UNITS_MS[access.group(5)]}
+    uri = LOG_URI_RE.search(line)
+    status = LOG_STATUS_RE.search(line)
+    latency = LOG_LATENCY_RE.search(line)
+    if not (uri and status and latency):
+        return None
+    return {"path": uri.group(1), "status": int(status.group(1)),
+            "duration_ms": float(latency.group(1)) * LATENCY_UNITS_MS[latency.group(2)]}
+
+class LogCapture:
+    """Drains a server's output on a background thread so the pipe never fills.
+    
+    Keeps the last max_lines lines in a ring buffer, optionally appends every
+    line to log_file, and parses request log lines into timestamped events.
+    """
+    
+    def __init__(self, stream, max_lines: int = 2000, log_file: Optional[str] = None,
+                 max_events: int = 200000):
+        self.stream = stream
+        self.lines: deque = deque(maxlen=max_lines)
+        self.events: deque = deque(maxlen=max_events)
+        self.log_file = log_file
+        self._thread = threading.Thread(target=self._run, name="server-log", daemon=True)
+    
+    def start(self) -> "LogCapture":
+        self._thread.start()
+        return self
+    
+    def _run(self):
+        log = open(self.log_file, "a") if self.log_file else None
+        try:
+            for line in self.stream:
+                line = line.rstrip("\n")
+                self.lines.append(line)
+                if log:
+                    log.write(line + "\n")
+                event = parse_request_log(line)
+                if event:
+                    event["t"] = time.perf_counter()
+                    self.events.append(event)
+        except (OSError, ValueError):
+            pass  # Stream closed under us
+        finally:
+            if log:
+                log.close()
+    
+    def join(self, timeout: float = 2.0):
+        """Wait for the reader to reach end of output (after the process exits)"""
+        self._thread.join(timeout)
+    
+    def tail(self, count: int = 10) -> List[str]:
+        return list(self.lines)[-count:]
+    
+    def server_latencies(self, start: float = 0.0, end: float = float("inf")) -> Dict[str, List[float]]:
+        """Server-reported durations (ms) per path for events logged between start and end"""
+        latencies: Dict[str, List[float]] = {}
+        for event in list(self.events):
+            if start <= event["t"] <= end:
+                latencies.setdefault(event["path"], []).append(event["duration_ms"])
+        return latencies
+
+class TenrankaiServer:
+    """A tenrankai process for one config, started once and shared by every suite that uses it"""
+    
+    def __init__(self, config: str = "config.toml", port: int = 3456,
+                 site_dir: str = "tenrankai-dot-com", tenrankai_dir: str = "tenrankai",
+                 quit_after: Optional[int] = None, extra_args: Optional[List[str]] = None,
+                 sample_interval: Optional[float] = None, log_file: Optional[str] = None):
+        self.config = config
+        self.port = port
+        self.site_dir = site_dir
+        self.binary = os.path.abspath(os.path.join(tenrankai_dir, "target", "release", "tenrankai"))
+        self.quit_after = quit_after
+        self.extra_args = extra_args or []
+        self.base_url = f"http://localhost:{port}"
+        self.process: Optional[subprocess.Popen] = None
+        self.started_at = 0.0
+        # Seconds from Popen until the port accepted a connection / until GET / returned 200
+        self.port_open_after: Optional[float] = None
+        self.ready_after: Optional[float] = None
+        self.error: Optional[str] = None
+        # /proc resource sampling, started with the process when sample_interval is set
+        self.sample_interval = sample_interval
+        self.sampler: Optional[ProcessSampler] = None
+        # Server output is drained continuously; log_file optionally keeps all of it
+        self.log_file = log_file
+        self.logs: Optional[LogCapture] = None
+    
+    def command(self) -> List[str]:
+        """Command line used to launch the server"""
+        cmd = [self.binary, "serve", "--config", self.config, "--port", str(self.port)]
+        if self.quit_after:
+            cmd.extend(["--quit-after", str(self.quit_after)])
+        return cmd + self.extra_args
+    
+    def start(self, timeout: float = 10.0, initial_delay: float = 0.005,
+              max_delay: float = 0.25) -> bool:
+        """Launch the server and block until it serves the homepage"""
+        self.port_open_after = None
+        self.ready_after = None
+        self.error = None
+        self.started_at = time.perf_counter()
+        try:
+            self.process = subprocess.Popen(
+                self.command(),
+                cwd=self.site_dir,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True
+            )
+        except OSError as e:
+            self.error = f"Failed to start server: {e}"
+            return False
+        self.logs = LogCapture(self.process.stdout, log_file=self.log_file).start()
+        if self.sample_interval and os.path.isdir("/proc"):
+            self.sampler = ProcessSampler(self.process.pid, self.sample_interval)
+            self.sampler.start()
+        return self.wait_until_ready(timeout, initial_delay, max_delay)
+    
+    def wait_until_ready(self, timeout: float = 10.0, initial_delay: float = 0.005,
+                         max_delay: float = 0.25) -> bool:
+        """Probe the port, then GET /, with exponential backoff between attempts"""
+        deadline = self.started_at + timeout
+        delay = initial_delay
+        while time.perf_counter() < deadline:
+            if self.process.poll() is not None:
+                self.error = f"Server process died (exit code {self.process.returncode})"
+                return False
+            
+            if self.port_open_after is None:
+                try:
+                    with socket.create_connection(("127.0.0.1", self.port), timeout=0.5):
+                        self.port_open_after = time.perf_counter() - self.started_at
+                    # Restart the backoff for the HTTP probe
+                    delay = initial_delay
+                except OSError:
+                    pass
+            
+            if self.port_open_after is not None:
+                # Homepage rather than /api/health, which not every build exposes
+                try:
+                    response = requests.get(f"{self.base_url}/", timeout=2)
+                    if response.status_code == 200:
+                        self.ready_after = time.perf_counter() - self.started_at
+                        return True
+                except requests.exceptions.RequestException:
+                    pass
+            
+            time.sleep(delay)
+            delay = min(delay * 2, max_delay)
+        
+        self.error = f"Server not ready after {timeout:.0f} seconds"
+        self.stop()
+        return False
+    
+    def is_running(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+    
+    def output(self, count: int = 2000) -> str:
+        """The last count lines of server output"""
+        if not self.logs:
+            return ""
+        if not self.is_running():
+            self.logs.join()
+        return "\n".join(self.logs.tail(count))
+    
+    def set_phase(self, phase: str):
+        """Tag subsequent resource samples with a test phase"""
+        if self.sampler:
+            self.sampler.phase = phase
+    
+    def stop(self):
+        """Terminate the server, killing it if it does not exit within 5 seconds"""
+        if self.sampler:
+            self.sampler.stop()
+        if not self.is_running():
+            return
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        if self.logs:
+            self.logs.join()
+    
+    def __enter__(self) -> "TenrankaiServer":
+        if not self.start():
+            raise RuntimeError(self.error)
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.stop()
+
 class TenrankaiTester:
-    def __init__(self, port: int = 3456, config: str = "config.toml", quit_after: Optional[int] = None):
+    def __init__(self, port: int = 3456, config: str = "config.toml", quit_after: Optional[int] = None,
+                 workers: int = 1, sample_interval: Optional[float] = 0.5,
+                 server_log: Optional[str] = None, load_processes: int = 0):
         self.port = port
         self.config = config
         self.quit_after = quit_after
+        self.workers = max(1, workers)
+        self.sample_interval = sample_interval
+        self.server_log = server_log
         self.base_url = f"http://localhost:{port}"
+        self.server: Optional[TenrankaiServer] = None
         self.server_process: Optional[subprocess.Popen] = None
         self.tenrankai_dir = "tenrankai"
         self.site_dir = "tenrankai-dot-com"
+        self.session = make_session(self.workers)
+        # Worker processes for load generation (loadgen.py); 0 keeps it on threads in this process
+        self.load_processes = load_processes
         
     def print_header(self, text: str):
         """Print a formatted header"""
@@ -75,100 +621,62 @@ class TenrankaiTester:
         """Start the Tenrankai server"""
         self.print_header("Starting Tenrankai Server")
         
-        tenrankai_bin = os.path.join("..", self.tenrankai_dir, "target", "release", "tenrankai")
-        cmd = [tenrankai_bin, "serve", "--config", self.config, "--port", str(self.port)]
-        if self.quit_after:
-            cmd.extend(["--quit-after", str(self.quit_after)])
+        self.server = TenrankaiServer(config=self.config, port=self.port, site_dir=self.site_dir,
+                                      tenrankai_dir=self.tenrankai_dir, quit_after=self.quit_after,
+                                      sample_interval=self.sample_interval, log_file=self.server_log)
+        self.print_info(f"Waiting for server to start on port {self.port}...")
+        started = self.server.start()
+        self.server_process = self.server.process
         
-        try:
-            self.server_process = subprocess.Popen(
-                cmd,
-                cwd=self.site_dir,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True
-            )
-            
-            # Wait for server to start
-            self.print_info(f"Waiting for server to start on port {self.port}...")
-            
-            # Try multiple times with shorter waits
-            for attempt in range(10):  # 10 attempts, 0.5s each = 5s total
-                time.sleep(0.5)
-                
-                # Check if process is still running
-                if self.server_process.poll() is not None:
-                    self.print_error("Server process died")
-                    # Print last output
-                    if self.server_process.stdout:
-                        output = self.server_process.stdout.read()
-                        print(f"Server output:\n{output}")
-                    return False
-                    
-                # Try to connect to homepage (no health endpoint)
-                try:
-                    response = requests.get(f"{self.base_url}/", timeout=2)
-                    if response.status_code == 200:
-                        self.print_success(f"Server started successfully on port {self.port}")
-                        return True
-                except requests.exceptions.ConnectionError:
-                    if attempt < 9:  # Not the last attempt
-                        continue
-                    else:
-                        self.print_error("Could not connect to server after 5 seconds")
-                        # Try to get server output
-                        if self.server_process.stdout:
-                            try:
-                                output = self.server_process.stdout.read()
-                                if output:
-                                    print(f"Server output:\n{output}")
-                            except:
-                                pass
-                        return False
-                
-        except Exception as e:
-            self.print_error(f"Failed to start server: {e}")
-            return False
+        if started:
+            self.print_success(f"Server started successfully on port {self.port} "
+                               f"in {self.server.ready_after:.2f}s")
+            return True
+        
+        self.print_error(self.server.error)
+        output = self.server.output()
+        if output:
+            print(f"Server output:\n{output}")
+        return False
+    
+    def set_phase(self, phase: str):
+        """Tag server resource samples with the current test phase"""
+        if self.server:
+            self.server.set_phase(phase)
     
     def stop_server(self):
         """Stop the Tenrankai server"""
-        if self.server_process:
+        if self.server:
             self.print_info("Stopping server...")
-            self.server_process.terminate()
-            try:
-                self.server_process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                self.server_process.kill()
-                self.server_process.wait()
+            self.server.stop()
             self.print_success("Server stopped")
     
-    def test_endpoint(self, path: str, description: str, 
-                     expected_status: int = 200,
-                     expected_content: Optional[str] = None,
-                     expected_json: Optional[Dict[str, Any]] = None) -> bool:
-        """Test a single endpoint"""
+    def check_endpoint(self, path: str, description: str,
+                       expected_status: int = 200,
+                       expected_content: Optional[str] = None,
+                       expected_json: Optional[Dict[str, Any]] = None) -> Tuple[bool, List[Tuple[str, str]]]:
+        """Check a single endpoint without printing, returning (passed, messages)"""
         url = f"{self.base_url}{path}"
-        print(f"\n{BLUE}Testing: {description}{NC}")
-        print(f"  URL: {url}")
+        messages = [("title", description), ("plain", f"  URL: {url}")]
         
         try:
-            response = requests.get(url, timeout=10)
+            response = self.session.get(url, timeout=10)
             
             # Check status code
             if response.status_code == expected_status:
-                self.print_success(f"HTTP {response.status_code}")
+                messages.append(("success", f"HTTP {response.status_code}"))
             else:
-                self.print_error(f"Expected HTTP {expected_status}, got {response.status_code}")
-                return False
+                messages.append(("error", f"Expected HTTP {expected_status}, got {response.status_code}"))
+                return False, messages
             
             # Check content
             if expected_content:
                 if expected_content in response.text:
-                    self.print_success(f"Found expected content: '{expected_content}'")
+                    messages.append(("success", f"Found expected content: '{expected_content}'"))
                 else:
-                    self.print_error(f"Expected content not found: '{expected_content}'")
-                    print(f"  Response preview: {response.text[:200]}...")
-                    return False
+                    messages.append(("error", f"Expected content not found: '{expected_content}'"))
+                    messages.append(("plain", f"  Response preview: {response.text[:200]}..."))
+                    return False, messages
             
             # Check JSON
             if expected_json:
@@ -176,19 +684,64 @@ class TenrankaiTester:
                     json_data = response.json()
                     for key, value in expected_json.items():
                         if key in json_data and json_data[key] == value:
-                            self.print_success(f"JSON key '{key}' has expected value")
+                            messages.append(("success", f"JSON key '{key}' has expected value"))
                         else:
-                            self.print_error(f"JSON key '{key}' mismatch")
-                            return False
+                            messages.append(("error", f"JSON key '{key}' mismatch"))
+                            return False, messages
                 except json.JSONDecodeError:
-                    self.print_error("Response is not valid JSON")
-                    return False
+                    messages.append(("error", "Response is not valid JSON"))
+                    return False, messages
                     
-            return True
+            return True, messages
             
         except requests.exceptions.RequestException as e:
-            self.print_error(f"Request failed: {e}")
-            return False
+            messages.append(("error", f"Request failed: {e}"))
+            return False, messages
+    
+    def print_messages(self, messages: List[Tuple[str, str]]):
+        """Print messages collected by check_endpoint"""
+        for kind, text in messages:
+            if kind == "title":
+                print(f"\n{BLUE}Testing: {text}{NC}")
+            elif kind == "success":
+                self.print_success(text)
+            elif kind == "error":
+                self.print_error(text)
+            else:
+                print(text)
+    
+    def test_endpoint(self, path: str, description: str, 
+                     expected_status: int = 200,
+                     expected_content: Optional[str] = None,
+                     expected_json: Optional[Dict[str, Any]] = None) -> bool:
+        """Test a single endpoint"""
+        passed, messages = self.check_endpoint(path, description, expected_status,
+                                               expected_content, expected_json)
+        self.print_messages(messages)
+        return passed
+    
+    def run_checks(self, checks: List[EndpointCheck]) -> bool:
+        """Run endpoint checks on up to self.workers threads, reporting in list order"""
+        start = time.perf_counter()
+        all_passed = True
+        
+        if self.workers == 1:
+            for path, desc, status, content in checks:
+                if not self.test_endpoint(path, desc, status, content):
+                    all_passed = False
+        else:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                # map() yields results in submission order, so output stays stable
+                results = pool.map(lambda check: self.check_endpoint(*check), checks)
+                for passed, messages in results:
+                    self.print_messages(messages)
+                    if not passed:
+                        all_passed = False
+        
+        elapsed = time.perf_counter() - start
+        self.print_info(f"Checked {len(checks)} endpoints in {elapsed:.2f}s "
+                        f"({self.workers} worker{'s' if self.workers != 1 else ''})")
+        return all_passed
     
     def test_gallery_api(self) -> bool:
         """Test gallery API endpoints"""
@@ -204,7 +757,7 @@ class TenrankaiTester:
         if success:
             # Check if response is valid JSON array
             try:
-                response = requests.get(f"{self.base_url}/api/gallery/main/preview?count=6")
+                response = self.session.get(f"{self.base_url}/api/gallery/main/preview?count=6", timeout=10)
                 data = response.json()
                 if isinstance(data, dict) and 'images' in data and isinstance(data['images'], list):
                     self.print_success(f"Gallery preview returned {len(data['images'])} images")
@@ -216,10 +769,169 @@ class TenrankaiTester:
                 
         return success
     
-    def run_all_tests(self) -> bool:
-        """Run all tests"""
-        self.print_header("Tenrankai Marketing Site Test Suite")
+    def audit_targets(self) -> List[Tuple[str, str]]:
+        """(route class, path) for every audited asset, page and image variant"""
+        targets = list(AUDIT_ROUTES)
+        for gallery in load_gallery_configs(self.config, self.site_dir):
+            source = gallery.get("source_directory", "")
+            if "://" in source:
+                continue
+            url_prefix = gallery.get("url_prefix", "/gallery").rstrip("/")
+            for image in find_images(os.path.join(self.site_dir, source)):
+                targets += [("variant", f"{url_prefix}/{image}?size={size}") for size in AUDIT_VARIANT_SIZES]
+        return targets
+    
+    def audit_url(self, route: str, path: str) -> Dict[str, Any]:
+        """Fetch one URL plainly, conditionally and compressed, recording wire sizes and cache headers"""
+        url = f"{self.base_url}{path}"
+        
+        def fetch(headers: Dict[str, str]) -> Tuple[requests.Response, int, int]:
+            # Read the raw stream so compressed bodies are counted as sent
+            response = self.session.get(url, headers=headers, timeout=30, stream=True)
+            body = len(response.raw.read(decode_content=False))
+            header_bytes = sum(len(k) + len(v) + 4 for k, v in response.headers.items()) + 17
+            response.close()
+            return response, body, header_bytes
+        
+        record: Dict[str, Any] = {"route": route, "path": path}
+        try:
+            response, body, header_bytes = fetch({"Accept-Encoding": "identity"})
+        except requests.exceptions.RequestException as e:
+            record["error"] = str(e)
+            return record
+        headers = response.headers
+        record.update({
+            "status": response.status_code,
+            "content_type": headers.get("Content-Type", "").split(";")[0],
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "cache_control": headers.get("Cache-Control"),
+            "bytes": body,
+            "header_bytes": header_bytes,
+        })
+        if response.status_code != 200:
+            return record
+        
+        conditional = {"Accept-Encoding": "identity"}
+        if record["etag"]:
+            conditional["If-None-Match"] = record["etag"]
+        if record["last_modified"]:
+            conditional["If-Modified-Since"] = record["last_modified"]
+        if len(conditional) > 1:
+            try:
+                revalidated, body, header_bytes = fetch(conditional)
+                record["conditional_status"] = revalidated.status_code
+                record["conditional_bytes"] = body + header_bytes
+            except requests.exceptions.RequestException as e:
+                record["conditional_status"] = None
+                record["error"] = str(e)
+        
+        if record["content_type"] in ("text/html", "text/css"):
+            for encoding in ("gzip", "br"):
+                try:
+                    compressed, body, _ = fetch({"Accept-Encoding": encoding})
+                except requests.exceptions.RequestException:
+                    continue
+                applied = compressed.headers.get("Content-Encoding", "") == encoding
+                record[f"{encoding}_bytes"] = body if applied else None
+        return record
+    
+    def audit_problems(self, record: Dict[str, Any]) -> Tuple[List[str], List[str]]:
+        """(errors, warnings) for one audited URL's caching headers"""
+        errors: List[str] = []
+        warnings: List[str] = []
+        if "error" in record:
+            return [record["error"]], []
+        if record["status"] != 200:
+            return [f"HTTP {record['status']}"], []
+        # Static assets and variants are immutable per URL and must be cacheable;
+        # rendered pages may legitimately skip validators
+        strict = record["route"] in ("static", "variant")
+        missing = errors if strict else warnings
+        cache_control = (record["cache_control"] or "").lower()
+        if not record["etag"] and not record["last_modified"]:
+            missing.append("no ETag or Last-Modified")
+        if not cache_control:
+            missing.append("no Cache-Control")
+        elif strict and ("no-store" in cache_control or "max-age=0" in cache_control.replace(" ", "")):
+            errors.append(f"Cache-Control '{record['cache_control']}' prevents caching")
+        if "conditional_status" in record and record["conditional_status"] != 304:
+            missing.append(f"conditional request returned {record['conditional_status']}, not 304")
+        uncompressed = [encoding for encoding in ("gzip", "br")
+                        if f"{encoding}_bytes" in record and record[f"{encoding}_bytes"] is None]
+        if uncompressed:
+            warnings.append(f"not compressed when {' or '.join(uncompressed)} is accepted")
+        return errors, warnings
+    
+    def run_cache_audit(self) -> Dict[str, Any]:
+        """Audit caching headers, conditional requests and compression for every route class"""
+        self.print_header("HTTP Caching and Compression Audit")
+        targets = self.audit_targets()
+        self.print_info(f"Auditing {len(targets)} URLs on {self.workers} "
+                        f"worker{'s' if self.workers != 1 else ''}")
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            records = list(pool.map(lambda target: self.audit_url(*target), targets))
         
+        failed = 0
+        for record in records:
+            errors, warnings = self.audit_problems(record)
+            record["problems"] = errors
+            record["warnings"] = warnings
+            failed += bool(errors)
+            for error in errors:
+                self.print_error(f"{record['path']}: {error}")
+            for warning in warnings:
+                print(f"{YELLOW}⚠ {record['path']}: {warning}{NC}")
+        
+        classes: Dict[str, Dict[str, Any]] = {}
+        for record in records:
+            stats = classes.setdefault(record["route"], {
+                "urls": 0, "etag": 0, "last_modified": 0, "cache_control": 0,
+                "conditional": 0, "not_modified": 0, "bytes": 0, "header_bytes": 0,
+                "revalidated_bytes": 0, "compressible_bytes": 0, "gzip_bytes": 0, "br_bytes": 0,
+            })
+            stats["urls"] += 1
+            if record.get("status") != 200:
+                continue
+            for key in ("etag", "last_modified", "cache_control"):
+                stats[key] += bool(record[key])
+            stats["bytes"] += record["bytes"]
+            stats["header_bytes"] += record["header_bytes"]
+            if "conditional_status" in record:
+                stats["conditional"] += 1
+                stats["not_modified"] += record["conditional_status"] == 304
+                stats["revalidated_bytes"] += record.get("conditional_bytes", 0)
+            if "gzip_bytes" in record or "br_bytes" in record:
+                stats["compressible_bytes"] += record["bytes"]
+                # Uncompressed responses cost their full size on the wire
+                stats["gzip_bytes"] += record.get("gzip_bytes") or record["bytes"]
+                stats["br_bytes"] += record.get("br_bytes") or record["bytes"]
+        
+        print(f"\n  {'Route class':<12} {'URLs':>5} {'ETag':>5} {'LM':>5} {'CC':>5} {'304s':>9} "
+              f"{'Full':>10} {'Revalidate':>11} {'gzip saved':>11} {'br saved':>9}")
+        for route, stats in classes.items():
+            ratio = f"{stats['not_modified']}/{stats['conditional']}"
+            full = stats["bytes"] + stats["header_bytes"]
+            compressible = stats["compressible_bytes"]
+            gzip_saved = f"{1 - stats['gzip_bytes'] / compressible:.0%}" if compressible else "-"
+            br_saved = f"{1 - stats['br_bytes'] / compressible:.0%}" if compressible else "-"
+            print(f"  {route:<12} {stats['urls']:>5} {stats['etag']:>5} {stats['last_modified']:>5} "
+                  f"{stats['cache_control']:>5} {ratio:>9} {full / 1024:>8.1f}KB "
+                  f"{stats['revalidated_bytes'] / 1024:>9.1f}KB {gzip_saved:>11} {br_saved:>9}")
+        
+        conditional = sum(s["conditional"] for s in classes.values())
+        not_modified = sum(s["not_modified"] for s in classes.values())
+        if conditional:
+            self.print_info(f"304 ratio: {not_modified}/{conditional} "
+                            f"({not_modified / conditional:.0%}) of conditional requests")
+        if failed:
+            self.print_error(f"{failed} of {len(records)} URLs have caching problems")
+        else:
+            self.print_success(f"All {len(records)} URLs are cacheable")
+        return {"classes": classes, "urls": records, "success": not failed}
+    
+    def prepare(self) -> bool:
+        """Check directories, build Tenrankai and start the server"""
         # Check directories
         if not os.path.exists(self.tenrankai_dir):
             self.print_error(f"Tenrankai directory not found: {self.tenrankai_dir}")
@@ -233,52 +945,394 @@ class TenrankaiTester:
             return False
             
         # Start server
-        if not self.start_server():
+        return self.start_server()
+    
+    def run_all_tests(self) -> bool:
+        """Run all tests"""
+        self.print_header("Tenrankai Marketing Site Test Suite")
+        
+        if not self.prepare():
             return False
             
         # Run tests
         all_passed = True
         
-        # Test pages
-        tests = [
-            ("/", "Homepage", 200, "<h1>Tenrankai</h1>"),
-            ("/features", "Features page", 200, "Features"),
-            ("/about", "About page", 200, "About Tenrankai"),
-            ("/contact", "Contact page", 200, "Get Involved"),
-            ("/gallery", "Gallery", 200, None),
-            ("/docs", "Documentation", 200, "Quick Start Guide"),
-            ("/blog", "Blog", 200, "Introducing Tenrankai"),
-            ("/docs/00-quick-start", "Quick Start doc", 200, "5-Minute Setup"),
-            ("/docs/01-installation", "Installation doc", 200, "Installation Guide"),
-            ("/docs/02-core-concepts", "Core Concepts doc", 200, "Core Concepts"),
-            ("/blog/introducing-tenrankai", "Blog post", 200, "high-performance photo gallery"),
-        ]
-        
-        for path, desc, status, content in tests:
-            if not self.test_endpoint(path, desc, status, content):
-                all_passed = False
-                
-        # Test static files
-        static_tests = [
-            ("/static/style.css", "Main CSS", 200, "font-family"),
-            ("/static/home.css", "Home CSS", 200, "hero-section"),
-            ("/static/DejaVuSans.ttf", "Font file", 200, None),
-        ]
-        
-        for path, desc, status, content in static_tests:
-            if not self.test_endpoint(path, desc, status, content):
-                all_passed = False
+        self.set_phase("pages")
+        if not self.run_checks(PAGE_CHECKS + STATIC_CHECKS):
+            all_passed = False
                 
         # Test gallery API
+        self.set_phase("gallery-api")
         if not self.test_gallery_api():
             all_passed = False
             
         # Test 404
+        self.set_phase("errors")
         if not self.test_endpoint("/nonexistent", "404 page", 404):
             all_passed = False
-            
+        
+        self.set_phase("idle")
         return all_passed
     
+    def run_load_step(self, concurrency: int, duration: float,
+                      endpoints: List[str]) -> Dict[str, Any]:
+        """Run a closed-loop load step: each worker issues its next request as soon as the last returns"""
+        if self.load_processes:
+            return self.run_load_step_processes(concurrency, duration, endpoints)
+        stop_at = time.perf_counter() + duration
+        
+        def worker(index: int) -> Dict[str, Tuple[List[float], int]]:
+            session = make_session(1)
+            latencies: Dict[str, List[float]] = {path: [] for path in endpoints}
+            errors: Dict[str, int] = {path: 0 for path in endpoints}
+            # Offset each worker so the endpoint mix is spread evenly from the start
+            i = index
+            while time.perf_counter() < stop_at:
+                path = endpoints[i % len(endpoints)]
+                i += 1
+                start = time.perf_counter()
+                try:
+                    response = session.get(f"{self.base_url}{path}", timeout=10)
+                    ok = response.status_code < 400
+                except requests.exceptions.RequestException:
+                    ok = False
+                if ok:
+                    latencies[path].append(time.perf_counter() - start)
+                else:
+                    errors[path] += 1
+            session.close()
+            return {path: (latencies[path], errors[path]) for path in endpoints}
+        
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            partials = list(pool.map(worker, range(concurrency)))
+        finished = time.perf_counter()
+        elapsed = finished - started
+        
+        per_endpoint = {}
+        samples = {}
+        all_latencies: List[float] = []
+        all_errors = 0
+        for path in endpoints:
+            latencies = [value for partial in partials for value in partial[path][0]]
+            errors = sum(partial[path][1] for partial in partials)
+            per_endpoint[path] = summarize_latencies(latencies, errors, elapsed)
+            samples[path] = downsample([value * 1000 for value in latencies])
+            all_latencies.extend(latencies)
+            all_errors += errors
+        
+        step = {
+            "concurrency": concurrency,
+            "duration": elapsed,
+            "endpoints": per_endpoint,
+            "total": summarize_latencies(all_latencies, all_errors, elapsed),
+            # Latency distribution (ms) per endpoint for the results store
+            "samples": samples,
+            # All workers share this interpreter, so its CPU use is the client's
+            "client": client_report([(time.process_time() - cpu_started) / elapsed]),
+        }
+        self.add_server_latencies(step, started, finished)
+        return step
+    
+    def run_load_step_processes(self, concurrency: int, duration: float,
+                                endpoints: List[str]) -> Dict[str, Any]:
+        """run_load_step with the connections spread over loadgen worker processes"""
+        started = time.perf_counter()
+        result = run_load(self.base_url, endpoints, concurrency, duration, self.load_processes)
+        histograms = result.pop("histograms")
+        step = {
+            "concurrency": concurrency,
+            **result,
+            "samples": {path: [value * 1000 for value in histogram.quantiles()]
+                        for path, histogram in histograms.items()},
+        }
+        self.add_server_latencies(step, started, time.perf_counter())
+        return step
+    
+    def add_server_latencies(self, step: Dict[str, Any], started: float, finished: float):
+        """Add server-side p50/p95 from the request log to each endpoint of a load step"""
+        if not (self.server and self.server.logs):
+            return
+        # Let the log reader catch up with the last responses of the step
+        time.sleep(0.2)
+        server_latencies = self.server.logs.server_latencies(started, finished + 0.2)
+        for path, stats in step["endpoints"].items():
+            server_side = sorted(server_latencies.get(path, []))
+            if server_side:
+                stats["server_p50_ms"] = percentile(server_side, 50)
+                stats["server_p95_ms"] = percentile(server_side, 95)
+    
+    def print_load_step(self, step: Dict[str, Any]):
+        """Print the per-endpoint table for one load step"""
+        print(f"\n{BLUE}Concurrency {step['concurrency']} ({step['duration']:.1f}s){NC}")
+        has_server = any("server_p50_ms" in stats for stats in step["endpoints"].values())
+        header = (f"  {'Endpoint':<32} {'Reqs':>7} {'Req/s':>9} {'p50':>8} {'p95':>8} "
+                  f"{'p99':>8} {'max':>8} {'Err%':>6}")
+        if has_server:
+            header += f" {'srv p50':>8} {'srv p95':>8}"
+        print(header)
+        rows = list(step["endpoints"].items()) + [("TOTAL", step["total"])]
+        for path, stats in rows:
+            line = (f"  {path:<32} {stats['requests']:>7} {stats['rps']:>9.1f} "
+                    f"{stats['p50_ms']:>6.1f}ms {stats['p95_ms']:>6.1f}ms "
+                    f"{stats['p99_ms']:>6.1f}ms {stats['max_ms']:>6.1f}ms "
+                    f"{stats['error_rate'] * 100:>5.1f}%")
+            if "server_p50_ms" in stats:
+                line += f" {stats['server_p50_ms']:>6.1f}ms {stats['server_p95_ms']:>6.1f}ms"
+            print(line)
+        client = step["client"]
+        usage = ", ".join(f"{pct:.0f}%" for pct in client["cpu_percent"])
+        if client["saturated"]:
+            print(f"  {RED}✗ Client-bound: load processes used {usage} of a CPU; "
+                  f"throughput measures the client, not the server (try --bench-processes){NC}")
+        else:
+            print(f"  Client CPU per load process: {usage}")
+    
+    def run_bench(self, duration: float = 10.0, max_concurrency: int = 64,
+                  min_gain: float = 0.05, endpoints: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Step concurrency up (1, 2, 4, ...) until total throughput stops increasing"""
+        endpoints = endpoints or BENCH_ENDPOINTS
+        self.print_header("Load Sweep")
+        self.print_info(f"{len(endpoints)} endpoints, {duration:g}s per step, "
+                        f"stop when throughput gains less than {min_gain:.0%}")
+        
+        # Warm up caches so the first step does not pay for cold renders
+        self.set_phase("bench warm-up")
+        for path in endpoints:
+            try:
+                self.session.get(f"{self.base_url}{path}", timeout=30)
+            except requests.exceptions.RequestException:
+                pass
+        
+        steps: List[Dict[str, Any]] = []
+        best_rps = 0.0
+        concurrency = 1
+        while concurrency <= max_concurrency:
+            self.set_phase(f"bench c={concurrency}")
+            step = self.run_load_step(concurrency, duration, endpoints)
+            steps.append(step)
+            self.print_load_step(step)
+            rps = step["total"]["rps"]
+            if steps[:-1] and rps < best_rps * (1 + min_gain):
+                self.print_info(f"Throughput stopped increasing at concurrency {concurrency}")
+                break
+            best_rps = max(best_rps, rps)
+            concurrency *= 2
+        
+        self.print_header("Saturation Points")
+        print(f"  {'Endpoint':<32} {'Concurrency':>11} {'Peak req/s':>11} {'p99 at peak':>12}")
+        for path in list(endpoints) + ["TOTAL"]:
+            def stats_of(step):
+                return step["total"] if path == "TOTAL" else step["endpoints"][path]
+            peak = max(steps, key=lambda step: stats_of(step)["rps"])
+            stats = stats_of(peak)
+            flag = f" {RED}client-bound{NC}" if peak["client"]["saturated"] else ""
+            print(f"  {path:<32} {peak['concurrency']:>11} {stats['rps']:>11.1f} "
+                  f"{stats['p99_ms']:>10.1f}ms{flag}")
+        
+        self.set_phase("idle")
+        return steps
+    
+    def run_reload_bench(self, reloads: int = 5, interval: float = 5.0, concurrency: int = 4,
+                         gallery_file: str = "sites/default/galleries/main.toml",
+                         visible_timeout: float = 10.0,
+                         endpoints: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Send SIGHUP under steady load after each edit of a ConfigStorage gallery file.
+        
+        Each reload moves the gallery to a new url_prefix; the change is visible once
+        that prefix serves 200. The config must be a bench copy (see prepare_bench_config)
+        since the gallery file is rewritten in place.
+        """
+        endpoints = endpoints or BENCH_ENDPOINTS
+        with open(self.config) as f:
+            storage = tomllib.loads(f.read())["app"]["config_storage"]
+        path = os.path.join(os.path.dirname(os.path.abspath(self.config)), storage, gallery_file)
+        self.print_header("Hot Reload Benchmark")
+        self.print_info(f"{reloads} reloads every {interval:g}s under {concurrency} workers, "
+                        f"editing {gallery_file}")
+        
+        # (finished at, latency, outcome) where outcome is ok, error or dropped
+        results: List[Tuple[float, float, str]] = []
+        results_lock = threading.Lock()
+        stop = threading.Event()
+        
+        def worker(index: int):
+            session = make_session(1)
+            local: List[Tuple[float, float, str]] = []
+            i = index
+            while not stop.is_set():
+                path_ = endpoints[i % len(endpoints)]
+                i += 1
+                start = time.perf_counter()
+                try:
+                    response = session.get(f"{self.base_url}{path_}", timeout=10)
+                    outcome = "ok" if response.status_code < 400 else "error"
+                except requests.exceptions.ConnectionError:
+                    outcome = "dropped"
+                except requests.exceptions.RequestException:
+                    outcome = "error"
+                finished = time.perf_counter()
+                local.append((finished, finished - start, outcome))
+            session.close()
+            with results_lock:
+                results.extend(local)
+        
+        events: List[Dict[str, Any]] = []
+        self.set_phase("reload baseline")
+        pool = ThreadPoolExecutor(max_workers=concurrency)
+        for index in range(concurrency):
+            pool.submit(worker, index)
+        baseline_start = time.perf_counter()
+        time.sleep(interval)
+        baseline_end = time.perf_counter()
+        
+        try:
+            for number in range(1, reloads + 1):
+                self.set_phase(f"reload {number}")
+                prefix = f"/gallery-reload-{number}"
+                with open(path) as f:
+                    text = f.read()
+                with open(path, "w") as f:
+                    f.write(set_toml_value(text, "url_prefix", prefix))
+                sent = time.perf_counter()
+                os.kill(self.server.process.pid, signal.SIGHUP)
+                
+                visible_after = None
+                probe = make_session(1)
+                while time.perf_counter() - sent < visible_timeout:
+                    try:
+                        if probe.get(f"{self.base_url}{prefix}", timeout=2).status_code == 200:
+                            visible_after = time.perf_counter() - sent
+                            break
+                    except requests.exceptions.RequestException:
+                        pass
+                    time.sleep(0.005)
+                probe.close()
+                events.append({"reload": number, "prefix": prefix, "sent": sent,
+                               "visible_after": visible_after})
+                time.sleep(max(0.0, interval - (time.perf_counter() - sent)))
+        finally:
+            stop.set()
+            pool.shutdown(wait=True)
+            self.set_phase("idle")
+        
+        def window_stats(start: float, end: float) -> Dict[str, Any]:
+            window = [r for r in results if start <= r[0] < end]
+            latencies = [latency for _, latency, outcome in window if outcome == "ok"]
+            errors = sum(1 for r in window if r[2] != "ok")
+            stats = summarize_latencies(latencies, errors, end - start)
+            stats["dropped"] = sum(1 for r in window if r[2] == "dropped")
+            return stats
+        
+        baseline = window_stats(baseline_start, baseline_end)
+        for event in events:
+            # The spike window covers the reload itself, at least one second after SIGHUP
+            span = max(1.0, event["visible_after"] or visible_timeout)
+            event.update(window_stats(event["sent"], event["sent"] + span))
+            event["window_s"] = span
+            del event["sent"]
+        
+        print(f"\n  {'Reload':<10} {'Visible':>9} {'Reqs':>6} {'p50':>8} {'p99':>8} {'max':>8} "
+              f"{'Errors':>7} {'Dropped':>8}")
+        print(f"  {'baseline':<10} {'-':>9} {baseline['requests']:>6} {baseline['p50_ms']:>6.1f}ms "
+              f"{baseline['p99_ms']:>6.1f}ms {baseline['max_ms']:>6.1f}ms {baseline['errors']:>7} "
+              f"{baseline['dropped']:>8}")
+        for event in events:
+            visible = f"{event['visible_after'] * 1000:.0f}ms" if event["visible_after"] is not None else "never"
+            print(f"  {'#' + str(event['reload']):<10} {visible:>9} {event['requests']:>6} "
+                  f"{event['p50_ms']:>6.1f}ms {event['p99_ms']:>6.1f}ms {event['max_ms']:>6.1f}ms "
+                  f"{event['errors']:>7} {event['dropped']:>8}")
+        
+        invisible = [e["reload"] for e in events if e["visible_after"] is None]
+        if invisible:
+            self.print_error(f"Change not visible within {visible_timeout:g}s after reload "
+                             f"{', '.join(map(str, invisible))}")
+        failed = sum(e["errors"] for e in events)
+        if failed:
+            self.print_error(f"{failed} failed requests during reloads")
+        if not invisible and not failed:
+            self.print_success("Every reload became visible without failed requests")
+        return {"baseline": baseline, "reloads": events,
+                "success": not invisible and not failed}
+    
+    def run_open_loop(self, routes: List[Dict[str, Any]], duration: float = 30.0, processes: int = 1,
+                      max_in_flight: int = 256, windows: int = 10) -> Dict[str, Any]:
+        """Send each route at its own fixed (or linearly ramping) arrival rate, whatever the server does.
+        
+        Latency runs from each request's intended send time, so queueing behind
+        a stalled request is counted instead of hidden as it is in closed-loop runs.
+        """
+        self.print_header("Open-Loop Load")
+        for route in routes:
+            ramp = (f"{route['start_rps']:g} -> {route['end_rps']:g}"
+                    if route["end_rps"] != route["start_rps"] else f"{route['start_rps']:g}")
+            self.print_info(f"{route['path']}: {ramp} req/s")
+        
+        self.set_phase("open-loop warm-up")
+        for route in routes:
+            try:
+                self.session.get(f"{self.base_url}{route['path']}", timeout=30)
+            except requests.exceptions.RequestException:
+                pass
+        
+        self.set_phase("open-loop")
+        report = run_open_loop(self.base_url, routes, duration, processes, max_in_flight, windows)
+        self.set_phase("idle")
+        histograms = report.pop("histograms", {})
+        report["samples"] = {path: [value * 1000 for value in histogram.quantiles()]
+                             for path, histogram in histograms.items()}
+        lag = report.pop("lag")
+        report["send_lag_p99_ms"] = lag.percentile(99) * 1000
+        
+        print(f"\n  {'Route':<32} {'Target':>8} {'Req/s':>8} {'p50':>8} {'p99':>9} {'max':>9} "
+              f"{'svc p99':>9} {'Err%':>6}")
+        for path, stats in report["routes"].items():
+            print(f"  {path:<32} {stats['target_rps']:>8.1f} {stats['rps']:>8.1f} {stats['p50_ms']:>6.1f}ms "
+                  f"{stats['p99_ms']:>7.1f}ms {stats['max_ms']:>7.1f}ms {stats['service_p99_ms']:>7.1f}ms "
+                  f"{stats['error_rate'] * 100:>5.1f}%")
+        for route in routes:
+            if route["end_rps"] == route["start_rps"]:
+                continue
+            print(f"\n{BLUE}Ramp {route['path']}{NC}")
+            print(f"  {'From':>7} {'Target':>8} {'Reqs':>6} {'p50':>8} {'p99':>9}")
+            for window in report["routes"][route["path"]]["windows"]:
+                print(f"  {window['start_s']:>6.1f}s {window['target_rps']:>8.1f} {window['requests']:>6} "
+                      f"{window['p50_ms']:>6.1f}ms {window['p99_ms']:>7.1f}ms")
+        
+        self.print_info("Latency runs from the intended send time; svc p99 excludes time queued in the client")
+        if report["client"]["saturated"]:
+            self.print_error(f"Client-bound: a load process used {report['client']['max_cpu_percent']:.0f}% "
+                             f"of a CPU, so requests left late (use --open-processes)")
+        errors = sum(stats["errors"] for stats in report["routes"].values())
+        if errors:
+            self.print_error(f"{errors} failed requests")
+        report["success"] = not errors
+        return report
+    
+    def record(self, benchmark: str, metrics: Dict[str, Dict[str, Any]], store: str,
+               extra: Optional[Dict[str, Any]] = None):
+        """Append a run to the results store, keyed by the config the run was asked for"""
+        extra = dict(extra or {})
+        config = extra.pop("config", self.config)
+        run = record_run(benchmark, config, metrics, site_dir=self.site_dir,
+                         tenrankai_dir=self.tenrankai_dir, store=store, extra=extra)
+        self.print_info(f"Recorded run {run['id']} (submodule {run['submodule'][:10]}) in {store}")
+    
+    def print_resource_summary(self):
+        """Print per-phase server resource usage collected by the sampler"""
+        sampler = self.server.sampler if self.server else None
+        if not sampler or not sampler.samples:
+            return
+        print(f"\n{YELLOW}Server resources (every {sampler.interval}s):{NC}")
+        print(f"  {'Phase':<16} {'Samples':>7} {'RSS max':>10} {'CPU s':>7} {'CPU %':>6} "
+              f"{'Threads':>7} {'FDs':>5} {'Read':>10} {'Written':>10}")
+        for phase, stats in sampler.summary().items():
+            cpu_pct = stats["cpu_seconds"] / stats["seconds"] * 100 if stats["seconds"] else 0.0
+            print(f"  {phase:<16} {stats['samples']:>7} {stats['rss_max'] / 1048576:>8.1f}MB "
+                  f"{stats['cpu_seconds']:>7.2f} {cpu_pct:>5.0f}% {stats['threads_max']:>7} "
+                  f"{stats['fds_max']:>5} {stats['rchar'] / 1024:>8.0f}KB {stats['wchar'] / 1024:>8.0f}KB")
+    
     def print_summary(self, success: bool):
         """Print test summary"""
         self.print_header("Test Summary")
@@ -286,20 +1340,32 @@ class TenrankaiTester:
             self.print_success("All tests passed!")
         else:
             self.print_error("Some tests failed")
+        
+        self.print_resource_summary()
             
         # Print server logs
-        if self.server_process and self.server_process.stdout:
+        if self.server and self.server.logs:
             print(f"\n{YELLOW}Recent server logs:{NC}")
-            # Read last few lines from process stdout
-            try:
-                self.server_process.stdout.flush()
-                output = self.server_process.stdout.read()
-                if output:
-                    lines = output.strip().split('\n')[-10:]
-                    for line in lines:
-                        print(f"  {line}")
-            except:
-                pass
+            for line in self.server.logs.tail(10):
+                print(f"  {line}")
+
+def bench_metrics(steps: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Results-store metrics of a load sweep: latency per endpoint and step, throughput per step"""
+    metrics = {}
+    for step in steps:
+        for path, samples in step["samples"].items():
+            metrics[f"c={step['concurrency']} {path} latency"] = metric(samples, "ms")
+        metrics[f"c={step['concurrency']} throughput"] = metric([step["total"]["rps"]], "req/s", "higher")
+    return metrics
+
+def reload_metrics(report: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Results-store metrics of a reload benchmark, one sample per reload"""
+    reloads = report["reloads"]
+    return {
+        "visible_after": metric([e["visible_after"] * 1000 for e in reloads if e["visible_after"] is not None]),
+        "reload_p99": metric([e["p99_ms"] for e in reloads if e["requests"]]),
+        "reload_errors": metric([float(e["errors"]) for e in reloads], "requests"),
+    }
 
 def main():
     parser = argparse.ArgumentParser(description='Test Tenrankai marketing site')
@@ -309,15 +1375,146 @@ def main():
                        help='Keep server running after tests')
     parser.add_argument('--quit-after', type=int, default=None,
                        help='Auto-quit server after N seconds (useful for CI)')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Check endpoints concurrently on N pooled connections (default: 1, sequential)')
+    parser.add_argument('--sample-interval', type=float, default=0.5,
+                       help='Seconds between /proc samples of the server (default: 0.5, 0 disables)')
+    parser.add_argument('--samples-json', default=None,
+                       help='Write the server resource time series to this JSON file')
+    parser.add_argument('--server-log', default=None,
+                       help='Append all server output to this file')
+    parser.add_argument('--bench', action='store_true',
+                       help='Run a closed-loop load sweep instead of the functional tests')
+    parser.add_argument('--bench-duration', type=float, default=10.0,
+                       help='Seconds per concurrency step in --bench mode (default: 10)')
+    parser.add_argument('--bench-max-concurrency', type=int, default=64,
+                       help='Highest concurrency step in --bench mode (default: 64)')
+    parser.add_argument('--bench-min-gain', type=float, default=0.05,
+                       help='Stop when a step improves throughput by less than this fraction (default: 0.05)')
+    parser.add_argument('--bench-processes', type=int, default=0,
+                       help='Generate --bench load from N worker processes (default: 0, threads in this process)')
+    parser.add_argument('--bench-json', default=None,
+                       help='Write --bench step results to this JSON file')
+    parser.add_argument('--open-loop', action='store_true',
+                       help='Send requests at fixed arrival rates instead of the functional tests')
+    parser.add_argument('--rate', action='append', default=None,
+                       help='PATH=RPS or PATH=START:END ramp for --open-loop (repeatable, default: '
+                            'every load-sweep endpoint at --open-default-rate)')
+    parser.add_argument('--open-default-rate', type=float, default=5.0,
+                       help='Requests/sec per endpoint when no --rate is given (default: 5)')
+    parser.add_argument('--open-duration', type=float, default=30.0,
+                       help='Seconds of --open-loop load (default: 30)')
+    parser.add_argument('--open-processes', type=int, default=1,
+                       help='Worker processes sending --open-loop requests (default: 1)')
+    parser.add_argument('--open-max-in-flight', type=int, default=256,
+                       help='Connections for --open-loop; later arrivals queue and that wait counts (default: 256)')
+    parser.add_argument('--open-json', default=None,
+                       help='Write --open-loop results to this JSON file')
+    parser.add_argument('--audit', action='store_true',
+                       help='Audit caching headers, 304s and compression instead of the functional tests')
+    parser.add_argument('--audit-json', default=None,
+                       help='Write --audit results to this JSON file')
+    parser.add_argument('--reload-bench', action='store_true',
+                       help='Measure SIGHUP config reloads under steady load instead of the functional tests')
+    parser.add_argument('--reloads', type=int, default=5,
+                       help='Number of reloads in --reload-bench mode (default: 5)')
+    parser.add_argument('--reload-interval', type=float, default=5.0,
+                       help='Seconds between reloads, and of baseline load before the first (default: 5)')
+    parser.add_argument('--reload-concurrency', type=int, default=4,
+                       help='Concurrent load workers during --reload-bench (default: 4)')
+    parser.add_argument('--reload-json', default=None,
+                       help='Write --reload-bench results to this JSON file')
+    parser.add_argument('--results', default=DEFAULT_STORE,
+                       help='Append this run to a results store for bench_results.py (default: %(default)s)')
+    parser.add_argument('--no-record', action='store_true',
+                       help='Do not append this run to the results store')
+    parser.add_argument('--record', action='store_true',
+                       help='Also record the server RSS of a functional run (benchmark modes always record)')
     
     args = parser.parse_args()
     
-    tester = TenrankaiTester(port=args.port, config=args.config, quit_after=args.quit_after)
+    tester = TenrankaiTester(port=args.port, config=args.config, quit_after=args.quit_after,
+                             workers=args.workers, sample_interval=args.sample_interval or None,
+                             server_log=args.server_log, load_processes=args.bench_processes)
     
     try:
-        success = tester.run_all_tests()
+        if args.bench:
+            tester.print_header("Tenrankai Load Sweep")
+            success = tester.prepare()
+            if success:
+                steps = tester.run_bench(duration=args.bench_duration,
+                                         max_concurrency=args.bench_max_concurrency,
+                                         min_gain=args.bench_min_gain)
+                if args.bench_json:
+                    with open(args.bench_json, "w") as f:
+                        json.dump(steps, f, indent=2)
+                    tester.print_info(f"Wrote step results to {args.bench_json}")
+                if not args.no_record:
+                    tester.record("load-sweep", bench_metrics(steps), args.results,
+                                  {"duration": args.bench_duration})
+        elif args.open_loop:
+            tester.print_header("Tenrankai Open-Loop Benchmark")
+            try:
+                routes = [parse_rate(spec) for spec in args.rate or
+                          [f"{path}={args.open_default_rate:g}" for path in BENCH_ENDPOINTS]]
+            except ValueError as e:
+                tester.print_error(f"Invalid --rate: {e}")
+                return 1
+            success = tester.prepare()
+            if success:
+                report = tester.run_open_loop(routes, duration=args.open_duration,
+                                              processes=args.open_processes,
+                                              max_in_flight=args.open_max_in_flight)
+                success = report["success"]
+                if args.open_json:
+                    with open(args.open_json, "w") as f:
+                        json.dump(report, f, indent=2)
+                    tester.print_info(f"Wrote open-loop results to {args.open_json}")
+                if not args.no_record:
+                    tester.record("open-loop", {f"{path} latency": metric(samples, "ms")
+                                                for path, samples in report["samples"].items()},
+                                  args.results, {"routes": routes, "duration": args.open_duration})
+        elif args.audit:
+            tester.print_header("Tenrankai Caching Audit")
+            success = tester.prepare()
+            if success:
+                report = tester.run_cache_audit()
+                success = report["success"]
+                if args.audit_json:
+                    with open(args.audit_json, "w") as f:
+                        json.dump(report, f, indent=2)
+                    tester.print_info(f"Wrote audit results to {args.audit_json}")
+        elif args.reload_bench:
+            tester.print_header("Tenrankai Hot Reload Benchmark")
+            # Reloads rewrite the gallery config, so run against a copy of the tree
+            tester.config = prepare_bench_config("reload", base_config=args.config,
+                                                 site_dir=tester.site_dir)
+            success = tester.prepare()
+            if success:
+                report = tester.run_reload_bench(reloads=args.reloads, interval=args.reload_interval,
+                                                 concurrency=args.reload_concurrency)
+                success = report["success"]
+                if args.reload_json:
+                    with open(args.reload_json, "w") as f:
+                        json.dump(report, f, indent=2)
+                    tester.print_info(f"Wrote reload results to {args.reload_json}")
+                if not args.no_record:
+                    tester.record("reload", reload_metrics(report), args.results,
+                                  {"config": args.config, "interval": args.reload_interval,
+                                   "concurrency": args.reload_concurrency})
+        else:
+            success = tester.run_all_tests()
+            sampler = tester.server.sampler if tester.server else None
+            if success and sampler and sampler.samples and args.record and not args.no_record:
+                rss = [sample["rss_bytes"] / 1048576 for sample in sampler.samples if "rss_bytes" in sample]
+                tester.record("functional", {"rss_mb": metric(rss, "MB")}, args.results,
+                              {"phases": sampler.summary()})
         tester.print_summary(success)
         
+        if args.samples_json and tester.server and tester.server.sampler:
+            tester.server.sampler.write_json(args.samples_json)
+            tester.print_info(f"Wrote server resource samples to {args.samples_json}")
+        
         if args.keep_running and success:
             print(f"\n{YELLOW}Server is running at http://localhost:{args.port}{NC}")
             print("Press Ctrl+C to stop...")